@@ -0,0 +1,44 @@
+import streamlit as st
+
+from core import precompute
+
+# One server process for every tool: datasets in core.datasets and the
+# upload / demand caches are shared by all pages and sessions, and switching
+# page doesn't start a new process. The scripts still run standalone too
+# (streamlit run lastbite.py).
+#
+#     streamlit run Home.py
+
+
+@st.cache_resource
+def precompute_worker():
+    # The off-peak precompute worker (core.precompute) only runs when the
+    # server is started with KOANDRA_PRECOMPUTE_EVERY; pages only read artifacts.
+    # Its daily DOI download rewrites the lake in this process, which is safe
+    # for sessions holding the old version: core.lake keeps it RETAIN_SECONDS
+    # (longer than the day core.datasets caches it)
+    return precompute.start_from_env()
+
+
+precompute_worker()
+
+pages = {
+    "Last Bite & DOI": [
+        st.Page("lastbite.py", title="Last Bite Calculator", icon="🍪"),
+        st.Page("dynamic_doiwh.py", title="Dynamic DOI Calculator", icon="📦"),
+    ],
+    "OOS Projection": [
+        st.Page("app.py", title="STL Supply & Target OOS", icon="📈", default=True),
+        st.Page("oos_projection.py", title="OOS Projection STL + SO", icon="📉"),
+        st.Page("so_qty.py", title="OOS SO Qty Projection", icon="🎯"),
+        st.Page("rekap.py", title="OOS Projection (Historical)", icon="🗂️"),
+        st.Page("projected_oos_actual.py", title="OOS Projection Dry STO", icon="🚚"),
+        st.Page("oosfixed.py", title="OOS Projection WH", icon="🏭"),
+    ],
+    "Forecast": [
+        st.Page("pgssrg.py", title="Hub to WH Forecast", icon="🔀"),
+        st.Page("poiahist.py", title="POIA Avg Sales Histogram", icon="📊"),
+    ],
+}
+
+st.navigation(pages).run()
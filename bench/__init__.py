@@ -0,0 +1 @@
+"""Benchmarks for the core engines over synthetic data (see ``python -m bench.run -h``)."""
@@ -0,0 +1,290 @@
+"""Concurrent-session load test for the Streamlit apps built on AppTest.
+
+Each simulated planner is an ``AppTest`` session running on its own
+thread, stepping through a realistic interaction script (pick a SKU,
+toggle DOI components, change supply numbers ...). Every step is a full
+script rerun, which is what a widget change costs on the real server.
+Remote CSV / Google Sheet sources are replaced by synthetic local files
+through the ``KOANDRA_*`` source overrides in ``core.sources``.
+
+    python -m bench.loadtest --app lastbite --sessions 1 4 16
+    python -m bench.loadtest --app all --sessions 8 --skus 20000 --out loadtest.json
+
+Upload-driven apps (rekap, projected_oos_actual, oosfixed, pgssrg,
+poiahist) are not covered because AppTest cannot drive st.file_uploader.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench import synth
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---- Widget helpers ----
+def _find(at, kind, label):
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no {kind} labelled {label!r}")
+
+
+def _choose(at, label, rng):
+    box = _find(at, "selectbox", label)
+    box.set_value(box.options[rng.integers(len(box.options))])
+
+
+def _click(at, label):
+    _find(at, "button", label).click()
+
+
+# ---- Interaction scripts ----
+# Each step mutates widgets on the AppTest; the harness then reruns the
+# script and times it. A step returning False is skipped (e.g. the SKU
+# picked has no stock so the location picker is not shown).
+def _lastbite_pick_location(at, rng):
+    try:
+        _choose(at, "Select Location", rng)
+    except LookupError:
+        return False
+
+
+def _lastbite_calculate(at, rng):
+    try:
+        _find(at, "number_input", "Enter Ideal DOI (days)").set_value(float(rng.integers(7, 60)))
+        _click(at, "Calculate")
+    except LookupError:
+        return False
+
+
+SCRIPTS = {
+    "lastbite": ("lastbite.py", [
+        ("select_sku", lambda at, rng: _choose(at, "Select SKU", rng)),
+        ("select_location", _lastbite_pick_location),
+        ("calculate_sku", _lastbite_calculate),
+        ("brand_mode", lambda at, rng: _find(at, "selectbox", "Choose Analysis Level").set_value("Brand Company")),
+        ("select_brand", lambda at, rng: _choose(at, "Select Brand Company", rng)),
+        ("calculate_brand", _lastbite_calculate),
+    ]),
+    "dynamic_doiwh": ("dynamic_doiwh.py", [
+        ("toggle_reschedule_off", lambda at, rng: _find(at, "checkbox", "Reschedule Adjustment").uncheck()),
+        ("set_ks", lambda at, rng: _find(at, "number_input", "**ks (Demand Var)**").set_value(round(float(rng.uniform(0.1, 1.5)), 1))),
+        ("pareto_classes", lambda at, rng: _find(at, "multiselect", "Pareto Classes").set_value(["X", "A", "B"])),
+        ("changed_only", lambda at, rng: _find(at, "checkbox", "Show only rows with changed DOI").check()),
+        ("toggle_reschedule_on", lambda at, rng: _find(at, "checkbox", "Reschedule Adjustment").check()),
+    ]),
+    "oos_projection": ("oos_projection.py", [
+        ("stl_supply", lambda at, rng: _find(at, "number_input", "STL Supply After Mar 9").set_value(int(rng.integers(8, 20)) * 5000)),
+        ("stl_supply_again", lambda at, rng: _find(at, "number_input", "STL Supply After Mar 9").set_value(int(rng.integers(8, 20)) * 5000)),
+    ]),
+    "so_qty": ("so_qty.py", [
+        ("target_oos", lambda at, rng: _find(at, "number_input", "Target OOS Percentage").set_value(float(rng.integers(2, 15)))),
+        ("target_oos_again", lambda at, rng: _find(at, "number_input", "Target OOS Percentage").set_value(float(rng.integers(2, 15)))),
+    ]),
+    "app": ("app.py", [
+        ("stl_supply", lambda at, rng: _find(at, "number_input", "STL Supply After Mar 9").set_value(int(rng.integers(8, 20)) * 5000)),
+        ("target_oos", lambda at, rng: _find(at, "number_input", "Target OOS Percentage").set_value(float(rng.integers(2, 15)))),
+    ]),
+}
+
+
+def setup_stand_ins(scale, seed, out_dir):
+    """Write synthetic remote sources and point core.sources at them."""
+    data = synth.generate(**scale, seed=seed)
+    stand_ins = {
+        "SOH_CSV_URL": "soh",
+        "FC_CSV_URL": "sales",
+        "HOLDING_COST_CSV_URL": "occupancy",
+        "DATA_URL": "doi_database",
+        "RESCHED_URL": "doi_reschedule",
+    }
+    for env, name in stand_ins.items():
+        path = os.path.join(out_dir, f"{name}.csv")
+        data[name].to_csv(path, index=False)
+        os.environ[f"KOANDRA_{env}"] = path
+    if "core.sources" in sys.modules:
+        importlib.reload(sys.modules["core.sources"])
+
+
+def _session(script, steps, seed, rounds, think, timeout, records, errors):
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed)
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    records.append(("open", time.perf_counter() - start))
+    for _ in range(rounds):
+        for name, step in steps:
+            try:
+                if step(at, rng) is False:
+                    continue
+            except LookupError as e:
+                errors.append(f"{name}: {e}")
+                continue
+            if think:
+                time.sleep(think)
+            start = time.perf_counter()
+            at.run()
+            records.append((name, time.perf_counter() - start))
+            errors.extend(f"{name}: {e.value}" for e in at.exception)
+
+
+def _percentiles(values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000, "count": len(values)}
+
+
+@contextlib.contextmanager
+def _shared_script_cache():
+    # AppTest compiles the script into a fresh ScriptCache on every rerun,
+    # where the server compiles it once for all sessions. Share one cache
+    # like the server does: reruns then time the script rather than the
+    # compiler, and compiles stay serialized behind the cache lock (parsing
+    # on several threads at once can fail on CPython 3.11 with "AST
+    # constructor recursion depth mismatch").
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    cache = ScriptCache()
+    original = local_script_runner.ScriptCache
+    local_script_runner.ScriptCache = lambda: cache
+    try:
+        yield
+    finally:
+        local_script_runner.ScriptCache = original
+
+
+def run_load(app, sessions, rounds=1, think=0.0, timeout=120, seed=0):
+    """Drive ``sessions`` concurrent sessions of ``app`` and summarize rerun latency."""
+    script, steps = SCRIPTS[app]
+    records, errors = [], []
+    threads = [
+        threading.Thread(target=_session, args=(script, steps, seed + i, rounds, think, timeout, records, errors))
+        for i in range(sessions)
+    ]
+    with _shared_script_cache():
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+
+    reruns = [seconds for name, seconds in records if name != "open"]
+    by_step = {}
+    for name, seconds in records:
+        by_step.setdefault(name, []).append(seconds)
+    return {
+        "app": app,
+        "sessions": sessions,
+        "wall_s": wall,
+        "reruns_per_s": len(reruns) / wall if wall else float("nan"),
+        "rerun": _percentiles(reruns) if reruns else None,
+        "open": _percentiles(by_step.get("open", [0.0])),
+        "steps": {name: _percentiles(values) for name, values in by_step.items()},
+        "errors": errors[:20],
+        "error_count": len(errors),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def session_memory(app, samples=3, timeout=120, seed=0):
+    """Memory retained by one live session and the peak while it runs, via tracemalloc.
+
+    Sessions are measured one at a time so the numbers are attributable.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    script, steps = SCRIPTS[app]
+    retained, peaks = [], []
+    sessions = []
+    tracemalloc.start()
+    try:
+        for i in range(samples):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout).run()
+            rng = np.random.default_rng(seed + i)
+            for _, step in steps:
+                try:
+                    if step(at, rng) is not False:
+                        at.run()
+                except LookupError:
+                    pass
+            after, peak = tracemalloc.get_traced_memory()
+            sessions.append(at)  # keep the session alive like the server does
+            retained.append(after - before)
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        # The first session also pays for imports and shared caches
+        "first_session_mb": retained[0] / 2**20,
+        "retained_mb_per_session": float(np.mean(retained[1:] or retained)) / 2**20,
+        "peak_mb_per_rerun": float(np.max(peaks)) / 2**20,
+    }
+
+
+def print_report(result):
+    rerun = result["rerun"] or {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan"), "count": 0}
+    print(f"{result['app']:15s} sessions={result['sessions']:<4d} reruns={rerun['count']:<5d} "
+          f"p50={rerun['p50_ms']:8.1f}ms p95={rerun['p95_ms']:8.1f}ms p99={rerun['p99_ms']:8.1f}ms "
+          f"{result['reruns_per_s']:6.1f} reruns/s  errors={result['error_count']}")
+    if "memory" in result:
+        mem = result["memory"]
+        print(f"{'':15s} memory: {mem['retained_mb_per_session']:.1f} MB retained/session, "
+              f"{mem['peak_mb_per_rerun']:.1f} MB peak/rerun, first session {mem['first_session_mb']:.1f} MB")
+
+
+def main(argv=None):
+    scale = synth.default_scale()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", action="append", choices=list(SCRIPTS) + ["all"], help="app(s) to drive (default: all)")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8], help="concurrent session counts to sweep")
+    parser.add_argument("--rounds", type=int, default=1, help="times each session repeats its script")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause before each rerun")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun AppTest timeout in seconds")
+    parser.add_argument("--memory-samples", type=int, default=3, help="sessions measured for memory (0 to skip)")
+    for key, value in scale.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=value)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON here")
+    args = parser.parse_args(argv)
+
+    apps = list(SCRIPTS) if not args.app or "all" in args.app else args.app
+    scale = {key: getattr(args, key) for key in scale}
+    os.chdir(ROOT)  # The apps open bundled files by relative path
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_stand_ins(scale, args.seed, tmp)
+        for app in apps:
+            memory = session_memory(app, args.memory_samples, args.timeout, args.seed) if args.memory_samples else None
+            for sessions in args.sessions:
+                result = run_load(app, sessions, args.rounds, args.think_ms / 1000, args.timeout, args.seed)
+                if memory:
+                    result["memory"] = memory
+                result["scale"] = scale
+                print_report(result)
+                results.append(result)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
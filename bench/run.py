@@ -0,0 +1,237 @@
+"""Time each engine stage over synthetic data and record peak memory.
+
+    python -m bench.run --skus 20000 --whs 5 --hubs 30 --days 90
+    python -m bench.run --compare bench/results/<old>.json bench/results/<new>.json
+
+Every run writes a JSON result tagged with the git commit, the scale and
+the library versions, so runs of the same scale can be compared across
+commits. Timing and memory are measured in separate passes because
+tracemalloc slows allocation-heavy code down.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from bench import synth
+from core import doi, lastbite, poia, projection, sources
+from core.forecast import convert_hub_forecast
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+# ---- Stages ----
+# Each stage takes the shared context dict, may add its outputs to it, and
+# must not depend on anything but the paths and the outputs of earlier stages.
+
+def stage_load(ctx):
+    paths = ctx["paths"]
+    ctx["soh"] = pd.read_csv(paths["soh"])
+    ctx["sales"] = pd.read_csv(paths["sales"])
+    ctx["occupancy"] = pd.read_csv(paths["occupancy"])
+    ctx["doi_database"] = pd.read_csv(paths["doi_database"])
+    ctx["doi_reschedule"] = pd.read_csv(paths["doi_reschedule"])
+    ctx["forecast_dates"] = sources.load_demand_forecast(paths["forecast_dates"])
+    ctx["supply_history"] = pd.read_excel(paths["supply_history"])
+    ctx["oos_history"] = pd.read_excel(paths["oos_history"])
+    ctx["inbound"] = pd.read_excel(paths["inbound"])
+    ctx["outbound"] = pd.read_excel(paths["outbound"])
+    ctx["hub_forecast"] = pd.read_csv(paths["hub_forecast"])
+    ctx["hub_map"] = pd.read_csv(paths["hub_map"])
+    ctx["split_skus"] = pd.read_csv(paths["split_skus"])
+    ctx["poia"] = pd.read_csv(paths["poia"])
+
+
+def stage_merge(ctx):
+    ctx["lastbite_df"] = lastbite.prepare_lastbite(ctx["soh"], ctx["sales"], ctx["occupancy"])
+    ctx["doi_merged"] = doi.merge_reschedule(ctx["doi_database"], ctx["doi_reschedule"])
+
+
+def stage_doi_compute(ctx):
+    ctx["doi_result"] = doi.compute_final_doi(ctx["doi_merged"], doi.default_doi_params())
+
+
+def stage_lastbite_adjust(ctx):
+    df = lastbite.compute_adjustments(ctx["lastbite_df"], 30.0)
+    ctx["brand_totals"] = {brand: lastbite.brand_summary(group) for brand, group in df.groupby("brand company")}
+
+
+def stage_lastbite_compact(ctx):
+    # The apps keep the compact frame, so check it against the float64 path every run
+    ctx["lastbite_compact"] = lastbite.compact(ctx["lastbite_df"])
+    errors = lastbite.compact_errors(ctx["lastbite_df"])
+    worst = max(errors, key=errors.get)
+    if errors[worst] > lastbite.COMPACT_RTOL:
+        raise AssertionError(f"compact Last Bite frame is off by {errors[worst]:.2e} in {worst!r}")
+
+
+def stage_projection_loop(ctx):
+    demand_summary = projection.summarize_demand(ctx["forecast_dates"])
+    rng = np.random.default_rng(0)
+    projection.project_stl_adjustment(demand_summary, 60000, 0.02, rng)
+    projection.project_oos_stl(demand_summary, 60000)
+    projection.project_so_qty(demand_summary, 0.02, rng)
+    projection.project_oos_rekap(ctx["supply_history"], ctx["oos_history"], ctx["forecast_dates"], 60000)
+    projection.project_oos_actual(
+        ctx["supply_history"], ctx["oos_history"], ctx["inbound"], ctx["outbound"],
+        ctx["forecast_dates"], 100000, 80000,
+    )
+
+
+def stage_hub_to_wh(ctx):
+    convert_hub_forecast(ctx["hub_forecast"], ctx["hub_map"], ctx["split_skus"])
+
+
+def stage_histogram(ctx):
+    df = poia.clean_scenarios(ctx["poia"])
+    poia.scenario_histograms(df, poia.histogram_bins(0, 100, 10))
+
+
+STAGES = [
+    ("load", stage_load),
+    ("merge", stage_merge),
+    ("doi_compute", stage_doi_compute),
+    ("lastbite_adjust", stage_lastbite_adjust),
+    ("lastbite_compact", stage_lastbite_compact),
+    ("projection_loop", stage_projection_loop),
+    ("hub_to_wh", stage_hub_to_wh),
+    ("histogram", stage_histogram),
+]
+
+
+def run_stages(paths, repeats=3, stages=None):
+    """Run every stage ``repeats`` times for timing, then once under tracemalloc."""
+    selected = [(name, fn) for name, fn in STAGES if stages is None or name in stages]
+    timings = {name: [] for name, _ in selected}
+    for _ in range(repeats):
+        ctx = {"paths": paths}
+        for name, fn in STAGES:
+            start = time.perf_counter()
+            fn(ctx)
+            if name in timings:
+                timings[name].append(time.perf_counter() - start)
+
+    peaks = {}
+    ctx = {"paths": paths}
+    tracemalloc.start()
+    try:
+        for name, fn in STAGES:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            fn(ctx)
+            _, peak = tracemalloc.get_traced_memory()
+            if name in timings:
+                peaks[name] = peak - base
+    finally:
+        tracemalloc.stop()
+
+    return {
+        name: {
+            "seconds_median": float(np.median(timings[name])),
+            "seconds_min": float(np.min(timings[name])),
+            "repeats": repeats,
+            "peak_mb": peaks[name] / 2**20,
+        }
+        for name, _ in selected
+    }
+
+
+def git_revision():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, dirty
+
+
+def benchmark(scale, seed=0, repeats=3, stages=None, data_dir=None):
+    data = synth.generate(**scale, seed=seed)
+    rows = {name: len(df) for name, df in data.items()}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = synth.write(data, data_dir or tmp)
+        del data
+        results = run_stages(paths, repeats=repeats, stages=stages)
+
+    commit, dirty = git_revision()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "scale": scale,
+        "seed": seed,
+        "rows": rows,
+        "stages": results,
+        "env": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        },
+    }
+
+
+def print_result(result):
+    scale = ", ".join(f"{k}={v}" for k, v in result["scale"].items())
+    print(f"commit {result['commit']}{' (dirty)' if result['dirty'] else ''}  [{scale}]")
+    print(f"{'stage':18s} {'median s':>10s} {'min s':>10s} {'peak MB':>10s}")
+    for name, stage in result["stages"].items():
+        print(f"{name:18s} {stage['seconds_median']:10.4f} {stage['seconds_min']:10.4f} {stage['peak_mb']:10.1f}")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    if old["scale"] != new["scale"] or old.get("seed") != new.get("seed"):
+        print("warning: results were produced at different scales/seeds")
+    print(f"{'stage':18s} {old['commit']:>12s} {new['commit']:>12s} {'time x':>8s} {'peak x':>8s}")
+    for name, stage in new["stages"].items():
+        if name not in old["stages"]:
+            continue
+        before = old["stages"][name]
+        time_ratio = stage["seconds_median"] / before["seconds_median"] if before["seconds_median"] else float("nan")
+        peak_ratio = stage["peak_mb"] / before["peak_mb"] if before["peak_mb"] else float("nan")
+        print(f"{name:18s} {before['seconds_median']:12.4f} {stage['seconds_median']:12.4f} {time_ratio:8.2f} {peak_ratio:8.2f}")
+
+
+def main(argv=None):
+    scale = synth.default_scale()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for key, value in scale.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=value)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--stage", action="append", choices=[name for name, _ in STAGES], help="only report these stages")
+    parser.add_argument("--data-dir", help="keep the generated inputs here instead of a temp dir")
+    parser.add_argument("--out", help="result JSON path (default: bench/results/<commit>-<skus>x<whs>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    scale = {key: getattr(args, key) for key in scale}
+    result = benchmark(scale, seed=args.seed, repeats=args.repeats, stages=args.stage, data_dir=args.data_dir)
+    print_result(result)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{result['commit']}-{scale['skus']}x{scale['whs']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
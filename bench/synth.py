@@ -0,0 +1,182 @@
+"""Synthetic inputs with the same schemas as the bundled and remote data.
+
+Scale is controlled by the number of SKUs, WHs, hubs and days::
+
+    python -m bench.synth --skus 20000 --whs 5 --hubs 30 --days 90 --out /tmp/synth
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+WH_IDS = [40, 160, 661, 772, 796]  # Locations known to the Last Bite forecast split
+HISTORY_END = pd.Timestamp("2025-04-10")
+FORECAST_START = pd.Timestamp("2025-02-28")
+
+BRANDS = ["Kino", "Astro", "Wings", "Indofood", "Mayora", "Unilever", "Nestle", "Dua Kelinci", "Garudafood", "Sido Muncul"]
+PRODUCT_TYPES = ["Fresh", "Frozen", "Dry"]
+PARETO = ["X", "A", "B", "C", "D"]
+DEMAND_TYPES = ["Stable", "Volatile", "Moderate"]
+L1 = ["Snack", "Beverages", "Dairy", "Fruits", "Vegetables", "Meat", "Household"]
+
+
+def default_scale():
+    return {"skus": 5000, "whs": 5, "hubs": 20, "days": 61, "hub_days": 7}
+
+
+def wh_ids(n):
+    # Real WH ids first so the forecast split applies, then made-up ones
+    return (WH_IDS + list(range(1000, 1000 + max(0, n - len(WH_IDS)))))[:n]
+
+
+def generate(skus=5000, whs=5, hubs=20, days=61, hub_days=7, seed=0):
+    """Return a dict of DataFrames keyed by dataset name."""
+    rng = np.random.default_rng(seed)
+    product_ids = np.sort(rng.choice(np.arange(1, skus * 4 + 1), size=skus, replace=False))
+    grams = rng.integers(50, 1000, skus)
+    names = ("Synthetic Product " + pd.Series(product_ids).astype(str) + " " + pd.Series(grams).astype(str) + " gram").to_numpy(dtype=object)
+    locations = np.array(wh_ids(whs))
+    hub_ids = np.arange(1, hubs + 1)
+
+    data = {}
+
+    # ---- Last Bite ----
+    occupancy = pd.DataFrame({
+        "Product ID": product_ids,
+        "Product Name": names,
+        "Brand Company": rng.choice(BRANDS, skus),
+        "Primary Vendor": rng.choice([f"PT Vendor {i}" for i in range(50)], skus),
+        "COGS": rng.integers(2000, 150000, skus),
+    })
+    occupancy["holding_cost"] = (occupancy["COGS"] * 0.05).round().astype(int)
+    data["occupancy"] = occupancy
+
+    forecast_daily = rng.gamma(1.2, 8.0, skus)
+    data["sales"] = pd.DataFrame({
+        "Product ID": product_ids,
+        "Forecast Step 3": forecast_daily * 30,
+        "Forecast Daily": forecast_daily,
+    })
+
+    soh_pid = np.repeat(product_ids, whs)
+    soh_loc = np.tile(locations, skus)
+    soh = pd.DataFrame({
+        "Product ID": soh_pid,
+        "Location ID": soh_loc,
+        "Sum of Stock": rng.poisson(np.repeat(forecast_daily, whs) * 25),
+    })
+    soh["DOI"] = soh["Sum of Stock"] / np.repeat(forecast_daily, whs)
+    data["soh"] = soh
+
+    # ---- Dynamic DOI ----
+    n = skus * whs
+    avg_demand = rng.gamma(1.5, 6.0, n).round(2)
+    avg_demand[rng.random(n) < 0.05] = 0
+    data["doi_database"] = pd.DataFrame({
+        "location_id": soh_loc,
+        "product_id": soh_pid,
+        "product_type_name": rng.choice(PRODUCT_TYPES, n),
+        "pareto": rng.choice(PARETO, n),
+        "demand_type": rng.choice(DEMAND_TYPES, n),
+        "lead_time": rng.uniform(1, 10, n).round(1),
+        "lead_time_std": rng.uniform(0, 3, n).round(2),
+        "avg_demand": avg_demand,
+        "std_demand": (avg_demand * rng.uniform(0.1, 1.2, n)).round(2),
+        "doi_policy": rng.uniform(3, 30, n).round(2),
+    })
+    resched_idx = rng.choice(n, size=n // 3, replace=False)
+    data["doi_reschedule"] = pd.DataFrame({
+        "wh_id": soh_loc[resched_idx],
+        "product_id": soh_pid[resched_idx],
+        "resched_count": rng.integers(0, 6, len(resched_idx)),
+        "total_inbound": rng.integers(1, 12, len(resched_idx)),
+    })
+
+    # ---- Projections ----
+    forecast_dates = pd.date_range(FORECAST_START, periods=max(days, 62), freq="D")
+    weekday = forecast_dates.dayofweek.to_numpy()
+    data["forecast_dates"] = pd.DataFrame({
+        "Date Key": forecast_dates,
+        "Forecast": 200000 * (1 + 0.08 * (weekday >= 5)) * rng.uniform(0.9, 1.1, len(forecast_dates)),
+    })
+
+    history = pd.date_range(end=HISTORY_END, periods=days, freq="D")
+    data["supply_history"] = pd.DataFrame({
+        "Date": history,
+        "KOS": rng.integers(85000, 110000, days),
+        "STL": rng.integers(50000, 90000, days),
+    })
+    data["oos_history"] = pd.DataFrame({
+        "Date Key": history,
+        "OOS%": rng.uniform(5, 14, days).round(2),
+    })
+    flow_dates = pd.date_range("2025-04-09", "2025-04-30", freq="D")
+    data["inbound"] = pd.DataFrame({"Date": flow_dates, "KOS": 95000, "STL": 75000})
+    data["outbound"] = pd.DataFrame({"Date": flow_dates, "KOS": 100000, "STL": 80000})
+    oos_wh_dates = pd.date_range("2025-03-26", periods=13, freq="D")
+    data["oos_wh"] = pd.DataFrame({
+        "Date": np.repeat(oos_wh_dates, whs),
+        "OOS Qty": rng.integers(0, 3000, len(oos_wh_dates) * whs),
+    })
+
+    # ---- Hub -> WH forecast conversion ----
+    hub_dates = pd.date_range("2025-05-01", periods=hub_days, freq="D")
+    rows = skus * hubs * hub_days
+    data["hub_forecast"] = pd.DataFrame({
+        "Date": np.repeat(hub_dates, skus * hubs),
+        "Product ID": np.tile(np.repeat(product_ids, hubs), hub_days),
+        "Product": np.tile(np.repeat(names, hubs), hub_days),
+        "Hub ID": np.tile(hub_ids, skus * hub_days),
+        "Forecast STEP 3": rng.gamma(1.0, 2.0, rows).round(3),
+    })
+    data["hub_map"] = pd.DataFrame({"Hub ID": hub_ids, "WH ID": rng.choice(locations, hubs)})
+    data["split_skus"] = pd.DataFrame({"product_id": rng.choice(product_ids, size=skus // 3, replace=False)})
+
+    # ---- POIA histogram ----
+    base = rng.gamma(1.0, 15.0, skus)
+    data["poia"] = pd.DataFrame({
+        "Product ID": product_ids,
+        "L1": rng.choice(L1, skus),
+        "product_type_name": rng.choice(PRODUCT_TYPES, skus),
+        "Option Current - Aggressive": base * 1.2,
+        "Option 1 - Moderate": base,
+        "Option 2 - Conservatives": base * 0.8,
+    })
+    return data
+
+
+# Workbooks that the apps read with pd.read_excel
+EXCEL_DATASETS = {"forecast_dates", "supply_history", "oos_history", "inbound", "outbound", "oos_wh"}
+
+
+def write(data, out_dir):
+    """Write datasets to ``out_dir`` (xlsx where the apps expect a workbook) and return their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for name, df in data.items():
+        if name in EXCEL_DATASETS:
+            paths[name] = os.path.join(out_dir, f"{name}.xlsx")
+            df.to_excel(paths[name], index=False)
+        else:
+            paths[name] = os.path.join(out_dir, f"{name}.csv")
+            df.to_csv(paths[name], index=False)
+    return paths
+
+
+def main(argv=None):
+    scale = default_scale()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for key, value in scale.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=value)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+
+    data = generate(**{key: getattr(args, key) for key in scale}, seed=args.seed)
+    for name, path in write(data, args.out).items():
+        print(f"{name:16s} {len(data[name]):>10,} rows  {path}")
+
+
+if __name__ == "__main__":
+    main()
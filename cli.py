@@ -0,0 +1,370 @@
+"""Run the projection and DOI engines over files without Streamlit.
+
+Examples::
+
+    python cli.py oos-stl --stl-supply 60000
+    python cli.py so-qty --target-oos 2 --seed 0
+    python cli.py oos-actual --supply supply.xlsx --oos oos.xlsx --kos 100000 --stl 80000
+    python cli.py oos-actual --kos 100000 --stl 80000 --opening-kos 60000 --opening-stl 20000
+    python cli.py oos-grid --workers 8
+    python cli.py oos-model --kos 105000 --stl 70000
+    python cli.py doi --data database.csv --resched reschedule.csv
+    python cli.py lastbite --soh soh.csv --forecast sales.csv --holding occupancy.csv --brand Kino
+    python cli.py sku-master --holding occupancy.csv
+    python cli.py hub-to-wh --forecast fc.xlsx --hub-map hub.xlsx --split-skus split.csv --out-dir out/
+    python cli.py precompute --watch 300 --at 05:30
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from core import sources
+from core import doi, lastbite, oosmodel, perf, precompute, projection, skumaster, store
+from core.forecast import convert_hub_forecast
+
+
+def _write(df, out):
+    if out == "-":
+        df.to_csv(sys.stdout, index=False)
+    else:
+        df.to_csv(out, index=False)
+        print(f"wrote {len(df)} rows to {out}", file=sys.stderr)
+
+
+def _opening_args(p):
+    # Opening DC stock of the stock-flow simulation over the inbound/outbound plans
+    default = "default: the last supply SO before the first projected day"
+    p.add_argument("--opening-kos", type=float, help=f"opening KOS DC stock ({default})")
+    p.add_argument("--opening-stl", type=float, help=f"opening STL DC stock ({default})")
+
+
+def cmd_stl_adjustment(args):
+    demand_summary = projection.summarize_demand(sources.load_demand_forecast(args.forecast))
+    rng = np.random.default_rng(args.seed)
+    df_oos_target, df_oos_supply = projection.project_stl_adjustment(demand_summary, args.stl_supply, args.target_oos / 100, rng)
+    _write(df_oos_target.merge(df_oos_supply, on="Date"), args.out)
+
+
+def cmd_stl_bands(args):
+    demand_summary = projection.summarize_demand(sources.load_demand_forecast(args.forecast))
+    df = projection.simulate_stl_adjustment(
+        demand_summary, args.stl_supply, args.target_oos / 100,
+        paths=args.paths, seed=args.seed, workers=args.workers,
+    )
+    _write(df, args.out)
+
+
+def cmd_oos_stl(args):
+    demand_summary = projection.summarize_demand(sources.load_demand_forecast(args.forecast))
+    _write(projection.project_oos_stl(demand_summary, args.stl_supply), args.out)
+
+
+def cmd_so_qty(args):
+    demand_summary = projection.summarize_demand(sources.load_demand_forecast(args.forecast))
+    rng = np.random.default_rng(args.seed)
+    _write(projection.project_so_qty(demand_summary, args.target_oos / 100, rng), args.out)
+
+
+def cmd_solve_stl(args):
+    demand_summary = projection.summarize_demand(sources.load_demand_forecast(args.forecast))
+    targets = np.asarray(args.target_oos, dtype=float)
+    if args.per == "day":
+        supply = projection.solve_stl_supply(demand_summary, targets[:, None], per="day", lo=args.lo, hi=args.hi)
+        df = pd.DataFrame(supply.T, columns=[f"Target {t:g}%" for t in targets])
+        df.insert(0, "Date", projection.target_dates().strftime("%d %b %Y"))
+    else:
+        supply = projection.solve_stl_supply(demand_summary, targets, per="horizon", lo=args.lo, hi=args.hi)
+        df = pd.DataFrame({"Target OOS%": targets, "Min STL SO": supply})
+    _write(df, args.out)
+
+
+def _history(args):
+    # Supply / OOS% history from the given files, or from the history store
+    supply = sources.read_table(args.supply) if args.supply else store.read_supply()
+    oos = sources.read_table(args.oos) if args.oos else store.read_oos()
+    if supply.empty or oos.empty:
+        sys.exit("No supply/OOS% history: pass --supply and --oos or run `ingest` first")
+    return supply, oos
+
+
+def cmd_ingest(args):
+    if args.supply:
+        print(f"supply: {store.ingest_supply(sources.read_table(args.supply))} new/changed rows", file=sys.stderr)
+    if args.oos:
+        print(f"oos: {store.ingest_oos(sources.read_table(args.oos))} new/changed rows", file=sys.stderr)
+    for kind, (last_date, version) in sorted(store.watermarks().items()):
+        print(f"{kind}: stored until {last_date:%Y-%m-%d} (version {version})", file=sys.stderr)
+
+
+def cmd_rekap(args):
+    df = projection.project_oos_rekap(
+        *_history(args),
+        sources.load_demand_forecast(args.forecast), args.stl_supply,
+    )
+    _write(df, args.out)
+
+
+def cmd_oos_actual(args):
+    df = projection.project_oos_actual(
+        *_history(args),
+        sources.read_table(args.inbound), sources.read_table(args.outbound),
+        sources.load_demand_forecast(args.forecast), args.kos, args.stl,
+        args.opening_kos, args.opening_stl,
+    )
+    _write(df, args.out)
+
+
+def cmd_oos_grid(args):
+    prepared = projection.prepare_oos_actual(
+        *_history(args), sources.load_demand_forecast(args.forecast),
+        sources.read_table(args.inbound), sources.read_table(args.outbound),
+    )
+    kos_values = np.arange(args.kos[0], args.kos[1] + 1, args.kos[2])
+    stl_values = np.arange(args.stl[0], args.stl[1] + 1, args.stl[2])
+    avg_oos, peak_oos = projection.oos_actual_surface(
+        prepared, kos_values, stl_values, workers=args.workers, opening_kos=args.opening_kos, opening_stl=args.opening_stl,
+    )
+    grid = pd.DataFrame({
+        "KOS SO": np.repeat(kos_values, len(stl_values)),
+        "STL SO": np.tile(stl_values, len(kos_values)),
+        "Avg Projected OOS%": avg_oos.ravel(),
+        "Peak Projected OOS%": peak_oos.ravel(),
+    })
+    _write(grid, args.out)
+
+
+def cmd_oos_model(args):
+    supply, oos = _history(args)
+    demand_forecast = sources.load_demand_forecast(args.forecast)
+    model = oosmodel.fit(supply, oos, demand_forecast)
+    if model is None:
+        sys.exit(f"Need at least {oosmodel.MIN_ROWS} days with OOS% and the day before's supply")
+    print(f"{model['rows']} days, alpha {model['alpha']:.3g}, leave-one-out RMSE {model['loo_rmse'] * 100:.2f} pp", file=sys.stderr)
+    print(oosmodel.coefficients(model).to_string(index=False), file=sys.stderr)
+    prepared = projection.prepare_oos_actual(supply, oos, demand_forecast, sources.read_table(args.inbound), sources.read_table(args.outbound))
+    projected, kos_stock, stl_stock = projection.evaluate_oos_actual(prepared, args.kos, args.stl, args.opening_kos, args.opening_stl)
+    _write(pd.DataFrame({
+        "Date": prepared["dates"].strftime("%d %b %Y"),
+        "KOS SO Qty": kos_stock,
+        "STL SO Qty": stl_stock,
+        "Projected OOS%": projected,
+        "Model OOS%": oosmodel.project(model, prepared, args.kos, args.stl, args.opening_kos, args.opening_stl),
+    }), args.out)
+
+
+def cmd_oos_wh(args):
+    _write(projection.project_oos_wh(sources.read_table(args.oos_wh)), args.out)
+
+
+def cmd_doi(args):
+    data_df, resched_df = sources.load_doi_sources(args.data, args.resched)
+    params = doi.default_doi_params()
+    for key in ("ks", "kr", "kp"):
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    merged, report = doi.merge_reschedule(data_df, resched_df, report=True)
+    print(f"reschedule matched {report['matched_rows']} of {report['rows']} rows, "
+          f"{len(report['orphan_reschedule'])} reschedule keys not in the database", file=sys.stderr)
+    merged = doi.compute_final_doi(merged, params)
+    _write(doi.doi_preview(merged), args.out)
+
+
+def cmd_lastbite(args):
+    df = lastbite.prepare_lastbite(*sources.load_lastbite_sources(args.soh, args.forecast, args.holding))
+    if args.brand:
+        df = df[df['brand company'] == args.brand]
+    if args.sku is not None:
+        df = df[df['product id'] == args.sku]
+    if args.location is not None:
+        df = df[df['location id'] == args.location]
+    df = lastbite.compute_adjustments(df, args.doi_ideal)
+    _write(lastbite.brand_table(df), args.out)
+
+
+def cmd_sku_master(args):
+    master = skumaster.ensure(sources.read_table(args.holding), args.path)
+    print(f"SKU master {master['version']}: {len(master['ids'])} SKUs, "
+          f"columns {', '.join(master['columns'])} in {args.path or sources.SKU_MASTER_PATH}", file=sys.stderr)
+
+
+def cmd_hub_to_wh(args):
+    result = convert_hub_forecast(
+        sources.read_table(args.forecast), sources.read_table(args.hub_map), sources.read_table(args.split_skus),
+    )
+    os.makedirs(args.out_dir, exist_ok=True)
+    _write(result["final_df"], os.path.join(args.out_dir, "ForecastSTEP3_by_WH.csv"))
+    _write(result["summary_df"], os.path.join(args.out_dir, "summary_forecast_by_WHID.csv"))
+    _write(result["missing_skus"], os.path.join(args.out_dir, "missing_split_skus.csv"))
+
+
+def _log_artifact(record):
+    detail = f" {record['rows']} rows in {record['seconds']:.2f}s ({record['key']})" if record["status"] == "written" else ""
+    print(f"{record['job']}: {record['status']}{detail}", file=sys.stderr)
+
+
+def cmd_precompute(args):
+    if args.watch:
+        try:
+            precompute.watch(args.watch, args.at, args.job, log=_log_artifact)
+        except KeyboardInterrupt:
+            pass
+    else:
+        precompute.run(args.job, force=args.force, log=_log_artifact)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("stl-adjustment", help="STL supply / target OOS adjustment (app.py)")
+    p.add_argument("--stl-supply", type=float, default=40000)
+    p.add_argument("--target-oos", type=float, default=2.0, help="target OOS in percent")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--out", default="stl_adjustment.csv")
+    p.set_defaults(func=cmd_stl_adjustment)
+
+    p = sub.add_parser("stl-bands", help="Monte Carlo P10/P50/P90 of the target-OOS quantities (app.py)")
+    p.add_argument("--stl-supply", type=float, default=40000)
+    p.add_argument("--target-oos", type=float, default=2.0, help="target OOS in percent")
+    p.add_argument("--paths", type=int, default=10000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workers", type=int, help="process pool size (default: one per shard, up to the core count)")
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--out", default="stl_bands.csv")
+    p.set_defaults(func=cmd_stl_bands)
+
+    p = sub.add_parser("oos-stl", help="OOS%% projection for an STL supply (oos_projection.py)")
+    p.add_argument("--stl-supply", type=float, default=40000)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--out", default="oos_target.csv")
+    p.set_defaults(func=cmd_oos_stl)
+
+    p = sub.add_parser("so-qty", help="SO qty needed for a target OOS%% (so_qty.py)")
+    p.add_argument("--target-oos", type=float, default=2.0, help="target OOS in percent")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--out", default="oos_supply.csv")
+    p.set_defaults(func=cmd_so_qty)
+
+    p = sub.add_parser("solve-stl", help="Minimum STL supply for target OOS%% (inverse of oos-stl)")
+    p.add_argument("--target-oos", type=float, nargs="+", default=[6.0], help="one or more targets in percent")
+    p.add_argument("--per", choices=["day", "horizon"], default="day")
+    p.add_argument("--lo", type=float, default=40000)
+    p.add_argument("--hi", type=float, default=110000)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--out", default="min_stl_supply.csv")
+    p.set_defaults(func=cmd_solve_stl)
+
+    p = sub.add_parser("ingest", help="Upsert supply SO / OOS%% history files into the history store")
+    p.add_argument("--supply")
+    p.add_argument("--oos")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("rekap", help="OOS%% projection from historical supply and OOS (rekap.py)")
+    p.add_argument("--supply", help="historical supply SO file (default: the history store)")
+    p.add_argument("--oos", help="historical OOS%% file (default: the history store)")
+    p.add_argument("--stl-supply", type=float, default=40000)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--out", default="so_rekap.csv")
+    p.set_defaults(func=cmd_rekap)
+
+    p = sub.add_parser("oos-actual", help="OOS%% projection with actual SO (projected_oos_actual.py)")
+    p.add_argument("--supply", help="historical supply SO file (default: the history store)")
+    p.add_argument("--oos", help="historical OOS%% file (default: the history store)")
+    p.add_argument("--kos", type=float, default=100000)
+    p.add_argument("--stl", type=float, default=80000)
+    p.add_argument("--inbound", default=sources.INBOUND_PATH)
+    p.add_argument("--outbound", default=sources.OUTBOUND_PATH)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    _opening_args(p)
+    p.add_argument("--out", default="oos_projection.csv")
+    p.set_defaults(func=cmd_oos_actual)
+
+    p = sub.add_parser("oos-grid", help="Avg/peak OOS%% for every KOS x STL SO pair (projected_oos_actual.py)")
+    p.add_argument("--supply", help="historical supply SO file (default: the history store)")
+    p.add_argument("--oos", help="historical OOS%% file (default: the history store)")
+    p.add_argument("--kos", type=float, nargs=3, default=[90000, 110000, 5000], metavar=("START", "END", "STEP"))
+    p.add_argument("--stl", type=float, nargs=3, default=[60000, 120000, 5000], metavar=("START", "END", "STEP"))
+    p.add_argument("--workers", type=int, help="process pool size (default: one per KOS value, up to the core count)")
+    p.add_argument("--inbound", default=sources.INBOUND_PATH)
+    p.add_argument("--outbound", default=sources.OUTBOUND_PATH)
+    _opening_args(p)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--out", default="oos_grid.csv")
+    p.set_defaults(func=cmd_oos_grid)
+
+    p = sub.add_parser("oos-model", help="Ridge OOS%% model fitted on the history, next to oos-actual (core.oosmodel)")
+    p.add_argument("--supply", help="historical supply SO file (default: the history store)")
+    p.add_argument("--oos", help="historical OOS%% file (default: the history store)")
+    p.add_argument("--kos", type=float, default=100000)
+    p.add_argument("--stl", type=float, default=80000)
+    p.add_argument("--forecast", default=sources.FORECAST_PATH)
+    p.add_argument("--inbound", default=sources.INBOUND_PATH)
+    p.add_argument("--outbound", default=sources.OUTBOUND_PATH)
+    _opening_args(p)
+    p.add_argument("--out", default="oos_model.csv")
+    p.set_defaults(func=cmd_oos_model)
+
+    p = sub.add_parser("oos-wh", help="OOS projection with OOS WH qty (oosfixed.py)")
+    p.add_argument("--oos-wh", required=True)
+    p.add_argument("--out", default="oos_wh_projection.csv")
+    p.set_defaults(func=cmd_oos_wh)
+
+    p = sub.add_parser("doi", help="Dynamic DOI with default parameters (dynamic_doiwh.py)")
+    p.add_argument("--data", default=sources.DATA_URL)
+    p.add_argument("--resched", default=sources.RESCHED_URL)
+    p.add_argument("--ks", type=float)
+    p.add_argument("--kr", type=float)
+    p.add_argument("--kp", type=float)
+    p.add_argument("--out", default="refined_doi_output.csv")
+    p.set_defaults(func=cmd_doi)
+
+    p = sub.add_parser("lastbite", help="Last Bite stock adjustments (lastbite.py)")
+    p.add_argument("--soh", default=sources.SOH_CSV_URL)
+    p.add_argument("--forecast", default=sources.FC_CSV_URL)
+    p.add_argument("--holding", default=sources.HOLDING_COST_CSV_URL)
+    p.add_argument("--doi-ideal", type=float, default=30.0)
+    p.add_argument("--brand")
+    p.add_argument("--sku", type=int)
+    p.add_argument("--location", type=int)
+    p.add_argument("--out", default="lastbite_adjustment.csv")
+    p.set_defaults(func=cmd_lastbite)
+
+    p = sub.add_parser("sku-master", help="Build the memory-mapped SKU master from occupancy.csv")
+    p.add_argument("--holding", default=sources.HOLDING_COST_CSV_URL)
+    p.add_argument("--path", help=f"master directory (default: {sources.SKU_MASTER_PATH})")
+    p.set_defaults(func=cmd_sku_master)
+
+    p = sub.add_parser("hub-to-wh", help="Convert hub forecast to WH forecast (pgssrg.py)")
+    p.add_argument("--forecast", required=True)
+    p.add_argument("--hub-map", required=True)
+    p.add_argument("--split-skus", required=True)
+    p.add_argument("--out-dir", default=".")
+    p.set_defaults(func=cmd_hub_to_wh)
+
+    p = sub.add_parser("precompute", help="Compute the apps' default outputs into Parquet artifacts (core.precompute)")
+    p.add_argument("--job", action="append", choices=list(precompute.JOBS), help="only these jobs (default: all)")
+    p.add_argument("--force", action="store_true", help="recompute artifacts that already exist")
+    p.add_argument("--watch", type=float, metavar="SECONDS", help="keep running, checking local sources every SECONDS")
+    p.add_argument("--at", metavar="HH:MM", help="with --watch, download the remote sheets daily at this time")
+    p.set_defaults(func=cmd_precompute)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    perf.begin(f"cli {args.command}")  # Spans go to KOANDRA_PERF_LOG when KOANDRA_PERF=1
+    try:
+        with perf.span("command"):
+            args.func(args)
+    finally:
+        perf.finish()
+
+
+if __name__ == "__main__":
+    main()
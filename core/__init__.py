@@ -0,0 +1,6 @@
+"""Headless engines behind the Streamlit apps.
+
+Nothing in this package imports streamlit, so the projections, DOI and
+Last Bite calculations can be used from batch jobs, the CLI (``cli.py``)
+or other apps without starting a Streamlit session.
+"""
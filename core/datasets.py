@@ -0,0 +1,196 @@
+"""Process-wide registry of the read-only datasets the apps share.
+
+Each dataset is loaded once per server process with ``st.cache_resource``,
+so every session and every page of the multipage app (``Home.py``) holds
+the same frames instead of its own copy. Callers get per-session views:
+
+    df = datasets.lastbite_frame([772])
+    merged, report = datasets.doi_merged([772, 40])
+
+A view is ``df.copy(deep=False)``; with pandas copy-on-write, adding or
+overwriting columns on it copies only what is written and never touches
+the shared frame.
+
+The Last Bite and DOI sheets are whole-network CSVs. They are fetched on
+refresh and written once to location-partitioned Parquet (``core.lake``),
+and only dataset versions are kept in memory. Views then read just the
+warehouses they show, so memory and load time follow the selection, not
+the network. An SOH refresh is ingested as a delta (``core.delta``), and
+the Last Bite frames already prepared are patched with it rather than
+rebuilt. Streamlit-only: the CLI and bench read through ``core.sources``
+directly.
+"""
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from core import delta, doi, lake, lastbite, precompute, skumaster, sources
+
+MAX_LASTBITE_FRAMES = 32  # prepared frames kept, one per warehouse selection
+MAX_SOH_DELTAS = 48       # SOH refreshes a kept frame can be patched across
+
+
+# pandas < 3 writes through shallow copies, so views there are real copies
+_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+
+def view(df):
+    return df.copy(deep=not _COPY_ON_WRITE)
+
+
+def _locations_key(locations):
+    return None if locations is None else tuple(sorted(int(v) for v in locations))
+
+
+@st.cache_resource(show_spinner=False)
+def _lastbite_state():
+    # Prepared frames by (locations, forecast, master) -> {"soh", "frame", "pickers"},
+    # and the SOH deltas that move a frame from one version to the next
+    return {"lock": threading.Lock(), "frames": {}, "deltas": {}, "log": []}
+
+
+@st.cache_resource(ttl=3600, show_spinner="Loading SOH, sales and occupancy...")
+def _lastbite_lake(soh_url, fc_url, holding_url):
+    soh_df, fc_df, holding_df = sources.load_lastbite_sources(soh_url, fc_url, holding_url)
+    soh_version, changes = delta.ingest(soh_df)
+    if changes is not None:
+        state = _lastbite_state()
+        with state["lock"]:
+            state["deltas"][changes["from_version"]] = changes
+            for stale in list(state["deltas"])[:-MAX_SOH_DELTAS]:
+                del state["deltas"][stale]
+            state["log"] = [changes["log"]] + state["log"][:MAX_SOH_DELTAS - 1]
+    return {
+        "soh": soh_version,
+        "forecast": lake.ensure("forecast", fc_df, sort="product id"),
+        "master": skumaster.ensure(holding_df),
+    }
+
+
+def _read_lastbite(versions, soh_df):
+    fc_df = lake.read("forecast", versions["forecast"], columns=lastbite.FORECAST_COLUMNS, product_ids=soh_df["product id"])
+    return lastbite.compact(lastbite.prepare_lastbite(soh_df, fc_df, versions["master"]))
+
+
+def _patch_lastbite(df, changes, versions, locations):
+    def scoped(frame):
+        return frame if locations is None else frame[frame["location id"].isin(locations)]
+
+    added = scoped(changes["added"])
+    if len(added):
+        added = _read_lastbite(versions, added[lastbite.SOH_COLUMNS])
+    return lastbite.apply_soh_changes(df, scoped(changes["changed"]), scoped(changes["removed"]), added)
+
+
+@st.cache_resource(ttl=86400, show_spinner="Loading DOI sheets...")
+def _doi_lake(data_url, resched_url):
+    return precompute.doi_versions(data_url, resched_url)
+
+
+@st.cache_resource(max_entries=32, show_spinner="Joining reschedule counts...")
+def _doi_merged(data_version, resched_version, locations):
+    data_df = lake.read("doi_database", data_version, locations=locations)
+    resched_df = lake.read("doi_reschedule", resched_version, locations=locations)
+    return doi.merge_reschedule(data_df, resched_df, report=True)
+
+
+@st.cache_resource(show_spinner=False)
+def _flows(inbound_path, outbound_path, version):
+    return pd.read_excel(inbound_path), pd.read_excel(outbound_path)
+
+
+def lastbite_locations():
+    """Warehouses in the SOH sheet (refreshed hourly), from the partition names."""
+    versions = _lastbite_lake(sources.SOH_CSV_URL, sources.FC_CSV_URL, sources.HOLDING_COST_CSV_URL)
+    return lake.locations("soh", versions["soh"])
+
+
+def _lastbite_entry(locations):
+    versions = _lastbite_lake(sources.SOH_CSV_URL, sources.FC_CSV_URL, sources.HOLDING_COST_CSV_URL)
+    key = (locations, versions["forecast"], versions["master"]["version"])
+    state = _lastbite_state()
+    with state["lock"]:
+        entry = state["frames"].get(key)
+        if entry is not None and entry["soh"] == versions["soh"]:
+            state["frames"][key] = state["frames"].pop(key)  # most recently used goes last
+            return entry
+        version, frame = (entry["soh"], entry["frame"]) if entry is not None else (None, None)
+        chain = []
+        while frame is not None and version != versions["soh"]:
+            changes = state["deltas"].get(version)
+            if changes is None:
+                frame = None
+            else:
+                chain.append(changes)
+                version = changes["to_version"]
+
+    if frame is None:
+        with st.spinner("Reading warehouse stock..."):
+            frame = _read_lastbite(versions, lake.read("soh", versions["soh"], columns=lastbite.SOH_COLUMNS, locations=locations))
+    for changes in chain:
+        frame = _patch_lastbite(frame, changes, versions, locations)
+
+    entry = {"soh": versions["soh"], "frame": frame, "pickers": None}
+    with state["lock"]:
+        state["frames"].pop(key, None)
+        state["frames"][key] = entry
+        for stale in list(state["frames"])[:-MAX_LASTBITE_FRAMES]:
+            del state["frames"][stale]
+    return entry
+
+
+def lastbite_frame(locations=None):
+    """Prepared Last Bite frame (``lastbite.prepare_lastbite``) for ``locations`` (``None`` = all).
+
+    A frame prepared for an earlier SOH pull is patched with the deltas
+    since then, so a refresh costs what changed rather than a rebuild.
+    """
+    return view(_lastbite_entry(_locations_key(locations))["frame"])
+
+
+def lastbite_data(locations=None):
+    """``lastbite_frame(locations)`` and its picker index (``lastbite.picker_index``), from the same pull."""
+    entry = _lastbite_entry(_locations_key(locations))
+    if entry["pickers"] is None:
+        entry["pickers"] = lastbite.picker_index(entry["frame"])
+    return view(entry["frame"]), entry["pickers"]
+
+
+def soh_changes(locations=None):
+    """SOH change log of the refreshes seen by this process, newest first (see ``core.delta``)."""
+    state = _lastbite_state()
+    with state["lock"]:
+        logs = list(state["log"])
+    log = pd.concat(logs, ignore_index=True) if logs else pd.DataFrame(columns=["product id", "location id", "change", "soh_old", "soh_new", "at"])
+    if locations is not None:
+        log = log[log["location id"].isin(list(locations))]
+    return log
+
+
+def sku_master():
+    """Memory-mapped SKU master of the current occupancy sheet (see ``core.skumaster``)."""
+    return _lastbite_lake(sources.SOH_CSV_URL, sources.FC_CSV_URL, sources.HOLDING_COST_CSV_URL)["master"]
+
+
+def doi_locations():
+    """Warehouses in the DOI database sheet (refreshed daily)."""
+    return lake.locations("doi_database", _doi_lake(sources.DATA_URL, sources.RESCHED_URL)["database"])
+
+
+def doi_versions():
+    """Lake versions of the DOI sheets this process serves (see ``precompute.doi_versions``)."""
+    return _doi_lake(sources.DATA_URL, sources.RESCHED_URL)
+
+
+def doi_merged(locations=None):
+    """DOI database rows of ``locations`` with reschedule counts attached, plus the join report (see ``doi.merge_reschedule``)."""
+    versions = _doi_lake(sources.DATA_URL, sources.RESCHED_URL)
+    merged, report = _doi_merged(versions["database"], versions["reschedule"], _locations_key(locations))
+    return view(merged), report
+
+
+def flows():
+    """Inbound and outbound workbooks, reloaded when either file changes."""
+    version = precompute.flows_source_version(sources.INBOUND_PATH, sources.OUTBOUND_PATH)
+    return tuple(view(df) for df in _flows(sources.INBOUND_PATH, sources.OUTBOUND_PATH, version))
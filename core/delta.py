@@ -0,0 +1,94 @@
+"""Delta ingest of SOH snapshots.
+
+The SOH sheet is pulled several times a day, but only some SKU x location
+stock values move between pulls. ``ingest`` compares a new snapshot with
+the stored one (``core.lake`` dataset ``"soh"``) by (product id,
+location id) key and row hash. It rewrites only the partitions where
+something changed and returns the difference:
+
+    version, changes = delta.ingest(soh_df)
+    changes["changed"]    # keys with the new row values
+    changes["added"]      # new rows
+    changes["removed"]    # keys no longer in the sheet
+    changes["log"]        # product id, location id, change, soh_old, soh_new
+
+``changes`` is ``None`` on the first ingest, when nothing changed, or when
+the snapshots can't be compared row by row (duplicate keys or a different
+set of columns). In those cases the whole dataset was written.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from core import lake, skumaster
+
+NAME = "soh"
+KEYS = ["product id", "location id"]
+STOCK = "sum of stock"
+
+
+def row_hashes(df, columns):
+    """One uint64 per row over ``columns``; numbers compare by value, everything else as text."""
+    canonical = pd.DataFrame({
+        col: df[col].to_numpy(dtype=float) if pd.api.types.is_numeric_dtype(df[col]) else df[col].astype(str).to_numpy(dtype=object)
+        for col in columns
+    })
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+def diff(previous, current, keys=KEYS):
+    """Rows of ``current`` that changed or are new against ``previous``, and keys that went away."""
+    columns = [col for col in current.columns if col not in keys]
+    old = previous[keys].assign(_hash=row_hashes(previous, columns), _row=np.arange(len(previous)))
+    new = current[keys].assign(_hash=row_hashes(current, columns), _row=np.arange(len(current)))
+    joined = old.merge(new, on=keys, how="outer", suffixes=("_old", "_new"), indicator=True)
+
+    both = joined["_merge"] == "both"
+    changed = joined[both & (joined["_hash_old"] != joined["_hash_new"])]
+    added = joined[joined["_merge"] == "right_only"]
+    removed = joined[joined["_merge"] == "left_only"]
+
+    def old_rows(part):
+        return previous.iloc[part["_row_old"].astype(np.int64).to_numpy()].reset_index(drop=True)
+
+    def new_rows(part):
+        return current.iloc[part["_row_new"].astype(np.int64).to_numpy()].reset_index(drop=True)
+
+    changed_old, changed_new = old_rows(changed), new_rows(changed)
+    added, removed = new_rows(added), old_rows(removed)
+    log = pd.concat([
+        changed_new[keys].assign(change="changed", soh_old=changed_old[STOCK].to_numpy(), soh_new=changed_new[STOCK].to_numpy()),
+        added[keys].assign(change="added", soh_old=np.nan, soh_new=added[STOCK].to_numpy()),
+        removed[keys].assign(change="removed", soh_old=removed[STOCK].to_numpy(), soh_new=np.nan),
+    ], ignore_index=True)
+    return {"changed": changed_new, "added": added, "removed": removed[keys], "log": log}
+
+
+def ingest(soh_df, path=None):
+    """Store ``soh_df`` as the current SOH snapshot; returns ``(version, changes or None)``."""
+    version = skumaster.content_version(soh_df)
+    base = lake.current_version(NAME, path)
+    if base == version:
+        return version, None
+    current = lake.normalize(soh_df, partition=KEYS[1], sort=KEYS[0])
+    if base is None or current.duplicated(KEYS).any():
+        lake.write(NAME, soh_df, KEYS[1], KEYS[0], path, version)
+        return version, None
+
+    previous = lake.read(NAME, base, path=path)
+    if set(previous.columns) != set(current.columns) or previous.duplicated(KEYS).any():
+        lake.write(NAME, soh_df, KEYS[1], KEYS[0], path, version)
+        return version, None
+
+    changes = diff(previous[list(current.columns)], current)
+    touched = pd.concat([changes["changed"][KEYS[1]], changes["added"][KEYS[1]], changes["removed"][KEYS[1]]]).unique()
+    lake.write(NAME, soh_df, KEYS[1], KEYS[0], path, version, base=base, locations=touched)
+    changes.update({
+        "from_version": base,
+        "to_version": version,
+        "at": datetime.now(timezone.utc),
+        "locations": sorted(int(v) for v in touched),
+    })
+    changes["log"]["at"] = changes["at"]
+    return version, changes
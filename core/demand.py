@@ -0,0 +1,75 @@
+"""Daily demand aggregates of ``forecast dates.xlsx``, materialized once per file version.
+
+Every projection app used to read the forecast workbook and redo the same
+``groupby("Date Key")`` reductions on each rerun. ``aggregates()`` does it
+once per version of the file (path, mtime, size) for the whole process and
+hands every caller the same dict of read-only arrays:
+
+    agg = demand.aggregates()
+    agg["dates"], agg["daily"], agg["normalized"]   # one entry per forecast date
+    agg["kos"], agg["stl"]                          # daily totals split by supply share
+    agg["row_max"], agg["row_mean"]                 # over the raw forecast rows
+
+Saving a new forecast file changes its version, so the next call rebuilds.
+The projection functions accept this dict wherever they take the raw
+forecast frame.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core import sources
+from core.projection import KOS_SHARE, STL_SHARE
+
+ROLLING_DAYS = 7
+
+_lock = threading.Lock()
+_cache = {}  # path -> (version, aggregates)
+
+
+def source_version(path=sources.FORECAST_PATH):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _frozen(values):
+    values = np.asarray(values)
+    values.flags.writeable = False
+    return values
+
+
+def build(demand_forecast, version=None):
+    """Aggregates of a forecast frame (``Date Key``, ``Forecast``)."""
+    forecast = pd.to_numeric(demand_forecast["Forecast"], errors="coerce")
+    daily = forecast.groupby(pd.to_datetime(demand_forecast["Date Key"])).sum()
+    rolling = daily.rolling(ROLLING_DAYS, min_periods=1)
+    return {
+        "version": version,
+        "dates": _frozen(daily.index.to_numpy()),
+        "daily": _frozen(daily.to_numpy(dtype=float)),
+        "normalized": _frozen((daily / daily.max()).to_numpy(dtype=float)),
+        "rolling_mean": _frozen(rolling.mean().to_numpy(dtype=float)),
+        "rolling_std": _frozen(rolling.std().to_numpy(dtype=float)),
+        "kos": _frozen(daily.to_numpy(dtype=float) * KOS_SHARE),
+        "stl": _frozen(daily.to_numpy(dtype=float) * STL_SHARE),
+        "daily_max": float(daily.max()),
+        "daily_mean": float(daily.mean()),
+        "row_max": float(forecast.max()),
+        "row_mean": float(forecast.mean()),
+    }
+
+
+def aggregates(path=sources.FORECAST_PATH):
+    """Aggregates of the forecast file at ``path``, rebuilt only when the file changes."""
+    version = source_version(path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    agg = build(sources.load_demand_forecast(path), version)
+    with _lock:
+        _cache[path] = (version, agg)
+    return agg
+
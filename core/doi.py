@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ["lead_time", "lead_time_std", "avg_demand", "std_demand", "resched_count", "total_inbound", "doi_policy"]
+PREVIEW_COLUMNS = ["location_id", "product_id", "product_type_name", "pareto", "demand_type", "doi_policy", "final_doi"]
+SWEEP_CELLS = 4_000_000  # combinations x rows evaluated per broadcast in doi_sweep
+
+
+def default_doi_params():
+    """DOI model parameters as the Dynamic DOI Calculator sets them by default."""
+    return {
+        "include_safety": True,
+        "include_reschedule": True,
+        "include_pareto": True,
+        "include_multiplier": True,
+        "selected_pareto": ["X", "A"],
+        "selected_demand": ["Volatile"],
+        "selected_product_types": ["Fresh", "Frozen", "Dry"],
+        "ks": 0.5,
+        "kr": 0.5,
+        "kp": 0.5,
+        # "C and Others" is what the app writes; the lookup itself uses "C"
+        "pareto_weight": {"X": 1.0, "A": 1.0, "B": 0.75, "C": 0, "C and Others": 0.5},
+        "product_type_scaler": {"Fresh": 1.1, "Frozen": 1.05, "Dry": 1.0},
+    }
+
+
+def standardize_columns(df):
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+    return df
+
+
+def int_ids(values):
+    """Ids as int64 plus a mask of the values that are whole numbers (the rest never match)."""
+    numeric = pd.to_numeric(values, errors="coerce")
+    if pd.api.types.is_integer_dtype(numeric):
+        return numeric.to_numpy(dtype=np.int64), np.ones(len(numeric), dtype=bool)
+    numeric = numeric.to_numpy(dtype=float)
+    valid = ~np.isnan(numeric) & (numeric == np.floor(numeric))
+    return np.where(valid, numeric, 0).astype(np.int64), valid
+
+
+def composite_keys(locations, products, valid):
+    """One sortable int64 per (location_id, product_id) pair; invalid pairs get 0.
+
+    Pairs are packed as ``location * span + product``; ids too far apart to
+    fit in 63 bits are ranked with ``pd.factorize`` instead.
+    """
+    keys = np.zeros(len(locations), dtype=np.int64)
+    loc, pid = locations[valid], products[valid]
+    if not len(loc):
+        return keys
+    loc_min, pid_min = int(loc.min()), int(pid.min())
+    span = int(pid.max()) - pid_min + 1
+    if (int(loc.max()) - loc_min + 1) * span < 2**63:
+        keys[valid] = (loc - loc_min) * span + (pid - pid_min)
+    else:
+        keys[valid] = pd.factorize(pd.MultiIndex.from_arrays([loc, pid]), sort=True)[0]
+    return keys
+
+
+def sorted_left_join(left_keys, left_valid, right_keys, right_valid):
+    """Row pairs of a left join on int64 keys, using the right side sorted once.
+
+    Returns ``(left_rows, right_rows)``; like ``merge`` a left row repeats
+    for every right row with its key, and ``right_rows`` is -1 where there
+    is none.
+    """
+    candidates = np.flatnonzero(right_valid)
+    order = candidates[np.argsort(right_keys[candidates], kind="stable")]
+    sorted_keys = right_keys[order]
+    first = np.searchsorted(sorted_keys, left_keys, side="left")
+    counts = np.where(left_valid, np.searchsorted(sorted_keys, left_keys, side="right") - first, 0)
+
+    repeats = np.maximum(counts, 1)
+    left_rows = np.repeat(np.arange(len(left_keys)), repeats)
+    within = np.arange(len(left_rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    right_rows = np.full(len(left_rows), -1)
+    matched = np.repeat(counts > 0, repeats)
+    right_rows[matched] = order[first[left_rows[matched]] + within[matched]]
+    return left_rows, right_rows
+
+
+def merge_reschedule(data_df, resched_df, report=False):
+    """Attach reschedule counts to the DOI database and coerce numeric columns.
+
+    Ids are normalized to int64 once and joined on a sorted composite
+    (location_id, product_id) key, with the result of a left ``merge``.
+    With ``report=True`` also returns a dict on the keys that didn't match.
+    """
+    data_df = standardize_columns(data_df)
+    resched_df = standardize_columns(resched_df)
+    resched_df = resched_df.rename(columns={"wh_id": "location_id"})
+
+    n = len(data_df)
+    locations, location_ok = int_ids(pd.concat([data_df["location_id"], resched_df["location_id"]], ignore_index=True))
+    products, product_ok = int_ids(pd.concat([data_df["product_id"], resched_df["product_id"]], ignore_index=True))
+    valid = location_ok & product_ok
+    keys = composite_keys(locations, products, valid)
+    data_rows, resched_rows = sorted_left_join(keys[:n], valid[:n], keys[n:], valid[n:])
+
+    data_df["location_id"] = pd.to_numeric(data_df["location_id"], errors="coerce")
+    data_df["product_id"] = pd.to_numeric(data_df["product_id"], errors="coerce")
+    merged = data_df.iloc[data_rows].reset_index(drop=True)
+
+    matched = resched_rows >= 0
+    value_columns = [col for col in resched_df.columns if col not in ("location_id", "product_id")]
+    overlap = set(value_columns) & set(merged.columns)
+    merged = merged.rename(columns={col: f"{col}_x" for col in overlap})
+    for col in value_columns:
+        values = resched_df[col].iloc[np.where(matched, resched_rows, 0)] if len(resched_df) else pd.Series(np.nan, index=merged.index)
+        merged[f"{col}_y" if col in overlap else col] = pd.Series(values.to_numpy()).where(matched)
+
+    merged["resched_count"] = merged["resched_count"].fillna(0)
+    merged["total_inbound"] = merged["total_inbound"].fillna(1)
+
+    for col in NUMERIC_COLUMNS:
+        if col in merged.columns:
+            merged[col] = pd.to_numeric(merged[col], errors="coerce").fillna(0)
+    if not report:
+        return merged
+
+    resched_keys = keys[n:]
+    orphan = valid[n:] & ~np.isin(resched_keys, keys[:n][valid[:n]])
+    matched_rows = np.unique(data_rows[matched]).size
+    return merged, {
+        "rows": n,
+        "matched_rows": int(matched_rows),
+        "unmatched_rows": int(n - matched_rows),
+        "invalid_ids": int((~valid[:n]).sum()),
+        "invalid_reschedule_ids": int((~valid[n:]).sum()),
+        "duplicate_reschedule_keys": int(valid[n:].sum() - np.unique(resched_keys[valid[n:]]).size),
+        "orphan_reschedule": pd.DataFrame({"location_id": locations[n:][orphan], "product_id": products[n:][orphan]}),
+    }
+
+
+def policy_z(pareto):
+    """Service-level Z by Pareto class: 1.65 (95%) for X and A, 1.5 (90%) otherwise."""
+    return np.where(pd.Series(pareto).isin(["X", "A"]).to_numpy(), 1.65, 1.5)
+
+
+def doi_terms(merged, params, z=None):
+    """Per-row pieces of the DOI model that don't depend on ks, kr or kp.
+
+    ``final_doi`` for any coefficients is then plain array arithmetic
+    (``doi_values``), so a grid of coefficients costs one broadcast.
+    ``z`` overrides the Pareto service level per row (see ``core.servicelevel``).
+    """
+    def text(col):
+        return merged[col] if col in merged.columns else pd.Series("", index=merged.index)
+
+    def number(col):
+        return merged[col].to_numpy(dtype=float)
+
+    pareto = text("pareto").astype(str).str.strip()
+    cleaned_pareto = pareto.where(pareto.isin(["X", "A", "B"]), "C")
+    product_type = text("product_type_name")
+    apply_logic = (
+        cleaned_pareto.isin(params["selected_pareto"]) &
+        text("demand_type").isin(params["selected_demand"]) &
+        product_type.isin(params["selected_product_types"])
+    ).to_numpy()
+
+    avg_demand, std_demand = number("avg_demand"), number("std_demand")
+    lead_time, lead_time_std = number("lead_time"), number("lead_time_std")
+    resched_count, total_inbound = number("resched_count"), number("total_inbound")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std_d_ratio = np.where(avg_demand != 0, std_demand / avg_demand, 0)
+        resched_ratio = np.where(total_inbound != 0, resched_count / total_inbound, np.nan)
+        z = policy_z(cleaned_pareto) if z is None else np.asarray(z, dtype=float)
+        sigma = np.sqrt(lead_time_std ** 2 + lead_time ** 2 * std_d_ratio ** 2)
+        safety = z * sigma
+
+    return {
+        "base": number("doi_policy"),
+        "avg_demand": avg_demand,
+        "apply": apply_logic,
+        "z": z,
+        "sigma": sigma,  # days of demand per unit of Z
+        "safety": safety,
+        "lead_time": lead_time,
+        "resched_ratio": resched_ratio,  # NaN with no inbound: the row has no DOI when the term is on
+        "pareto": cleaned_pareto.map(params["pareto_weight"]).fillna(0).to_numpy(dtype=float),
+        "multiplier": product_type.map(params["product_type_scaler"]).fillna(1.0).to_numpy(dtype=float),
+    }
+
+
+def doi_values(terms, params, ks=None, kr=None, kp=None):
+    """``final_doi`` per row; ks/kr/kp default to ``params`` and may be arrays shaped ``(k, 1)`` for a grid."""
+    ks = params["ks"] if ks is None else ks
+    kr = params["kr"] if kr is None else kr
+    kp = params["kp"] if kp is None else kp
+    # Same order of operations as the old row-by-row model, so values match it
+    # to the bit before rounding
+    safety = terms["safety"] * ks if params["include_safety"] else 0
+    resched = kr * terms["lead_time"] * terms["resched_ratio"] if params["include_reschedule"] else 0
+    adjusted = terms["base"] + safety + resched + kp * terms["pareto"]
+    final_doi = np.where(terms["apply"], 0.7 * adjusted * terms["multiplier"], terms["base"])
+    return round_half(final_doi, 2)
+
+
+def round_half(values, digits):
+    """``np.round``, with values near a .5 tie settled by Python's correctly rounded ``round``.
+
+    ``np.round`` scales by 10**digits first, which can push a value like
+    2.765 across the tie.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, digits)
+    scaled = values * 10 ** digits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    rounded[near_tie] = [round(v, digits) for v in values[near_tie].tolist()]
+    return rounded
+
+
+def compute_final_doi(merged, params, z=None):
+    """Return a copy of ``merged`` with ``final_doi`` computed under ``params`` (and per-row ``z``)."""
+    merged = merged.copy()
+    merged["final_doi"] = doi_values(doi_terms(merged, params, z), params)
+    merged["location_id"] = pd.to_numeric(merged["location_id"], errors="coerce").fillna(0).astype(int)
+    merged["doi_policy"] = merged["doi_policy"].round(2)
+    merged["final_doi"] = merged["final_doi"].round(2)
+    return merged
+
+
+def doi_sweep(merged, params, grid, cogs=None, z=None):
+    """Totals of ``final_doi`` for every (ks, kr, kp) combination in ``grid``.
+
+    ``grid`` is anything ``pd.DataFrame`` takes with ``ks``, ``kr`` and
+    ``kp`` columns, one combination per row. The per-row terms are worked
+    out once and the combinations are broadcast over all SKU x location
+    rows in chunks of at most ``SWEEP_CELLS`` values. Per combination:
+
+    - ``total_doi_days``: sum of ``final_doi`` (rows without a DOI skipped)
+    - ``changed_rows``: rows where ``final_doi`` differs from ``doi_policy``
+    - ``inventory_value``: sum of ``final_doi * avg_demand * cogs``, with
+      ``cogs`` per row (NaN, i.e. unknown, counts as 0)
+
+    plus the same three for ``params`` itself as ``delta_*`` baselines.
+    ``z`` is the per-row service level, as in ``compute_final_doi``.
+    """
+    grid = pd.DataFrame(grid, columns=["ks", "kr", "kp"]).astype(float).reset_index(drop=True)
+    terms = doi_terms(merged, params, z)
+    base = np.round(terms["base"], 2)
+    units_value = terms["avg_demand"] * (np.zeros(len(base)) if cogs is None else np.nan_to_num(np.asarray(cogs, dtype=float)))
+
+    def totals(values):
+        return (
+            np.nansum(values, axis=-1),
+            (values != base).sum(axis=-1),
+            np.nansum(values * units_value, axis=-1),
+        )
+
+    chunk = max(1, SWEEP_CELLS // max(len(base), 1))
+    doi_days, changed, value = np.empty(len(grid)), np.empty(len(grid), dtype=np.int64), np.empty(len(grid))
+    for start in range(0, len(grid), chunk):
+        part = grid.iloc[start:start + chunk]
+        k = [part[col].to_numpy()[:, None] for col in ("ks", "kr", "kp")]
+        doi_days[start:start + chunk], changed[start:start + chunk], value[start:start + chunk] = totals(doi_values(terms, params, *k))
+
+    current = totals(doi_values(terms, params))
+    result = grid.assign(total_doi_days=doi_days, changed_rows=changed, inventory_value=value)
+    result["delta_doi_days"] = result["total_doi_days"] - current[0]
+    result["delta_changed_rows"] = result["changed_rows"] - current[1]
+    result["delta_inventory_value"] = result["inventory_value"] - current[2]
+    return result
+
+
+def parse_values(text):
+    """Comma separated numbers from a text box, sorted and deduplicated ("0.3, 0.5, 0.7")."""
+    values = [float(v) for v in text.replace(";", ",").split(",") if v.strip()]
+    return sorted(set(values))
+
+
+def doi_preview(merged, keep_numeric=False):
+    """Preview columns of ``merged``; missing values become "-" (only in text columns with ``keep_numeric``)."""
+    preview_df = merged[PREVIEW_COLUMNS]
+    if keep_numeric:
+        text = [col for col in PREVIEW_COLUMNS if not pd.api.types.is_numeric_dtype(preview_df[col])]
+        preview_df = preview_df.fillna({col: "-" for col in text})
+    else:
+        preview_df = preview_df.fillna("-")
+    preview_df["final_doi"] = preview_df["final_doi"].round(2)
+    preview_df["doi_policy"] = preview_df["doi_policy"].round(2)
+    return preview_df
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from core import perf
+
+DEFAULT_WH_ID = 160  # Non-split SKUs are served from PGS
+OUTPUT_COLUMNS = ['Date', 'Product ID', 'Product', 'WH ID', 'Forecast STEP 3']
+
+
+def convert_hub_forecast(forecast_df, hub_wh_map_df, split_sku_df):
+    """Convert a hub-level forecast into a WH-level forecast.
+
+    Split SKUs are mapped to their WH through the hub mapping, every other
+    SKU goes to ``DEFAULT_WH_ID``. Returns a dict with ``split_df``,
+    ``final_df``, ``sku_count_df``, ``missing_skus`` and ``summary_df``.
+    """
+    forecast_df = forecast_df.copy()
+    hub_wh_map_df = hub_wh_map_df.copy()
+    split_sku_df = split_sku_df.copy()
+
+    split_sku_df.columns = [col.lower() for col in split_sku_df.columns]
+    if 'product_id' not in split_sku_df.columns:
+        raise ValueError("The split SKU list file must contain a 'product_id' column.")
+
+    # Mark SKUs to split
+    forecast_df['Split_SKU'] = forecast_df['Product ID'].isin(split_sku_df['product_id'])
+    forecast_df['Hub ID'] = forecast_df['Hub ID'].astype(str).str.strip()
+    hub_wh_map_df['Hub ID'] = hub_wh_map_df['Hub ID'].astype(str).str.strip()
+
+    split_df = forecast_df[forecast_df['Split_SKU']].merge(
+        hub_wh_map_df, on='Hub ID', how='left'
+    )
+    nonsplit_df = forecast_df[~forecast_df['Split_SKU']].copy()
+    nonsplit_df['WH ID'] = DEFAULT_WH_ID
+
+    perf.frame("forecast_df", forecast_df)
+    perf.frame("split_df", split_df)
+    perf.frame("nonsplit_df", nonsplit_df)
+
+    combined_df = pd.concat([
+        split_df[OUTPUT_COLUMNS],
+        nonsplit_df[OUTPUT_COLUMNS]
+    ])
+
+    # Aggregate forecast by Date, Product ID, WH
+    final_df = combined_df.groupby(
+        ['Date', 'Product ID', 'Product', 'WH ID'],
+        as_index=False
+    )['Forecast STEP 3'].sum()
+    perf.frame("combined_df", combined_df)
+    perf.frame("final_df", final_df)
+
+    sku_count_df = final_df.groupby('WH ID')['Product ID'].nunique().reset_index()
+    sku_count_df.columns = ['WH ID', 'Unique SKU Count']
+
+    # Split SKUs not in forecast
+    missing_skus = split_sku_df[~split_sku_df['product_id'].isin(forecast_df['Product ID'].unique())]
+
+    summary_df = final_df.groupby(['WH ID', 'Date'], as_index=False)['Forecast STEP 3'].sum()
+    summary_df.columns = ['WH ID', 'Date', 'Total Forecast']
+
+    return {
+        "split_df": split_df,
+        "final_df": final_df,
+        "sku_count_df": sku_count_df,
+        "missing_skus": missing_skus,
+        "summary_df": summary_df,
+    }
@@ -0,0 +1,195 @@
+"""Location-partitioned Parquet copies of the SOH, forecast and DOI sheets.
+
+The sheets come in as whole-network CSVs, but a view works on one
+warehouse (or a few) at a time. ``write`` stores a frame as a hive
+partitioned Parquet dataset, one directory per location
+(``location id=772/``). Inside each, rows are sorted by product id, so
+row-group statistics cover narrow id ranges. ``read`` goes through
+``pyarrow.dataset``: the location filter prunes whole directories, the
+product-id filter prunes row groups, and only the requested columns are
+decoded.
+
+    version = lake.ensure("soh", soh_df, partition="location id", sort="product id")
+    soh = lake.read("soh", version, columns=["product id", "sum of stock"], locations=[772])
+    lake.locations("soh", version)      # from the directory names, no data read
+
+Each content version gets its own directory under ``sources.LAKE_PATH``
+(env KOANDRA_LAKE_PATH), like ``core.skumaster``. A replaced version stays
+on disk for ``RETAIN_SECONDS``: the apps cache version strings (up to a
+day in ``core.datasets``) and reopen them by path on every query. Column
+names are stored stripped and lower-cased. Frames without a partition column (the sales
+forecast) are written as a single sorted file.
+"""
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from core import skumaster, sources, uploads
+
+ROW_GROUP_ROWS = 64 * 1024
+RETAIN_SECONDS = 2 * 86400  # longer than the longest version cache in core.datasets (ttl=86400)
+_META = "meta.json"
+
+
+def _root(name, path=None):
+    return os.path.join(path or sources.LAKE_PATH, name)
+
+
+def _pointer(name, path=None):
+    # {"current": version, "retired": {version: unix time it stopped being current}}
+    try:
+        with open(os.path.join(_root(name, path), _META)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def current_version(name, path=None):
+    return _pointer(name, path).get("current")
+
+
+def normalize(df, partition=None, sort=None):
+    """``df`` as ``write`` stores it: lower-cased names, numeric sort key, int64 partition."""
+    df = uploads.normalize(df)
+    df.columns = df.columns.str.strip().str.lower()
+    if sort is not None:
+        df[sort] = pd.to_numeric(df[sort], errors="coerce")
+        df = df.sort_values(sort, kind="stable")
+    if partition is not None:
+        df[partition] = pd.to_numeric(df[partition], errors="coerce")
+        df = df[df[partition].notna()].astype({partition: "int64"})
+    return df
+
+
+def write(name, df, partition=None, sort=None, path=None, version=None, base=None, locations=None):
+    """Store ``df`` as a new version of dataset ``name`` and make it current.
+
+    With ``base`` (a stored version) and ``locations``, only those
+    partitions are written from ``df``; every other partition is
+    hard-linked from ``base``, which must hold the same rows for them.
+    """
+    version = version or skumaster.content_version(df)
+    df = normalize(df, partition, sort)
+    partitioning = _partitioning(partition) if partition is not None else None
+    reuse = base is not None and partition is not None and locations is not None
+    if reuse:
+        df = df[df[partition].isin(list(locations))]
+
+    root = _root(name, path)
+    target = os.path.join(root, version)
+    tmp = os.path.join(root, f".{version}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    if reuse:
+        prefix = f"{partition}="
+        rewritten = {f"{prefix}{int(v)}" for v in locations}
+        base_dir = os.path.join(root, base)
+        for entry in os.listdir(base_dir):
+            if entry.startswith(prefix) and entry not in rewritten:
+                shutil.copytree(os.path.join(base_dir, entry), os.path.join(tmp, entry), copy_function=_link)
+    ds.write_dataset(
+        pa.Table.from_pandas(df, preserve_index=False), tmp, format="parquet",
+        partitioning=partitioning, max_rows_per_group=ROW_GROUP_ROWS, min_rows_per_group=min(ROW_GROUP_ROWS, max(len(df), 1)),
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    rows = ds.dataset(tmp, format="parquet", partitioning=partitioning).count_rows()
+    with open(os.path.join(tmp, _META), "w") as f:
+        json.dump({"version": version, "rows": int(rows), "partition": partition, "sort": sort}, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+    now = time.time()
+    retired = _pointer(name, path).get("retired", {})
+    retired.pop(version, None)
+    for entry in os.listdir(root):
+        if entry != version and not entry.startswith(".") and os.path.isdir(os.path.join(root, entry)):
+            retired.setdefault(entry, now)
+    # A cached version string may still point at a replaced version, so it
+    # only goes once it has been retired for longer than any cache keeps it
+    for entry, at in list(retired.items()):
+        if now - at > RETAIN_SECONDS or not os.path.isdir(os.path.join(root, entry)):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+            del retired[entry]
+
+    pointer = os.path.join(root, f".{_META}.tmp")
+    with open(pointer, "w") as f:
+        json.dump({"current": version, "retired": retired}, f)
+    os.replace(pointer, os.path.join(root, _META))
+    return version
+
+
+def _link(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:  # e.g. another filesystem
+        shutil.copy2(src, dst)
+
+
+def ensure(name, df, partition=None, sort=None, path=None):
+    """Version of dataset ``name`` holding ``df``, written first if the stored one differs."""
+    version = skumaster.content_version(df)
+    if current_version(name, path) != version:
+        write(name, df, partition, sort, path, version)
+    return version
+
+
+def _meta(name, version, path=None):
+    with open(os.path.join(_root(name, path), version, _META)) as f:
+        return json.load(f)
+
+
+def _partitioning(partition):
+    return ds.partitioning(pa.schema([(partition, pa.int64())]), flavor="hive")
+
+
+def dataset(name, version=None, path=None):
+    version = version or current_version(name, path)
+    if version is None:
+        raise FileNotFoundError(f"no {name!r} dataset under {path or sources.LAKE_PATH!r}")
+    meta = _meta(name, version, path)
+    partitioning = _partitioning(meta["partition"]) if meta["partition"] else None
+    return ds.dataset(os.path.join(_root(name, path), version), format="parquet", partitioning=partitioning, exclude_invalid_files=True), meta
+
+
+def locations(name, version=None, path=None):
+    """Partition values of ``name``, read from its directory names."""
+    version = version or current_version(name, path)
+    meta = _meta(name, version, path)
+    prefix = f"{meta['partition']}="
+    target = os.path.join(_root(name, path), version)
+    return sorted(int(entry[len(prefix):]) for entry in os.listdir(target) if entry.startswith(prefix))
+
+
+def read(name, version=None, columns=None, locations=None, product_ids=None, path=None):
+    """Rows of ``name`` for ``locations`` and ``product_ids`` (``None`` = all), as a frame.
+
+    Filters are pushed down to pyarrow: partitions outside ``locations``
+    are never opened and row groups outside the product-id range are
+    skipped.
+    """
+    data, meta = dataset(name, version, path)
+    expression = None
+
+    def add(condition):
+        return condition if expression is None else expression & condition
+
+    if locations is not None and meta["partition"]:
+        expression = add(ds.field(meta["partition"]).isin([int(v) for v in locations]))
+    if product_ids is not None and meta["sort"]:
+        ids = pd.to_numeric(pd.Series(product_ids), errors="coerce").dropna().unique()
+        ids = pa.array(ids).cast(data.schema.field(meta["sort"]).type)
+        field = ds.field(meta["sort"])
+        if len(ids):
+            # The range lets row-group min/max stats prune; isin then picks the rows
+            expression = add((field >= pc.min(ids)) & (field <= pc.max(ids)) & field.isin(ids))
+        else:
+            expression = add(pc.scalar(False))
+    if columns is not None:
+        columns = [col for col in columns if col in data.schema.names]
+    return data.to_table(columns=columns, filter=expression).to_pandas()
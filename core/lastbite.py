@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+
+from core import skuindex, skumaster
+
+# Share of the SKU's daily forecast served by each location; unknown locations get 0
+LOCATION_FORECAST_SHARE = {772: 0.6, 40: 0.4, 160: 0.5, 796: 0.5, 661: 1.0}
+
+# Occupancy attributes joined onto every SOH row
+SKU_ATTRIBUTES = ['product name', 'holding_cost', 'brand company', 'cogs']
+
+# SOH and forecast columns prepare_lastbite uses (what core.datasets reads from the lake)
+SOH_COLUMNS = ['product id', 'location id', 'sum of stock']
+FORECAST_COLUMNS = ['product id', 'forecast daily']
+
+# Compact schema of the prepared frame (see compact): float32 keeps ~7
+# significant digits, plenty for stock, forecast and Rupiah amounts
+INT_COLUMNS = ['product id', 'location id']
+FLOAT_COLUMNS = ['soh', 'forecast_daily', 'holding_cost_monthly', 'cogs', 'doi_current']
+CATEGORY_COLUMNS = ['product name', 'brand company']
+COMPACT_RTOL = 1e-4
+
+BRAND_TABLE_COLUMNS = {
+    'product id': 'Product ID',
+    'product name': 'Product Name',
+    'location id': 'WH ID',
+    'doi_current': 'DOI Current',
+    'doi_ideal': 'DOI Ideal',
+    'additional_qty_pcs_reduce': 'Qty to Reduce (pcs)',
+    'additional_sales_value_reduce': 'Value to Reduce',
+    'additional_qty_pcs_increase': 'Qty to Increase (pcs)',
+    'additional_order_value': 'Order Value Increase',
+}
+
+
+def prepare_lastbite(soh_df, fc_df, holding_df):
+    """Join SOH, daily forecast and holding cost into the Last Bite working frame.
+
+    ``holding_df`` is the occupancy frame or its SKU master (``core.skumaster``).
+    """
+    soh_df = soh_df.copy()
+    fc_df = fc_df.copy()
+
+    soh_df.columns = soh_df.columns.str.strip().str.lower()
+    fc_df.columns = fc_df.columns.str.strip().str.lower()
+
+    soh_df.dropna(subset=['product id'], inplace=True)
+
+    df = soh_df.merge(
+        fc_df[['product id', 'forecast daily']],
+        on='product id'
+    )
+    if isinstance(holding_df, dict):
+        df = skumaster.join(holding_df, df, SKU_ATTRIBUTES)
+    else:
+        holding_df = holding_df.copy()
+        holding_df.columns = holding_df.columns.str.strip().str.lower()
+        holding_df.dropna(subset=['product id'], inplace=True)
+        df = df.merge(holding_df[['product id'] + SKU_ATTRIBUTES], on='product id')
+    df.drop_duplicates(inplace=True)
+
+    df.rename(columns={
+        'sum of stock': 'soh',
+        'forecast daily': 'forecast_daily',
+        'holding_cost': 'holding_cost_monthly',
+    }, inplace=True)
+
+    df['forecast_daily'] = adjust_forecast(df)
+
+    df['soh'] = pd.to_numeric(df['soh'], errors='coerce')
+    df['forecast_daily'] = pd.to_numeric(df['forecast_daily'], errors='coerce').replace(0, np.nan)
+    df['holding_cost_monthly'] = pd.to_numeric(df['holding_cost_monthly'], errors='coerce')
+    df['doi_current'] = df['soh'] / df['forecast_daily']
+    return df
+
+
+def compact(df):
+    """``df`` with the compact schema: int32 ids where they fit, float32 amounts, categorical names and brands."""
+    df = df.copy(deep=False)
+    info = np.iinfo(np.int32)
+    for col in INT_COLUMNS:
+        values = df[col]
+        if pd.api.types.is_integer_dtype(values) and (values.empty or (info.min <= values.min() and values.max() <= info.max)):
+            df[col] = values.astype('int32')
+    for col in FLOAT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def compact_errors(df, doi_ideal=30.0):
+    """Difference between adjustments on ``df`` as is (float64) and on ``compact(df)``.
+
+    Per output column and brand total: the largest absolute difference
+    relative to the column's largest value. Row-wise relative errors say
+    little here, since the adjustments are differences that pass through
+    zero. See ``COMPACT_RTOL``.
+    """
+    wide = compute_adjustments(df, doi_ideal)
+    narrow = compute_adjustments(compact(df), doi_ideal)
+
+    def error(a, b):
+        a = np.asarray(a, dtype=float)
+        b = np.asarray(b, dtype=float)
+        both = np.isfinite(a) & np.isfinite(b)
+        if (np.isfinite(a) != np.isfinite(b)).any():
+            return np.inf
+        scale = max(np.max(np.abs(a[both]), initial=0.0), 1.0)
+        return float(np.max(np.abs(a[both] - b[both]), initial=0.0) / scale)
+
+    def brand_totals(frame):
+        return pd.DataFrame({brand: brand_summary(group) for brand, group in frame.groupby('brand company', observed=True)}).T.sort_index()
+
+    errors = {col: error(wide[col], narrow[col]) for col in wide.columns if col in FLOAT_COLUMNS or col.startswith('additional_')}
+    errors['brand totals'] = error(brand_totals(wide), brand_totals(narrow))
+    return errors
+
+
+def apply_soh_changes(df, changed, removed, added):
+    """Patch a ``prepare_lastbite`` frame with SOH changes (see ``core.delta``) instead of preparing it again.
+
+    ``changed`` holds product id, location id and the new sum of stock,
+    ``removed`` the keys that went away, and ``added`` the new rows already
+    run through ``prepare_lastbite``. Added rows take the frame's dtypes,
+    so a ``compact`` frame stays compact. Only ``soh`` and ``doi_current``
+    depend on stock here; everything else is derived per query.
+    """
+    keys = pd.MultiIndex.from_frame(df[['product id', 'location id']].astype('int64'))
+    df = df.copy(deep=False)
+
+    if len(changed):
+        # Look the frame's rows up in the changed keys, not the other way round:
+        # a product id repeated in the forecast sheet repeats its keys in the
+        # frame, and every one of those rows takes the new stock
+        changed_keys = pd.MultiIndex.from_frame(changed[['product id', 'location id']].astype('int64'))
+        last = ~changed_keys.duplicated(keep='last')
+        pos = changed_keys[last].get_indexer(keys)
+        found = pos >= 0
+        new_soh = pd.to_numeric(changed['sum of stock'], errors='coerce').to_numpy()[last][pos[found]]
+        # A float frame (e.g. compact's float32) keeps its dtype; an int one widens if it must
+        dtype = df['soh'].dtype if df['soh'].dtype.kind == 'f' else np.result_type(df['soh'].dtype, new_soh.dtype)
+        soh = df['soh'].to_numpy(dtype=dtype, copy=True)
+        soh[found] = new_soh
+        df['soh'] = soh
+        df['doi_current'] = df['soh'] / df['forecast_daily']
+
+    if len(removed):
+        gone = keys.isin(pd.MultiIndex.from_frame(removed[['product id', 'location id']].astype('int64')))
+        df = df[~gone]
+    if len(added):
+        added = added[df.columns].copy()
+        for col in df.columns:
+            dtype = df[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                new = pd.Index(added[col].dropna().unique()).difference(dtype.categories)
+                if len(new):
+                    df[col] = df[col].cat.add_categories(new)
+                added[col] = added[col].astype(df[col].dtype)
+            else:
+                added[col] = added[col].astype(dtype)
+        df = pd.concat([df, added], ignore_index=True)
+    return df.reset_index(drop=True)
+
+
+def picker_index(df):
+    """Choices for the SKU, location and brand pickers of a prepared frame.
+
+    Built once per frame so a picker change is lookups: the SKU search
+    index (``core.skuindex``), in-stock locations per SKU, and the row
+    positions of every SKU and brand company.
+    """
+    in_stock = df.loc[df['soh'].to_numpy() > 0, ['product id', 'location id']]
+    locations = {sku: tuple(locs.unique()) for sku, locs in in_stock.groupby('product id', sort=False)['location id']}
+
+    def positions(column):
+        groups = df.groupby(column, sort=False).indices
+        for rows in groups.values():
+            rows.flags.writeable = False
+        return groups
+
+    return {
+        'sku_search': skuindex.build(df['product id'], df['product name']),
+        'locations': locations,
+        'sku_rows': positions('product id'),
+        'brands': tuple(sorted(df['brand company'].dropna().unique())),
+        'brand_rows': positions('brand company'),
+    }
+
+
+def adjust_forecast(df):
+    """Scale the SKU daily forecast by the location's share of demand."""
+    share = df['location id'].map(LOCATION_FORECAST_SHARE)
+    return (pd.to_numeric(df['forecast_daily'], errors='coerce') * share).where(share.notna(), 0)
+
+
+def compute_adjustments(df, doi_ideal):
+    """Quantities and values needed to move each row from its current to the ideal DOI."""
+    df = df.copy()
+    df['doi_ideal'] = doi_ideal
+    df['doi_diff'] = df['doi_current'] - df['doi_ideal']
+
+    df['additional_qty_pcs_reduce'] = (df['forecast_daily'] * df['doi_diff']).clip(lower=0)
+    df['additional_sales_value_reduce'] = df['additional_qty_pcs_reduce'] * df['cogs']
+    df['additional_qty_pcs_increase'] = (df['forecast_daily'] * (-df['doi_diff'])).clip(lower=0)
+    df['additional_order_value'] = df['additional_qty_pcs_increase'] * df['cogs']
+    df['additional_annual_holding_cost'] = df['additional_qty_pcs_increase'] * df['holding_cost_monthly'] * 12
+    return df
+
+
+def brand_summary(brand_df):
+    """Totals over the rows of a brand that have a forecast and a current DOI."""
+    valid_rows = brand_df[(brand_df['forecast_daily'] > 0) & (brand_df['doi_current'].notna())]
+    return {
+        "total_soh": valid_rows['soh'].sum(),
+        "total_forecast": valid_rows['forecast_daily'].sum(),
+        "total_qty_reduce": valid_rows['additional_qty_pcs_reduce'].sum(),
+        "total_val_reduce": valid_rows['additional_sales_value_reduce'].sum(),
+        "total_qty_increase": valid_rows['additional_qty_pcs_increase'].sum(),
+        "total_annual_holding_cost_increase": valid_rows['additional_annual_holding_cost'].sum(),
+        "total_order_value": valid_rows['additional_order_value'].sum(),
+    }
+
+
+def brand_table(brand_df):
+    table = brand_df[list(BRAND_TABLE_COLUMNS)].rename(columns=BRAND_TABLE_COLUMNS)
+    table['DOI Current'] = table['DOI Current'].round(1)
+    table['DOI Ideal'] = table['DOI Ideal'].round(1)
+    return table.reset_index(drop=True)
+
+
+def stock_verdicts(delta_qty, delta_value):
+    if delta_qty > 0:
+        verdict_qty = f"📦 Need to INCREASE stock by {int(delta_qty):,} pcs"
+    elif delta_qty < 0:
+        verdict_qty = f"📦 Need to REDUCE stock by {int(abs(delta_qty)):,} pcs"
+    else:
+        verdict_qty = "📦 No stock adjustment needed"
+
+    if delta_value > 0:
+        verdict_value = f"💰 Net ADDITIONAL value: Rp {int(delta_value):,}"
+    elif delta_value < 0:
+        verdict_value = f"💰 Net REDUCTION in value: Rp {int(abs(delta_value)):,}"
+    else:
+        verdict_value = "💰 No value adjustment"
+
+    return verdict_qty, verdict_value
+
+
+def fmt_qty(x):
+    return f"{int(x):,}" if x > 0 else "-"
@@ -0,0 +1,164 @@
+"""Ridge regression of daily OOS% on supply, demand, weekday and no-outbound features.
+
+The rule-based projection (``projection.evaluate_oos_actual``) uses
+hand-tuned multipliers. This model learns the response from the stored
+history instead. Each day with an actual OOS% is one training row. The
+features are:
+- the day before's SO supply, relative to the average supply, and its KOS share;
+- the day's forecast demand, relative to the peak day;
+- the weekday;
+- whether the KOS or STL had no outbound.
+
+``fit`` solves the ridge in closed form on standardized features (one
+SVD). It picks the penalty by exact leave-one-out error and returns the
+coefficients in the original units. A what-if is then one matrix-vector
+product per scenario:
+
+    model = oosmodel.fitted(versions, supply_data, oos_data, demand_agg)   # once per data version
+    oos = oosmodel.project(model, prepared, kos, stl)                      # [1, features] @ coef
+
+``project`` takes the per-date KOS/STL stock from ``evaluate_oos_actual``,
+so history days, locked days and no-outbound days get the same supply as
+in the rule-based projection. Actual OOS% stays as it is.
+"""
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core import projection
+
+FEATURES = ["supply_ratio", "kos_share", "demand"] + [f"dow_{day}" for day in ("tue", "wed", "thu", "fri", "sat", "sun")] + ["kos_no_outbound", "stl_no_outbound"]
+ALPHAS = np.logspace(-3, 3, 25)  # Ridge penalties tried on the standardized features
+MIN_ROWS = 14
+
+_lock = threading.Lock()
+_cache = {}  # data version -> model
+_CACHE_ENTRIES = 8
+
+
+def _demand(model, dates):
+    demand = pd.Series(model["demand"], index=pd.DatetimeIndex(model["demand_dates"])).reindex(pd.DatetimeIndex(dates))
+    return demand.fillna(model["demand_fill"]).to_numpy(dtype=float)
+
+
+def _features(model, dates, kos, stl):
+    # (..., n_dates, len(FEATURES)); kos/stl broadcast against the date axis
+    dates = pd.DatetimeIndex(dates)
+    kos, stl, _ = np.broadcast_arrays(np.asarray(kos, dtype=float), np.asarray(stl, dtype=float), np.zeros(len(dates)))
+    total = kos + stl
+    weekday = np.eye(7)[dates.dayofweek.to_numpy()][:, 1:]  # Monday is the baseline
+    static = np.column_stack([_demand(model, dates), weekday])
+    static = np.broadcast_to(static, kos.shape + static.shape[-1:])
+    return np.concatenate([
+        (total / model["avg_supply"])[..., None],
+        np.divide(kos, total, out=np.zeros_like(total), where=total > 0)[..., None],
+        static,
+        (kos == 0)[..., None],
+        (stl == 0)[..., None],
+    ], axis=-1)
+
+
+def training_rows(supply_data, oos_data):
+    """Days with an actual OOS% and the day before's supply: ``(dates, kos, stl, oos)``, OOS% as a fraction."""
+    supply = supply_data.assign(Date=pd.to_datetime(supply_data["Date"])).drop_duplicates("Date").set_index("Date")[["KOS", "STL"]]
+    oos = oos_data.assign(**{"Date Key": pd.to_datetime(oos_data["Date Key"])}).drop_duplicates("Date Key").set_index("Date Key")["OOS%"]
+    oos = pd.to_numeric(oos, errors="coerce").dropna().sort_index()
+    prev = supply.reindex(oos.index - pd.Timedelta(days=1))
+    keep = prev.notna().all(axis=1).to_numpy()
+    return (
+        oos.index[keep],
+        prev["KOS"].to_numpy(dtype=float)[keep],
+        prev["STL"].to_numpy(dtype=float)[keep],
+        oos.to_numpy(dtype=float)[keep] * 0.01,
+    )
+
+
+def fit(supply_data, oos_data, demand_forecast, alphas=ALPHAS):
+    """Ridge fit of OOS% (fraction) on ``FEATURES``; ``None`` with fewer than ``MIN_ROWS`` training days.
+
+    Returns a dict with ``coef`` (intercept first, original units), the
+    chosen ``alpha``, the training ``rows``, the in-sample and
+    leave-one-out RMSE, and what ``design`` needs to build query rows.
+    """
+    agg = projection.demand_aggregates(demand_forecast)
+    model = {
+        "avg_supply": (supply_data["KOS"].mean() + supply_data["STL"].mean()) if not supply_data.empty else 180000,
+        "demand_dates": np.asarray(agg["dates"]),
+        "demand": np.asarray(agg["normalized"]),
+        "demand_fill": agg["daily_mean"] / agg["daily_max"],
+    }
+    dates, kos, stl, y = training_rows(supply_data, oos_data)
+    n = len(y)
+    if n < MIN_ROWS:
+        return None
+
+    X = _features(model, dates, kos, stl)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1  # A feature that never varies (e.g. no no-outbound day yet) gets a zero weight
+    Z = (X - mean) / scale
+    y_mean = y.mean()
+    U, s, Vt = np.linalg.svd(Z, full_matrices=False)
+    Uty = U.T @ (y - y_mean)
+
+    # Leave-one-out residuals of a linear smoother: e_i / (1 - h_ii)
+    best = None
+    for alpha in alphas:
+        shrink = s ** 2 / (s ** 2 + alpha)
+        fitted = y_mean + U @ (shrink * Uty)
+        leverage = (U ** 2) @ shrink + 1 / n
+        loo = np.mean(((y - fitted) / (1 - leverage)) ** 2)
+        if best is None or loo < best[0]:
+            best = (loo, alpha, fitted)
+    loo, alpha, fitted = best
+
+    beta = Vt.T @ (s / (s ** 2 + alpha) * Uty) / scale
+    model.update({
+        "coef": np.concatenate([[y_mean - mean @ beta], beta]),
+        "alpha": float(alpha),
+        "rows": n,
+        "first_date": dates.min(),
+        "last_date": dates.max(),
+        "rmse": float(np.sqrt(np.mean((y - fitted) ** 2))),
+        "loo_rmse": float(np.sqrt(loo)),
+    })
+    return model
+
+
+def fitted(version, supply_data, oos_data, demand_forecast):
+    """``fit`` once per data ``version`` (e.g. ``precompute.projection_versions``) for the whole process."""
+    key = json.dumps(version, sort_keys=True, default=str)
+    with _lock:
+        if key in _cache:
+            return _cache[key]
+    model = fit(supply_data, oos_data, demand_forecast)
+    with _lock:
+        _cache[key] = model
+        for stale in list(_cache)[:-_CACHE_ENTRIES]:
+            del _cache[stale]
+    return model
+
+
+def design(model, dates, kos, stl):
+    """Query rows ``[1, features]`` for every date; ``kos``/``stl`` broadcast against the date axis."""
+    X = _features(model, dates, kos, stl)
+    return np.concatenate([np.ones(X.shape[:-1] + (1,)), X], axis=-1)
+
+
+def predict(model, dates, kos, stl):
+    """Modelled OOS% (fraction) for the day-before supply ``kos``/``stl`` of every date."""
+    return projection._clip_low(design(model, dates, kos, stl) @ model["coef"])
+
+
+def project(model, prepared, custom_kos_supply, custom_stl_supply, opening_kos=None, opening_stl=None):
+    """Modelled counterpart of ``evaluate_oos_actual``'s projection; days with actual OOS% keep it."""
+    _, kos_stock, stl_stock = projection.evaluate_oos_actual(prepared, custom_kos_supply, custom_stl_supply, opening_kos, opening_stl)
+    modelled = predict(model, prepared["dates"], kos_stock, stl_stock)
+    return np.where(prepared["has_actual"], prepared["actual_oos"], modelled)
+
+
+def coefficients(model):
+    """Per-feature weights in original units, with the intercept first."""
+    return pd.DataFrame({"Feature": ["intercept"] + FEATURES, "Coefficient": model["coef"]})
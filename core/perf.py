@@ -0,0 +1,349 @@
+"""Per-stage timing spans for the apps and engines.
+
+    perf.begin("lastbite")          # top of the script, once per rerun
+    with perf.span("load"):
+        ...
+    @perf.timed("compute")
+    def heavy(...): ...
+    perf.panel()                    # bottom of the script
+
+    @st.fragment
+    def picker():
+        with perf.fragment("lastbite", "analysis"):
+            ...
+
+A fragment rerun runs only the fragment body, so it never reaches the
+script's ``begin``. ``fragment`` records the body as a span of the page's
+run on a full rerun, and as a run of its own with the panel drawn inside
+the fragment on a fragment rerun.
+
+Spans are only recorded while profiling is on: KOANDRA_PERF=1 in the
+environment, or ``?perf=1`` on the page URL for a single session. Otherwise
+``span`` hands back one shared no-op context manager, so instrumented code
+pays a function call and a thread-local lookup.
+
+With KOANDRA_PERF_LOG=<path> every finished span is also appended to that
+file as one JSON object per line, for offline analysis.
+
+Memory mode (KOANDRA_MEMPROF=1 or ``?perf=mem``) additionally traces
+allocations with tracemalloc: each span gets the peak it reached above its
+starting point, and ``perf.frame(name, df)`` records the deep
+``memory_usage`` of intermediate frames. A rerun whose traced peak or live
+frames exceed KOANDRA_MEM_BUDGET_MB gets a warning in the sidebar.
+Tracing runs only while some memory-mode run is open: the last one to
+finish stops it again. tracemalloc is process-wide (one peak, reset by
+every run), so a run that overlapped another one is flagged
+``overlapped`` and its peaks are shown as unreliable.
+"""
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+_local = threading.local()
+_log_lock = threading.Lock()
+_mem_lock = threading.Lock()
+_mem_runs = []  # open memory-mode runs, across threads
+_mem_started = False  # tracing was started here (not by e.g. python -X tracemalloc)
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes", "on")
+
+
+def _query_param():
+    st = sys.modules.get("streamlit")  # Don't pull Streamlit into the CLI
+    if st is None:
+        return ""
+    try:
+        return st.query_params.get("perf", "")
+    except Exception:  # Imported but not running a script
+        return ""
+
+
+def memory_budget_mb():
+    try:
+        return float(os.environ.get("KOANDRA_MEM_BUDGET_MB", ""))
+    except ValueError:
+        return None
+
+
+def begin(app, enabled=None, memory=None):
+    """Start recording spans for one script run (a Streamlit rerun or a CLI call)."""
+    param = _query_param() if enabled is None or memory is None else ""
+    if memory is None:
+        memory = _env_flag("KOANDRA_MEMPROF") or param == "mem"
+    if enabled is None:
+        enabled = memory or _env_flag("KOANDRA_PERF") or param in ("1", "true")
+    _end_memory(getattr(_local, "run", None))  # a previous run of this thread that never finished
+    if not (enabled or memory):
+        _local.run = None
+        return
+    run = {
+        "app": app,
+        "run": uuid.uuid4().hex[:12],
+        "started": time.perf_counter(),
+        "ts": time.time(),
+        "memory": memory,
+        "mem_start": 0,
+        "mem_peak": 0,
+        "stack": [],
+        "open": [],
+        "spans": [],
+        "frames": [],
+        "overlapped": False,
+    }
+    if memory:
+        _start_memory(run)
+    _local.run = run
+
+
+def _start_memory(run):
+    global _mem_started
+    with _mem_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _mem_started = True
+        if _mem_runs:
+            run["overlapped"] = True
+            for other in _mem_runs:
+                other["overlapped"] = True
+        _mem_runs.append(run)
+        tracemalloc.reset_peak()
+        run["mem_start"] = tracemalloc.get_traced_memory()[0]
+
+
+def _end_memory(run):
+    # Stop tracing with the last open memory-mode run, so one ?perf=mem visit
+    # doesn't leave it on for the process
+    global _mem_started
+    if run is None or not run["memory"]:
+        return
+    with _mem_lock:
+        if run in _mem_runs:
+            _mem_runs.remove(run)
+        if not _mem_runs and _mem_started:
+            tracemalloc.stop()
+            _mem_started = False
+
+
+def enabled():
+    return getattr(_local, "run", None) is not None
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _note_peak(run):
+    # tracemalloc keeps a single peak, so before resetting it hand the value
+    # seen so far to every open span
+    _, peak = tracemalloc.get_traced_memory()
+    for open_span in run["open"]:
+        open_span.mem_peak = max(open_span.mem_peak, peak)
+    run["mem_peak"] = max(run["mem_peak"], peak)
+    tracemalloc.reset_peak()
+
+
+class _Span:
+    __slots__ = ("run", "name", "start", "mem_start", "mem_peak")
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        run = self.run
+        run["stack"].append(self.name)
+        if run["memory"]:
+            _note_peak(run)
+            self.mem_start = self.mem_peak = tracemalloc.get_traced_memory()[0]
+            run["open"].append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        run = self.run
+        path = "/".join(run["stack"])
+        run["stack"].pop()
+        record = {
+            "app": run["app"],
+            "run": run["run"],
+            "ts": run["ts"],
+            "span": path,
+            "depth": path.count("/"),
+            "start_ms": (self.start - run["started"]) * 1000,
+            "ms": (end - self.start) * 1000,
+            "error": exc_type.__name__ if exc_type else None,
+        }
+        if run["memory"]:
+            _note_peak(run)
+            run["open"].pop()
+            current = tracemalloc.get_traced_memory()[0]
+            record["peak_mb"] = (self.mem_peak - self.mem_start) / 2**20
+            record["net_mb"] = (current - self.mem_start) / 2**20
+        run["spans"].append(record)
+        _export(record)
+        return False
+
+
+def span(name):
+    """Time the enclosed block as ``name`` (nested spans are recorded as ``outer/inner``)."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NO_SPAN
+    return _Span(run, name)
+
+
+def timed(name=None):
+    """Decorator form of :func:`span`; defaults to the function's name."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextlib.contextmanager
+def fragment(app, name):
+    """Profile the body of an ``st.fragment`` (see the module docstring)."""
+    if getattr(_local, "run", None) is not None:  # Full rerun: part of the page's run
+        with span(name):
+            yield
+        return
+    begin(f"{app}/{name}")
+    try:
+        with span(name):
+            yield
+    finally:
+        import streamlit as st
+        panel(st)  # A fragment can't write to the sidebar
+
+
+def frame(name, df):
+    """Record the deep memory footprint of an intermediate DataFrame (memory mode only)."""
+    run = getattr(_local, "run", None)
+    if run is None or not run["memory"] or df is None:
+        return
+    record = {
+        "app": run["app"],
+        "run": run["run"],
+        "ts": run["ts"],
+        "span": "/".join(run["stack"]),
+        "frame": name,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "mb": df.memory_usage(deep=True).sum() / 2**20,
+    }
+    run["frames"].append(record)
+    _export(record)
+
+
+def _export(record):
+    path = os.environ.get("KOANDRA_PERF_LOG")
+    if not path:
+        return
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+
+def finish():
+    """Close the current run and return its spans plus the total rerun time."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    total = {
+        "app": run["app"],
+        "run": run["run"],
+        "ts": run["ts"],
+        "span": "(rerun)",
+        "depth": -1,
+        "start_ms": 0.0,
+        "ms": (time.perf_counter() - run["started"]) * 1000,
+        "error": None,
+    }
+    if run["memory"]:
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, run["mem_peak"])
+        total["peak_mb"] = (peak - run["mem_start"]) / 2**20
+        total["net_mb"] = (current - run["mem_start"]) / 2**20
+        total["frames_mb"] = sum(f["mb"] for f in run["frames"])
+        budget = memory_budget_mb()
+        total["over_budget"] = budget is not None and max(total["peak_mb"], total["frames_mb"]) > budget
+        total["overlapped"] = run["overlapped"]
+        _end_memory(run)
+    _export(total)
+    return {"total": total, "spans": run["spans"], "frames": run["frames"]}
+
+
+def panel(container=None):
+    """Render the timing breakdown of this rerun in an expander (no-op when disabled).
+
+    The expander goes in the sidebar unless ``container`` is given.
+    """
+    result = finish()
+    if result is None:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    container = st.sidebar if container is None else container
+    total = result["total"]
+    total_ms = total["ms"]
+    memory = "peak_mb" in total
+    columns = ["span", "depth", "start_ms", "ms", "peak_mb", "net_mb", "error"] if memory else ["span", "depth", "start_ms", "ms", "error"]
+    table = pd.DataFrame(result["spans"], columns=columns)
+    table = table.sort_values("start_ms")
+    top_level_ms = table.loc[table["depth"] == 0, "ms"].sum()
+    table["% of rerun"] = table["ms"] / total_ms * 100 if total_ms else 0.0
+    table["span"] = ["  " * depth + name.rsplit("/", 1)[-1] for name, depth in zip(table["span"], table["depth"])]
+
+    if memory and total["over_budget"]:
+        container.warning(
+            f"⚠️ This rerun used {max(total['peak_mb'], total['frames_mb']):,.0f} MB, "
+            f"over the {memory_budget_mb():g} MB budget. See Performance for the frames involved."
+        )
+
+    with container.expander("⏱️ Performance", expanded=False):
+        st.caption(f"Rerun {total['run']}: {total_ms:,.1f} ms total, {total_ms - top_level_ms:,.1f} ms outside spans")
+        shown = ["span", "ms", "% of rerun", "peak_mb", "net_mb", "error"] if memory else ["span", "ms", "% of rerun", "error"]
+        st.dataframe(
+            table[shown].reset_index(drop=True),
+            use_container_width=True,
+            column_config={
+                "ms": st.column_config.NumberColumn(format="%.1f"),
+                "% of rerun": st.column_config.NumberColumn(format="%.0f%%"),
+                "peak_mb": st.column_config.NumberColumn("peak MB", format="%.1f"),
+                "net_mb": st.column_config.NumberColumn("net MB", format="%.1f"),
+            },
+        )
+        if memory:
+            st.caption(f"Traced peak {total['peak_mb']:,.1f} MB, {total['net_mb']:,.1f} MB still held, frames {total['frames_mb']:,.1f} MB")
+            if total["overlapped"]:
+                st.caption("⚠️ Another profiled rerun overlapped this one: peaks include its allocations and are unreliable.")
+            frames = pd.DataFrame(result["frames"], columns=["frame", "span", "rows", "columns", "mb"])
+            st.dataframe(
+                frames.sort_values("mb", ascending=False).reset_index(drop=True),
+                use_container_width=True,
+                column_config={"mb": st.column_config.NumberColumn("MB", format="%.2f")},
+            )
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+COL_AGGRESSIVE = "Option Current - Aggressive"
+COL_MODERATE = "Option 1 - Moderate"
+COL_CONSERVATIVE = "Option 2 - Conservatives"
+SCENARIO_COLUMNS = {"Aggressive": COL_AGGRESSIVE, "Moderate": COL_MODERATE, "Conservative": COL_CONSERVATIVE}
+
+
+def clean_scenarios(df, l1=None, product_types=None):
+    """Filter by L1 / product type and coerce the avg sales scenario columns to numbers."""
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+
+    if l1 is not None and "L1" in df.columns:
+        df = df[df["L1"].isin(l1)]
+    if product_types is not None and "product_type_name" in df.columns:
+        df = df[df["product_type_name"].isin(product_types)]
+
+    for col in SCENARIO_COLUMNS.values():
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.dropna(subset=list(SCENARIO_COLUMNS.values()), how='all')
+
+
+def histogram_bins(bin_start, bin_end, bin_step):
+    return np.arange(bin_start, bin_end + bin_step, bin_step)
+
+
+def scenario_histograms(df, bins):
+    """SKU counts per avg sales bin for each scenario."""
+    counts = {}
+    for label, col in SCENARIO_COLUMNS.items():
+        counts[label], _ = np.histogram(df[col], bins=bins)
+    return pd.DataFrame(counts, index=pd.IntervalIndex.from_breaks(bins, closed="left"))
@@ -0,0 +1,333 @@
+"""Default outputs of the apps, computed off-peak and stored as Parquet artifacts.
+
+At the morning peak every session used to compute the same default
+tables. The jobs here compute them ahead of time:
+- ``oos_actual`` for projected_oos_actual.py;
+- ``rekap`` for rekap.py;
+- ``doi`` for dynamic_doiwh.py.
+
+Each job writes one Parquet file named after a hash of the job, the
+versions of its sources and its parameters. An app asks for exactly what
+it would compute:
+
+    versions = precompute.projection_versions(history, demand_agg["version"], precompute.flows_source_version())
+    df = precompute.fetch("oos_actual", versions, params)
+    if df is None:      # not materialized (yet), or the user moved a parameter off the default
+        df = project_oos_actual(...)
+
+Since the name covers the sources, a stale artifact is never served: a
+new upload or sheet only changes which file is asked for. The scheduler
+runs the jobs once or as a worker:
+
+    python cli.py precompute                       # rebuild what's stale, then exit
+    python cli.py precompute --watch 300 --at 05:30
+
+The worker checks local sources (history store, forecast file) every
+``--watch`` seconds. It downloads the remote sheets (DOI) once a day at
+``--at``, or every 24 hours from start without ``--at``. With
+KOANDRA_PRECOMPUTE_EVERY (and optionally KOANDRA_PRECOMPUTE_AT) set,
+Home.py starts the same worker on a background thread of the server
+(``start_from_env``); ``fetch`` itself only reads. Artifacts live under
+``sources.ARTIFACTS_PATH`` (env KOANDRA_ARTIFACTS_PATH); the newest
+``KEEP`` per job are kept.
+The hub to WH conversion and the OOS WH projection aren't covered: their
+inputs are per-user uploads.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from core import demand, doi, lake, projection, sources, store
+
+KEEP = 4
+REMOTE_EVERY = 24 * 3600
+DEFAULT_KOS_SUPPLY = 100000
+DEFAULT_STL_SUPPLY = 80000
+DEFAULT_REKAP_STL_SUPPLY = 40000
+
+_lock = threading.Lock()
+_cache = {}  # artifact path -> (mtime_ns, frame); --force rewrites a file in place
+_CACHE_ENTRIES = 16
+_worker = None
+
+
+def _canonical(value):
+    # 100000 from a number_input and 100000.0 from the CLI are the same parameter
+    if isinstance(value, (bool, np.bool_)) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return int(value) if float(value).is_integer() else float(value)
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def artifact_key(job, versions, params):
+    payload = json.dumps({"job": job, "sources": _canonical(versions), "params": _canonical(params)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+
+def _path(job, key, path=None):
+    return os.path.join(path or sources.ARTIFACTS_PATH, job, f"{key}.parquet")
+
+
+def fetch(job, versions, params, path=None):
+    """Stored output of ``job`` for these source versions and parameters, or ``None``."""
+    if versions is None:
+        return None
+    target = _path(job, artifact_key(job, versions, params), path)
+    try:
+        mtime = os.stat(target).st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        cached = _cache.get(target)
+    if cached is not None and cached[0] == mtime:
+        df = cached[1]
+    else:
+        try:
+            df = pd.read_parquet(target)
+        except (OSError, ValueError):
+            return None
+        with _lock:
+            _cache[target] = (mtime, df)
+            for stale in list(_cache)[:-_CACHE_ENTRIES]:
+                del _cache[stale]
+    return df.copy(deep=False)
+
+
+def write(job, versions, params, df, path=None, seconds=None):
+    """Store ``df`` as the output of ``job`` for these versions and parameters."""
+    key = artifact_key(job, versions, params)
+    target = _path(job, key, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.tmp"
+    df.to_parquet(tmp, index=False)
+    with open(f"{tmp}.json", "w") as f:
+        json.dump({
+            "job": job, "sources": _canonical(versions), "params": _canonical(params), "rows": len(df),
+            "seconds": seconds, "computed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }, f)
+    os.replace(f"{tmp}.json", target.replace(".parquet", ".json"))
+    os.replace(tmp, target)
+    with _lock:
+        _cache.pop(target, None)
+
+    # Keep the newest few; a session may still be serving the previous one
+    root = os.path.dirname(target)
+    done = sorted((entry for entry in os.listdir(root) if entry.endswith(".parquet")), key=lambda entry: os.path.getmtime(os.path.join(root, entry)))
+    for entry in done[:-KEEP]:
+        for stale in (entry, entry.replace(".parquet", ".json")):
+            try:
+                os.remove(os.path.join(root, stale))
+            except OSError:
+                pass
+    return key
+
+
+def exists(job, versions, params, path=None):
+    return os.path.exists(_path(job, artifact_key(job, versions, params), path))
+
+
+# ---- Source versions ----
+# The apps build these from what they already hold, so both sides name the
+# same artifact.
+
+def projection_versions(history, forecast_version, flows_version=None):
+    """Versions behind the OOS projections: history watermarks (``store.watermarks()``) and the forecast file.
+
+    ``flows_version`` adds the inbound/outbound plans (``flows_source_version``).
+    """
+    if "supply" not in history or "oos" not in history:
+        return None
+    versions = {"supply": list(history["supply"]), "oos": list(history["oos"]), "forecast": list(forecast_version)}
+    if flows_version is not None:
+        versions["flows"] = [list(v) for v in flows_version]
+    return versions
+
+
+def flows_source_version(inbound_path=sources.INBOUND_PATH, outbound_path=sources.OUTBOUND_PATH):
+    """Versions of the inbound and outbound plan workbooks."""
+    return (demand.source_version(inbound_path), demand.source_version(outbound_path))
+
+
+def oos_actual_params(custom_kos_supply, custom_stl_supply, opening_kos, opening_stl):
+    """Artifact parameters of the OOS actual projection: SO supply and opening DC stock."""
+    return {
+        "custom_kos_supply": custom_kos_supply, "custom_stl_supply": custom_stl_supply,
+        "opening_kos": opening_kos, "opening_stl": opening_stl,
+    }
+
+
+def doi_versions(data_url=sources.DATA_URL, resched_url=sources.RESCHED_URL):
+    """Download the DOI sheets into the lake (``core.lake``); returns the dataset versions."""
+    data_df, resched_df = sources.load_doi_sources(data_url, resched_url)
+    return {
+        "database": lake.ensure("doi_database", data_df, partition="location_id", sort="product_id"),
+        "reschedule": lake.ensure("doi_reschedule", resched_df, partition="wh_id", sort="product_id"),
+    }
+
+
+# ---- Jobs ----
+# versions() -> source versions (None when there's nothing to compute from),
+# then build(versions, params) -> frame, for each parameter set in params().
+
+def _history_versions():
+    return projection_versions(store.watermarks(), demand.source_version(sources.FORECAST_PATH))
+
+
+def _oos_actual_versions():
+    return projection_versions(store.watermarks(), demand.source_version(sources.FORECAST_PATH), flows_source_version())
+
+
+def _oos_actual_params():
+    # The app's defaults: the opening DC stock comes from the stored supply history
+    opening_kos, opening_stl = projection.opening_stock(*store.history())
+    return [oos_actual_params(DEFAULT_KOS_SUPPLY, DEFAULT_STL_SUPPLY, opening_kos, opening_stl)]
+
+
+def _build_oos_actual(versions, params):
+    return projection.project_oos_actual(
+        *store.history(), pd.read_excel(sources.INBOUND_PATH), pd.read_excel(sources.OUTBOUND_PATH), demand.aggregates(),
+        params["custom_kos_supply"], params["custom_stl_supply"], params["opening_kos"], params["opening_stl"],
+    )
+
+
+def _build_rekap(versions, params):
+    return projection.project_oos_rekap(*store.history(), demand.aggregates(), params["custom_stl_supply"])
+
+
+def doi_params(params=None, locations=None):
+    """Artifact parameters of the DOI table: model parameters and warehouses (``None`` = all)."""
+    return {"params": params or doi.default_doi_params(), "locations": None if locations is None else sorted(int(v) for v in locations)}
+
+
+def doi_table(merged):
+    """The DOI table as the app shows it: ``doi_preview`` plus a ``changed`` flag per row."""
+    preview = doi.doi_preview(merged, keep_numeric=True)
+    return preview.assign(changed=(merged["final_doi"] != merged["doi_policy"]).to_numpy())
+
+
+def _build_doi(versions, params):
+    locations = params["locations"]
+    merged = doi.merge_reschedule(
+        lake.read("doi_database", versions["database"], locations=locations),
+        lake.read("doi_reschedule", versions["reschedule"], locations=locations),
+    )
+    return doi_table(doi.compute_final_doi(merged, params["params"]))
+
+
+JOBS = {
+    "oos_actual": {
+        "versions": _oos_actual_versions,
+        "params": _oos_actual_params,
+        "build": _build_oos_actual,
+        "remote": False,
+    },
+    "rekap": {
+        "versions": _history_versions,
+        "params": lambda: [{"custom_stl_supply": DEFAULT_REKAP_STL_SUPPLY}],
+        "build": _build_rekap,
+        "remote": False,
+    },
+    "doi": {
+        "versions": doi_versions,
+        "params": lambda: [doi_params()],
+        "build": _build_doi,
+        "remote": True,
+    },
+}
+
+
+def run(jobs=None, remote=True, force=False, path=None, log=None):
+    """Compute every stale artifact of ``jobs`` (default all); returns one record per artifact.
+
+    ``remote=False`` skips the jobs that download sheets. ``force``
+    recomputes artifacts that already exist.
+    """
+    records = []
+    for name in jobs or JOBS:
+        job = JOBS[name]
+        if job["remote"] and not remote:
+            continue
+        try:
+            versions = job["versions"]()
+        except Exception as e:  # an unreachable sheet shouldn't stop the other jobs
+            records.append({"job": name, "status": f"error: {e}"})
+            continue
+        if versions is None:
+            records.append({"job": name, "status": "no sources"})
+            continue
+        for params in job["params"]():
+            if not force and exists(name, versions, params, path):
+                records.append({"job": name, "status": "current"})
+                continue
+            start = time.perf_counter()
+            try:
+                df = job["build"](versions, params)
+            except Exception as e:
+                records.append({"job": name, "status": f"error: {e}"})
+                continue
+            seconds = time.perf_counter() - start
+            key = write(name, versions, params, df, path, seconds)
+            records.append({"job": name, "status": "written", "key": key, "rows": len(df), "seconds": seconds})
+    if log is not None:
+        for record in records:
+            log(record)
+    return records
+
+
+def _next_remote(now, at):
+    if at is None:
+        return now + timedelta(seconds=REMOTE_EVERY)
+    hour, minute = (int(part) for part in at.split(":"))
+    due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return due if due > now else due + timedelta(days=1)
+
+
+def watch(every=300, at=None, jobs=None, path=None, log=None, stop=None):
+    """Run the jobs until ``stop`` (a ``threading.Event``) is set.
+
+    Local sources are checked every ``every`` seconds. Remote sheets are
+    downloaded at the start, then daily at ``at`` ("HH:MM", local time),
+    or every 24 hours without it.
+    """
+    stop = stop or threading.Event()
+    remote_due = datetime.now()
+    while not stop.is_set():
+        now = datetime.now()
+        remote = now >= remote_due
+        if remote:
+            remote_due = _next_remote(now, at)
+        run(jobs, remote=remote, path=path, log=log)
+        stop.wait(every)
+
+
+def start(every, at=None, jobs=None, path=None):
+    """Start ``watch`` on a daemon thread, once per process."""
+    global _worker
+    with _lock:
+        if _worker is not None:
+            return _worker
+        _worker = threading.Thread(target=watch, args=(every, at, jobs, path), name="precompute", daemon=True)
+        _worker.start()
+    return _worker
+
+
+def start_from_env():
+    """Start the worker if KOANDRA_PRECOMPUTE_EVERY=<seconds> is set (Home.py, once per server)."""
+    if sources.PRECOMPUTE_EVERY:
+        return start(float(sources.PRECOMPUTE_EVERY), sources.PRECOMPUTE_AT or None)
+    return None
@@ -0,0 +1,792 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ---- Shared assumptions (Feb-Apr 2025 planning) ----
+CURRENT_SUPPLY = {"KOS": 100000, "STL": 15000}  # 28 Feb-8 Mar
+CHANGE_DATE = pd.to_datetime("2025-03-09")
+BASE_OOS_RATE = 13.85  # Fixed starting OOS percentage
+EXPECTED_SO = 140000  # Expected SO
+KOS_SHARE = 2 / 3
+STL_SHARE = 1 / 3
+
+START_DATE = pd.to_datetime("2025-02-28")
+HORIZON_DAYS = 62
+
+# Fixed OOS values from Feb 28 - Mar 9
+FIXED_OOS = {
+    pd.to_datetime("2025-02-28"): 13.37,
+    pd.to_datetime("2025-03-01"): 13.43,
+    pd.to_datetime("2025-03-02"): 13.44,
+    pd.to_datetime("2025-03-03"): 13.51,
+    pd.to_datetime("2025-03-04"): 13.66,
+    pd.to_datetime("2025-03-05"): 13.71,
+    pd.to_datetime("2025-03-06"): 13.73,
+    pd.to_datetime("2025-03-07"): 13.83,
+    pd.to_datetime("2025-03-08"): 13.85,
+    pd.to_datetime("2025-03-09"): 12.63
+}
+
+# OOS Dry percentage data used by the OOS WH projection (oosfixed.py)
+OOS_DRY_PERCENTAGE = {
+    "12-Mar-25": 10.97, "13-Mar-25": 10.10, "14-Mar-25": 9.68, "15-Mar-25": 9.44,
+    "16-Mar-25": 9.11, "17-Mar-25": 9.14, "18-Mar-25": 9.33, "19-Mar-25": 9.21,
+    "20-Mar-25": 7.49, "21-Mar-25": 7.51, "22-Mar-25": 6.37, "23-Mar-25": 6.40,
+    "24-Mar-25": 6.71, "25-Mar-25": 6.85, "26-Mar-25": 6.41, "27-Mar-25": 6.55,
+    "28-Mar-25": 6.15, "29-Mar-25": 6.96, "30-Mar-25": 7.88, "31-Mar-25": 3.97,
+    "01-Apr-25": 4.91, "02-Apr-25": 4.70, "03-Apr-25": 4.80, "04-Apr-25": 4.57,
+    "05-Apr-25": 5.17, "06-Apr-25": 5.81, "07-Apr-25": 5.75,
+}
+
+
+def target_dates(start=START_DATE, periods=HORIZON_DAYS):
+    return pd.date_range(start=start, periods=periods, freq='D')
+
+
+def demand_aggregates(demand_forecast):
+    """The ``core.demand`` aggregates of a forecast frame; aggregates pass through as they are."""
+    if isinstance(demand_forecast, dict):
+        return demand_forecast
+    from core import demand  # core.demand imports the supply shares from here
+    return demand.build(demand_forecast)
+
+
+def summarize_demand(demand_forecast):
+    """Daily forecast totals with demand normalized by the peak day.
+
+    Takes the forecast frame or its ``core.demand`` aggregates.
+    """
+    agg = demand_aggregates(demand_forecast)
+    return pd.DataFrame({
+        "Date Key": pd.DatetimeIndex(agg["dates"]),
+        "Forecast": agg["daily"],
+        "Normalized Demand": agg["normalized"],
+    })
+
+
+def stl_supply_factor(stl_supply):
+    return max(0, min(1, (stl_supply - 40000) / 35000 * 0.5))
+
+
+def stl_adjustment_oos(demand_summary, custom_stl_supply):
+    """Per-date supply and projected OOS% behind the STL adjustment tabs (app.py).
+
+    Returns a list of ``(date, supply, projected_oos)``.
+    """
+    daily_forecast = demand_summary.set_index("Date Key")["Forecast"]
+    rows = []
+
+    for date in target_dates():
+        if date < CHANGE_DATE:
+            supply = CURRENT_SUPPLY.copy()
+        else:
+            supply = {"KOS": 100000, "STL": custom_stl_supply}
+
+        total_demand = daily_forecast.get(date, 0)
+
+        # Use fixed OOS values or calculate dynamically following demand trend
+        if date in FIXED_OOS:
+            projected_oos = FIXED_OOS[date]
+        else:
+            days_after_change = (date - CHANGE_DATE).days
+            supply_factor = stl_supply_factor(supply["STL"])
+            if days_after_change < 7:
+                projected_oos = 12 - (3 * days_after_change / 7) * (1 - supply_factor)  # Gradual decrease to 9%
+            else:
+                projected_oos = total_demand / 22000 * (1 - supply_factor)  # Fluctuates around 9%
+
+        rows.append((date, supply, projected_oos))
+    return rows
+
+
+def target_oos_qty(projected_oos, target_oos_percent, noise):
+    """Final quantity needed for the target OOS% given the SO noise draw(s); works on arrays."""
+    return EXPECTED_SO + ((projected_oos / 100) - (target_oos_percent) * EXPECTED_SO * (1.275 + noise))
+
+
+def project_stl_adjustment(demand_summary, custom_stl_supply, target_oos_percent, rng=None):
+    """OOS projection and target-OOS quantities for the STL adjustment tabs (app.py).
+
+    Returns ``(df_oos_target, df_oos_supply)``.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    df_oos_target = []
+    df_oos_supply = []
+
+    for date, supply, projected_oos in stl_adjustment_oos(demand_summary, custom_stl_supply):
+        # Final quantity needed for the target OOS%
+        final_qty_target_oos = target_oos_qty(projected_oos, target_oos_percent, rng.uniform(-0.05, 0.05))
+
+        df_oos_target.append({
+            "Date": date.strftime("%d %b %Y"),
+            "KOS Supply": supply["KOS"],
+            "STL Supply": supply["STL"],
+            "Projected OOS%": round(projected_oos, 2)
+        })
+        df_oos_supply.append({
+            "Date": date.strftime("%d %b %Y"),
+            "Final Qty (Target OOS%)": round(final_qty_target_oos, 0),
+            "Final Qty KOS (Target OOS%)": round(final_qty_target_oos * KOS_SHARE, 0),
+            "Final Qty STL (Target OOS%)": round(final_qty_target_oos * STL_SHARE, 0)
+        })
+
+    return pd.DataFrame(df_oos_target), pd.DataFrame(df_oos_supply)
+
+
+# ---- Monte Carlo bands for the target-OOS quantity (app.py) ----
+MC_SHARD_PATHS = 100000  # Paths per shard; fixed so results don't depend on the worker count
+MC_PERCENTILES = (10, 50, 90)
+MC_NOISE = 0.05  # SO noise is uniform on +-MC_NOISE
+MC_BINS = 8192  # Histogram bins per date over the quantity's range
+
+
+def _qty_range(projected_oos, target_oos_percent):
+    # The quantity is affine in the bounded noise, so its range per date is known up front
+    ends = target_oos_qty(projected_oos[:, None], target_oos_percent, np.array([-MC_NOISE, MC_NOISE]))
+    lo, hi = ends.min(axis=1), ends.max(axis=1)
+    return lo, np.where(hi > lo, hi - lo, 1.0) / MC_BINS
+
+
+def _target_qty_shard(projected_oos, target_oos_percent, seed, paths):
+    # One dates x paths matrix of SO noise per shard, handed back as a
+    # dates x MC_BINS histogram so the pool never ships the paths themselves
+    noise = np.random.default_rng(seed).uniform(-MC_NOISE, MC_NOISE, size=(len(projected_oos), paths))
+    qty = target_oos_qty(projected_oos[:, None], target_oos_percent, noise)
+    lo, width = _qty_range(projected_oos, target_oos_percent)
+    bins = np.clip(((qty - lo[:, None]) / width[:, None]).astype(np.int64), 0, MC_BINS - 1)
+    bins += np.arange(len(projected_oos))[:, None] * MC_BINS
+    return np.bincount(bins.ravel(), minlength=len(projected_oos) * MC_BINS).reshape(len(projected_oos), MC_BINS)
+
+
+def _histogram_percentiles(counts, lo, width, percentiles):
+    # np.percentile's linear rank, with the values of a bin spread evenly over it
+    total = counts.sum(axis=1)
+    cum = np.cumsum(counts, axis=1)
+    rows = np.arange(len(counts))
+    result = []
+    for p in percentiles:
+        rank = p / 100 * (total - 1)
+        b = np.minimum((cum <= rank[:, None]).sum(axis=1), counts.shape[1] - 1)
+        before = cum[rows, b] - counts[rows, b]
+        result.append(lo + (b + (rank - before + 0.5) / np.maximum(counts[rows, b], 1)) * width)
+    return np.array(result)
+
+
+def simulate_stl_adjustment(demand_summary, custom_stl_supply, target_oos_percent, paths=1000, seed=0, workers=None):
+    """P10/P50/P90 of the target-OOS quantities over ``paths`` seeded noise paths.
+
+    Paths are drawn in shards of ``MC_SHARD_PATHS`` with independent child
+    seeds from ``SeedSequence(seed).spawn``; shards run on a process pool when
+    ``workers`` > 1 (default: all cores once there is more than one shard).
+    Each shard returns a fixed-size histogram per date (``MC_BINS`` bins
+    over the quantity's known range) and the histograms are summed, so
+    memory doesn't grow with ``paths``. Percentiles are within a bin width
+    (range / ``MC_BINS``) plus the gap between the two paths around the
+    percentile's rank of the exact ones; with many more paths than bins the
+    gap vanishes and that is a bin width. The same seed gives the same
+    bands whatever the worker count.
+    """
+    rows = stl_adjustment_oos(demand_summary, custom_stl_supply)
+    projected_oos = np.array([projected for _, _, projected in rows], dtype=float)
+
+    n_shards = max(1, math.ceil(paths / MC_SHARD_PATHS))
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = [min(MC_SHARD_PATHS, paths - i * MC_SHARD_PATHS) for i in range(n_shards)]
+    if workers is None:
+        workers = min(n_shards, os.cpu_count() or 1)
+
+    if workers > 1 and n_shards > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = sum(pool.map(_target_qty_shard, [projected_oos] * n_shards, [target_oos_percent] * n_shards, seeds, sizes))
+    else:
+        counts = sum(_target_qty_shard(projected_oos, target_oos_percent, s, n) for s, n in zip(seeds, sizes))
+
+    lo, width = _qty_range(projected_oos, target_oos_percent)
+    bands = _histogram_percentiles(counts, lo, width, MC_PERCENTILES)
+    result = pd.DataFrame({"Date": [date.strftime("%d %b %Y") for date, _, _ in rows]})
+    for label, share in (("Total", 1), ("KOS", KOS_SHARE), ("STL", STL_SHARE)):
+        # The shares are positive constants, so scaling the bands equals the bands of the scaled paths
+        for p, band in zip(MC_PERCENTILES, bands):
+            result[f"{label} P{p}"] = np.round(band * share, 0)
+    return result
+
+
+def project_oos_stl(demand_summary, custom_stl_supply):
+    """OOS% projection for a given STL supply after the change date (oos_projection.py)."""
+    daily_forecast = demand_summary.set_index("Date Key")["Forecast"]
+    df_oos_target = []
+
+    for date in target_dates():
+        if date <= CHANGE_DATE:
+            supply = CURRENT_SUPPLY.copy()
+        else:
+            supply = {"KOS": 100000, "STL": custom_stl_supply}
+
+        if date in FIXED_OOS:
+            projected_oos = FIXED_OOS[date]
+        else:
+            days_after_change = (date - CHANGE_DATE).days
+            supply_factor = stl_supply_factor(supply["STL"])
+            if days_after_change < 7:
+                projected_oos = 12 - (3 * days_after_change / 7) * ((supply_factor * 1.2) + 1)  # Gradual decrease to 9%
+            else:
+                projected_oos = daily_forecast.get(date, 0) / 22000 * (1 - supply_factor)  # Fluctuates around 9%
+
+        df_oos_target.append({
+            "Date": date.strftime("%d %b %Y"),
+            "KOS Supply": supply["KOS"],
+            "STL Supply": supply["STL"],
+            "Projected OOS%": round(projected_oos, 2),
+        })
+
+    return pd.DataFrame(df_oos_target)
+
+
+def oos_stl_curve(demand_summary, stl_supply):
+    """Vectorized ``project_oos_stl``: unrounded Projected OOS% for every target date.
+
+    ``stl_supply`` (STL supply after the change date) broadcasts against the
+    dates on the last axis, so a ``(k, 1)`` array gives ``k`` curves and a
+    ``(k, n_dates)`` array a supply per curve and date.
+    """
+    dates = target_dates()
+    forecast = demand_summary.set_index("Date Key")["Forecast"].reindex(dates, fill_value=0).to_numpy(dtype=float)
+    days_after_change = (dates - CHANGE_DATE).days.to_numpy()
+    fixed = np.array([FIXED_OOS.get(date, np.nan) for date in dates])
+
+    stl = np.where(dates <= CHANGE_DATE, CURRENT_SUPPLY["STL"], np.asarray(stl_supply, dtype=float))
+    supply_factor = np.clip((stl - 40000) / 35000 * 0.5, 0, 1)
+    ramp = 12 - (3 * days_after_change / 7) * ((supply_factor * 1.2) + 1)  # Gradual decrease to 9%
+    steady = forecast / 22000 * (1 - supply_factor)  # Fluctuates around 9%
+    oos = np.where(days_after_change < 7, ramp, steady)
+    return np.where(np.isnan(fixed), oos, fixed)
+
+
+def solve_stl_supply(demand_summary, target_oos, per="day", lo=40000, hi=110000, tol=1.0, horizon=None):
+    """Minimum STL supply whose projected OOS% (``oos_stl_curve``) meets ``target_oos`` (percent units).
+
+    ``per="day"``: ``target_oos`` broadcasts against the dates on the last
+    axis (scalar, per-date, or ``(k, 1)`` / ``(k, n_dates)`` for ``k``
+    categories) and a supply is solved for every date.
+    ``per="horizon"``: one supply per target so that the average OOS% over
+    ``horizon`` (start, end) meets it; defaults to the days after the change
+    date. KOS supply does not enter this model.
+
+    All targets are bisected together between ``lo`` and ``hi`` to within
+    ``tol``. The projection is non-increasing in supply, so the smallest
+    feasible supply is found; targets that ``hi`` can't meet come back NaN,
+    and targets already met at ``lo`` (e.g. fixed-OOS days) come back ``lo``.
+    """
+    dates = target_dates()
+    targets = np.asarray(target_oos, dtype=float)
+    if per == "day":
+        targets = np.broadcast_to(targets, np.broadcast_shapes(targets.shape, (len(dates),)))
+
+        def projected(supply):
+            return oos_stl_curve(demand_summary, supply)
+    elif per == "horizon":
+        start, end = horizon or (CHANGE_DATE + pd.Timedelta(days=1), dates[-1])
+        in_horizon = (dates >= pd.to_datetime(start)) & (dates <= pd.to_datetime(end))
+        if not in_horizon.any():
+            raise ValueError("The horizon does not overlap the projection dates.")
+
+        def projected(supply):
+            return oos_stl_curve(demand_summary, supply[..., None])[..., in_horizon].mean(axis=-1)
+    else:
+        raise ValueError(f"per must be 'day' or 'horizon', not {per!r}")
+
+    low = np.full(targets.shape, float(lo))
+    high = np.full(targets.shape, float(hi))
+    met_at_low = projected(low) <= targets
+    met_at_high = projected(high) <= targets
+
+    for _ in range(max(0, math.ceil(math.log2((hi - lo) / tol)))):
+        mid = (low + high) / 2
+        met = projected(mid) <= targets
+        high = np.where(met, mid, high)
+        low = np.where(met, low, mid)
+
+    return np.where(met_at_low, float(lo), np.where(met_at_high, np.ceil(high), np.nan))
+
+
+def project_so_qty(demand_summary, target_oos_percent, rng=None):
+    """SO quantity needed per day to reach ``target_oos_percent`` (so_qty.py)."""
+    rng = rng if rng is not None else np.random.default_rng()
+    daily_forecast = demand_summary.set_index("Date Key")["Forecast"]
+    df_oos_supply = []
+
+    for date in target_dates():
+        if date in FIXED_OOS:
+            projected_oos = FIXED_OOS[date]
+        else:
+            days_after_change = (date - CHANGE_DATE).days
+            if days_after_change < 7:
+                projected_oos = 12 - (3 * days_after_change / 7)  # Gradual decrease to 9%
+            else:
+                projected_oos = daily_forecast.get(date, 0) / 22000  # Fluctuates around 9%
+
+        final_qty_target_oos = EXPECTED_SO + ((projected_oos / 100) - target_oos_percent) * EXPECTED_SO * (1.275 + rng.uniform(-0.05, 0.05))
+
+        df_oos_supply.append({
+            "Date": date.strftime("%d %b %Y"),
+            "Final Qty Needed": round(final_qty_target_oos, 0),
+            "Final Qty KOS Needed": round(final_qty_target_oos * KOS_SHARE, 0),
+            "Final Qty STL Needed": round(final_qty_target_oos * STL_SHARE, 0)
+        })
+
+    return pd.DataFrame(df_oos_supply)
+
+
+def project_oos_rekap(supply_data, fixed_oos_data, demand_forecast, custom_stl_supply, change_date="2025-04-01"):
+    """OOS% projection from historical supply SO and OOS% (rekap.py)."""
+    supply_data = supply_data.copy()
+    fixed_oos_data = fixed_oos_data.copy()
+    supply_data["Date"] = pd.to_datetime(supply_data["Date"])
+    fixed_oos_data["Date Key"] = pd.to_datetime(fixed_oos_data["Date Key"])
+    change_date = pd.to_datetime(change_date)
+
+    supply_data = supply_data.sort_values("Date")
+    supply_data[["KOS", "STL"]] = supply_data[["KOS", "STL"]].apply(pd.to_numeric, errors="coerce")
+
+    # Rolling mean over the last 7 available days (actual + forecasted) for Mar 4-31
+    forecasted_supply = []
+    rolling_supply_data = supply_data.copy()
+    for target_date in pd.date_range("2025-03-04", "2025-03-31"):
+        prev_days = rolling_supply_data[rolling_supply_data["Date"] < target_date].tail(7)
+
+        if not prev_days.empty:
+            avg_kos = prev_days["KOS"].mean()
+            avg_stl = prev_days["STL"].mean()
+        else:
+            avg_kos, avg_stl = 100000, custom_stl_supply  # Default values if no data
+
+        forecasted_supply.append({"Date": target_date, "KOS": avg_kos, "STL": avg_stl})
+        rolling_supply_data = pd.concat([rolling_supply_data, pd.DataFrame(forecasted_supply[-1:], index=[0])])
+
+    forecasted_supply = pd.DataFrame(forecasted_supply)
+    extended_supply = pd.concat([supply_data, forecasted_supply]).drop_duplicates(subset=["Date"], keep="last")
+    extended_supply = extended_supply.sort_values("Date")
+
+    demand_summary = summarize_demand(demand_forecast)
+
+    oos_data = []
+
+    last_7_days_oos = fixed_oos_data[fixed_oos_data["Date Key"] >= (pd.to_datetime("2025-03-03") - pd.Timedelta(days=7))]
+    if not last_7_days_oos.empty:
+        avg_oos_increase = last_7_days_oos["OOS%"].pct_change().mean()  # Average percentage change
+    else:
+        avg_oos_increase = 0
+
+    for date in target_dates():
+        projected_oos = None
+        supply = None
+
+        if date in fixed_oos_data["Date Key"].values:
+            projected_oos = fixed_oos_data.loc[fixed_oos_data["Date Key"] == date, "OOS%"].values[0]
+            supply = supply_data.loc[supply_data["Date"] == date]
+        elif date >= pd.to_datetime("2025-03-04") and date <= pd.to_datetime("2025-03-31"):
+            supply = extended_supply.loc[extended_supply["Date"] == date]
+            # Apply L7 trend to estimate OOS%
+            prev_date = date - pd.Timedelta(days=1)
+            prev_oos_values = [entry["Projected OOS%"] for entry in oos_data if entry["Date"] == prev_date.strftime("%d %b %Y")]
+            if prev_oos_values:
+                projected_oos = prev_oos_values[0] * (1 + avg_oos_increase)
+            else:
+                projected_oos = last_7_days_oos["OOS%"].mean()  # Use L7 avg if no previous OOS
+        elif date < change_date:
+            supply = supply_data.loc[supply_data["Date"] == date]
+
+        if supply is not None and not supply.empty:
+            supply = supply.squeeze()
+        else:
+            supply = pd.Series({"KOS": 100000, "STL": custom_stl_supply})
+
+        oos_data.append({
+            "Date": date.strftime("%d %b %Y"),
+            "KOS Supply": supply.get("KOS", 100000),
+            "STL Supply": supply.get("STL", custom_stl_supply),
+            "Projected OOS%": projected_oos if projected_oos is not None else np.nan,
+        })
+
+    # Projected OOS for March 8
+    oos_values = [entry["Projected OOS%"] for entry in oos_data if pd.to_datetime(entry["Date"]) in pd.date_range("2025-03-04", "2025-03-07") and not pd.isna(entry["Projected OOS%"])]
+    projected_oos_8mar = np.mean(oos_values) if oos_values else 12  # Default to 12 if no valid values
+
+    # Adjust projection from the change date onwards
+    supply_factor = stl_supply_factor(custom_stl_supply)
+    for entry in oos_data:
+        date = pd.to_datetime(entry["Date"])
+        if date >= change_date:
+            days_after_change = (date - change_date).days
+            if days_after_change < 7:
+                entry["Projected OOS%"] = round(projected_oos_8mar - (3 * days_after_change / 7) * ((supply_factor * 1.2) + 1), 2)
+            else:
+                last_available_date = demand_summary[demand_summary["Date Key"] <= date]["Date Key"].max()
+                last_available_demand = demand_summary[demand_summary["Date Key"] == last_available_date]["Forecast"].sum()
+                forecast_value = last_available_demand if not pd.isna(last_available_demand) else demand_summary["Forecast"].mean()
+                entry["Projected OOS%"] = round(forecast_value / 20000 * (1 - supply_factor), 2)
+
+    return pd.DataFrame(oos_data)
+
+
+# ---- Projected OOS with actual SO, inbound and outbound (projected_oos_actual.py) ----
+FIXED_KOS_ZERO_OUTBOUND_DAYS = ["2025-04-19", "2025-04-20"]
+FIXED_STL_ZERO_OUTBOUND_DAYS = ["2025-04-25", "2025-04-26", "2025-04-27"]
+LOCKED_KOS_DAYS = {"2025-04-18": 45000}  # KOS still has outbound on April 18
+FILE_ONLY_DATES = [d.strftime("%Y-%m-%d") for d in pd.date_range("2025-04-16", "2025-04-20").tolist() + pd.date_range("2025-04-22", "2025-04-27").tolist()]
+HIGHLIGHT_DATES = ["18 Apr 2025", "19 Apr 2025", "20 Apr 2025", "25 Apr 2025", "26 Apr 2025", "27 Apr 2025"]
+ACTUAL_START = "2025-03-01"
+ACTUAL_END = "2025-04-30"
+DAILY_DECREASE = 0.00015
+
+
+def daily_flows(flow_data, dates):
+    """KOS and STL totals of an inbound or outbound plan for every date (0 where the plan has no row)."""
+    if flow_data is None or flow_data.empty:
+        return np.zeros(len(dates)), np.zeros(len(dates))
+    totals = pd.DataFrame({
+        "Date": pd.to_datetime(flow_data["Date"]),
+        "KOS": pd.to_numeric(flow_data["KOS"], errors="coerce"),
+        "STL": pd.to_numeric(flow_data["STL"], errors="coerce"),
+    }).groupby("Date")[["KOS", "STL"]].sum().reindex(dates, fill_value=0)
+    return totals["KOS"].to_numpy(dtype=float), totals["STL"].to_numpy(dtype=float)
+
+
+def simulate_stock(inbound, outbound, opening):
+    """End-of-day DC stock and shipped qty from daily inbound/outbound plans and an opening stock.
+
+    Stock is the cumulative sum of the net flow; the DC can't ship what it
+    doesn't have, so it never drops below zero (a day's shortfall is
+    dropped, not carried). ``opening`` broadcasts against a trailing date
+    axis. Returns ``(stock, shipped)`` of shape ``(..., n_dates)``.
+    """
+    inbound = np.asarray(inbound, dtype=float)
+    outbound = np.asarray(outbound, dtype=float)
+    opening = np.asarray(opening, dtype=float)[..., None]
+    level = opening + np.cumsum(inbound - outbound, axis=-1)
+    # Reflection at zero: stock_t = level_t - min(0, lowest level so far)
+    stock = level - np.minimum(np.minimum.accumulate(level, axis=-1), 0)
+    before = np.concatenate([np.broadcast_to(opening, stock.shape[:-1] + (1,)), stock[..., :-1]], axis=-1)
+    return stock, before + inbound - stock
+
+
+def first_projected_date(oos_data):
+    """First date of the OOS actual window without an actual OOS%."""
+    dates = pd.date_range(ACTUAL_START, ACTUAL_END)
+    missing = dates[~dates.isin(pd.to_datetime(oos_data["Date Key"]))]
+    return missing[0] if len(missing) else dates[-1] + pd.Timedelta(days=1)
+
+
+def opening_stock(supply_data, oos_data):
+    """Default opening DC stock ``(kos, stl)``: the last stored supply SO before the first projected day.
+
+    ``None`` for a source without any supply SO before that day.
+    """
+    supply = supply_data.assign(Date=pd.to_datetime(supply_data["Date"])).sort_values("Date")
+    supply = supply[supply["Date"] < first_projected_date(oos_data)]
+    result = []
+    for source in ("KOS", "STL"):
+        values = pd.to_numeric(supply[source], errors="coerce").dropna()
+        result.append(int(round(values.iloc[-1])) if len(values) else None)
+    return tuple(result)
+
+
+def stock_coverage(prepared, opening_kos=None, opening_stl=None):
+    """DC stock of the inbound/outbound plans from the first projected day on, per source.
+
+    ``opening_kos`` / ``opening_stl`` are the DC stock at the start of the
+    first day without actual OOS% (default: ``opening_stock``). Without
+    inbound/outbound plans nothing is simulated (``{}``). Returns
+    ``{"kos": (stock, coverage), "stl": ...}``. Coverage is the share of
+    the planned outbound the DC can ship: 1 before the first projected day
+    and on days without planned outbound. Stock is NaN before the first
+    projected day.
+    """
+    p = prepared
+    if not p["has_flows"]:
+        return {}
+    start = p["first_projected"]
+    result = {}
+    for source, opening in (("kos", opening_kos), ("stl", opening_stl)):
+        opening = p[f"opening_{source}"] if opening is None else opening
+        if opening is None:
+            continue
+        inbound = p[f"inbound_{source}"][start:]
+        outbound = p[f"outbound_{source}"][start:]
+        stock, shipped = simulate_stock(inbound, outbound, opening)
+        pad = stock.shape[:-1] + (start,)
+        coverage = np.where(outbound > 0, shipped / np.where(outbound > 0, outbound, 1), 1)
+        result[source] = (
+            np.concatenate([np.full(pad, np.nan), stock], axis=-1),
+            np.concatenate([np.ones(pad), coverage], axis=-1),
+        )
+    return result
+
+
+def prepare_oos_actual(supply_data, oos_data, demand_forecast, inbound_data=None, outbound_data=None):
+    """Per-date arrays for ``project_oos_actual`` that don't depend on the custom KOS/STL supply.
+
+    Parsing and the per-date lookups happen once here; ``evaluate_oos_actual``
+    then runs on plain NumPy arrays for any number of supply pairs. The
+    inbound and outbound plans are summed per date for ``stock_coverage``,
+    and the default opening DC stock is taken from the supply history.
+    """
+    supply_data = supply_data.copy()
+    oos_data = oos_data.copy()
+    supply_data["Date"] = pd.to_datetime(supply_data["Date"])
+    oos_data["Date Key"] = pd.to_datetime(oos_data["Date Key"])
+    agg = demand_aggregates(demand_forecast)
+    supply_data = supply_data.sort_values("Date")
+
+    dates = pd.date_range(ACTUAL_START, ACTUAL_END)
+    date_strs = dates.strftime("%Y-%m-%d")
+    n = len(dates)
+
+    # Historical average supply
+    historical_avg_supply = (supply_data["KOS"].mean() + supply_data["STL"].mean()) if not supply_data.empty else 180000
+
+    # Previous day's supply SO and the day's actual OOS% (first row wins, like .values[0])
+    prev_dates = dates - pd.Timedelta(days=1)
+    prev_supply = supply_data.drop_duplicates("Date").set_index("Date")[["KOS", "STL"]]
+    actual_oos = oos_data.drop_duplicates("Date Key").set_index("Date Key")["OOS%"]
+    has_prev_supply = prev_dates.isin(prev_supply.index)
+    has_actual = dates.isin(actual_oos.index)
+    prev_supply = prev_supply.reindex(prev_dates)
+    actual_oos = actual_oos.reindex(dates)
+
+    # Mean of the 3 most recent OOS% before date - 3
+    oos_sorted = oos_data.sort_values("Date Key", ascending=False)
+    oos_keys = oos_sorted["Date Key"].to_numpy()
+    oos_values = oos_sorted["OOS%"].to_numpy(dtype=float)
+    base_oos = np.full(n, np.nan)
+    for i, reference_date in enumerate((dates - pd.Timedelta(days=3)).to_numpy()):
+        recent = oos_values[oos_keys < reference_date][:3]
+        recent = recent[~np.isnan(recent)]
+        if len(recent):
+            base_oos[i] = recent.mean() * 0.01
+
+    # Demand factor
+    daily_demand = pd.Series(agg["daily"], index=pd.DatetimeIndex(agg["dates"])).reindex(dates)
+    total_demand = daily_demand.fillna(agg["row_mean"]).to_numpy(dtype=float)
+    demand_factor = np.where(total_demand > 0, total_demand / agg["row_max"], 1)
+
+    buildup = np.ones(n)
+    buildup[date_strs == "2025-04-17"] = 0.95
+    buildup[date_strs == "2025-04-18"] = 1.45
+    buildup[date_strs.isin(["2025-04-23", "2025-04-24"])] = 0.90
+
+    inbound_kos, inbound_stl = daily_flows(inbound_data, dates)
+    outbound_kos, outbound_stl = daily_flows(outbound_data, dates)
+    projected_days = np.flatnonzero(~has_actual)
+    opening_kos, opening_stl = opening_stock(supply_data, oos_data)
+
+    return {
+        "dates": dates,
+        "historical_avg_supply": historical_avg_supply,
+        "has_actual": has_actual,
+        "actual_oos": actual_oos.to_numpy(dtype=float) * 0.01,
+        "has_prev_supply": has_prev_supply,
+        "prev_kos": prev_supply["KOS"].to_numpy(dtype=float),
+        "prev_stl": prev_supply["STL"].to_numpy(dtype=float),
+        "base_oos": base_oos,
+        "before_decrease": (dates < pd.Timestamp("2025-04-09")),
+        "locked_kos": np.array([LOCKED_KOS_DAYS.get(d, np.nan) for d in date_strs]),
+        "file_only": date_strs.isin(FILE_ONLY_DATES),
+        "kos_zero": date_strs.isin(FIXED_KOS_ZERO_OUTBOUND_DAYS),
+        "stl_zero": date_strs.isin(FIXED_STL_ZERO_OUTBOUND_DAYS),
+        "buildup": buildup,
+        "demand_factor": demand_factor,
+        "day_number": np.arange(1, n + 1),
+        "inbound_kos": inbound_kos,
+        "inbound_stl": inbound_stl,
+        "outbound_kos": outbound_kos,
+        "outbound_stl": outbound_stl,
+        "has_flows": inbound_data is not None or outbound_data is not None,
+        "first_projected": int(projected_days[0]) if len(projected_days) else n,
+        "opening_kos": opening_kos,
+        "opening_stl": opening_stl,
+    }
+
+
+def evaluate_oos_actual(prepared, custom_kos_supply, custom_stl_supply, opening_kos=None, opening_stl=None):
+    """Projected OOS% (fraction) for every date and every supply pair.
+
+    ``custom_kos_supply`` and ``custom_stl_supply`` broadcast against each
+    other; a trailing date axis is added. Returns ``(projected_oos,
+    kos_stock, stl_stock)`` arrays of shape ``(..., n_dates)``. With
+    inbound/outbound plans, the SO of days without actual OOS% is cut to
+    the share of the outbound plan the DC stock can cover
+    (``stock_coverage``; openings default to the prepared ones). Days whose
+    SO comes from the stored history keep it.
+    """
+    p = prepared
+    kos = np.asarray(custom_kos_supply, dtype=float)[..., None]
+    stl = np.asarray(custom_stl_supply, dtype=float)[..., None]
+    kos, stl = np.broadcast_arrays(kos, stl)
+
+    hist_kos = np.where(p["has_prev_supply"], p["prev_kos"], kos)
+    hist_stl = np.where(p["has_prev_supply"], p["prev_stl"], stl)
+    locked = ~np.isnan(p["locked_kos"])
+    use_history = p["has_actual"] | p["file_only"]
+    kos_stock = np.where(locked & ~p["has_actual"], p["locked_kos"], np.where(use_history, hist_kos, kos))
+    stl_stock = np.where(use_history, hist_stl, stl)
+    # Coverage only cuts SO taken from the custom supply: file-only days with
+    # a stored supply and the locked KOS day already carry what was shipped
+    custom_stl = ~p["has_actual"] & ~(use_history & p["has_prev_supply"])
+    custom_kos = custom_stl & ~locked
+    coverage = stock_coverage(p, opening_kos, opening_stl)
+    if "kos" in coverage:
+        kos_stock = np.where(custom_kos, kos_stock * coverage["kos"][1], kos_stock)
+    if "stl" in coverage:
+        stl_stock = np.where(custom_stl, stl_stock * coverage["stl"][1], stl_stock)
+
+    # Projection for days without actual OOS%
+    projected = np.where(p["before_decrease"], p["base_oos"], _clip_low(p["base_oos"] - DAILY_DECREASE))
+    projected = projected * p["buildup"]
+
+    # Locked KOS days keep the STL stock of the day before; zero outbound days
+    # zero the stock after the supply factor is taken
+    kos_zero = p["kos_zero"] & ~p["has_actual"]
+    stl_zero = p["stl_zero"] & ~p["has_actual"] & ~kos_zero
+    for i in np.flatnonzero(locked & ~p["has_actual"]):
+        if i > 0:
+            stl_stock[..., i] = np.where(stl_zero[i - 1], 0, stl_stock[..., i - 1])
+
+    supply_factor = (kos_stock + stl_stock) / p["historical_avg_supply"]
+    projected = projected + np.where(kos_zero, 0.012 * ((1 + supply_factor) * 0.95), 0)
+    projected = projected + np.where(stl_zero, 0.011 * ((1 + supply_factor) * 0.9), 0)
+    projected = projected * np.where(
+        supply_factor > 1, np.maximum(0.75, 1 - (supply_factor - 1) * 0.3),  # Reduce OOS% if supply is higher
+        np.where(supply_factor < 1, np.minimum(1.35, 1 + (1 - supply_factor) * 0.50), 1),  # Increase OOS% if supply is lower
+    )
+    projected = projected * p["demand_factor"] * 1.25
+    projected = _clip_low(projected * (1 - p["day_number"] * DAILY_DECREASE * (1 + supply_factor)) * 1.12)
+
+    projected = np.where(p["has_actual"], p["actual_oos"], projected)
+    kos_stock = np.where(kos_zero, 0, kos_stock)
+    stl_stock = np.where(stl_zero, 0, stl_stock)
+    return projected, kos_stock, stl_stock
+
+
+def _clip_low(values):
+    # max(0, x) the way the builtin does it: NaN compares false, so it becomes 0
+    return np.where(values > 0, values, 0.0)
+
+
+def project_oos_actual(supply_data, oos_data, inbound_data, outbound_data, demand_forecast, custom_kos_supply, custom_stl_supply, opening_kos=None, opening_stl=None):
+    """Daily OOS% projection driven by SO supply and historical OOS% (projected_oos_actual.py).
+
+    ``Projected OOS%`` is returned as a fraction. The inbound and outbound
+    plans drive a DC stock simulation from ``opening_kos`` / ``opening_stl``
+    (default: the last supply SO before the first projected day, see
+    ``opening_stock``); the stock is added as columns.
+    """
+    prepared = prepare_oos_actual(supply_data, oos_data, demand_forecast, inbound_data, outbound_data)
+    projected, kos_stock, stl_stock = evaluate_oos_actual(prepared, custom_kos_supply, custom_stl_supply, opening_kos, opening_stl)
+    df = pd.DataFrame({
+        "Date": prepared["dates"].strftime("%d %b %Y"),
+        "KOS SO Qty": kos_stock,
+        "STL SO Qty": stl_stock,
+        "Projected OOS%": projected,
+    })
+    for source, (stock, _) in stock_coverage(prepared, opening_kos, opening_stl).items():
+        df[f"{source.upper()} DC Stock"] = stock
+    return df
+
+
+# ---- KOS x STL supply grid (projected_oos_actual.py) ----
+_worker_prepared = None
+
+
+def _init_grid_worker(prepared):
+    # Runs once per worker process, so the arrays are pickled once per worker, not per task
+    global _worker_prepared
+    _worker_prepared = prepared
+
+
+def _grid_row(kos, stl_values, opening_kos=None, opening_stl=None):
+    projected, _, _ = evaluate_oos_actual(_worker_prepared, kos, stl_values, opening_kos, opening_stl)
+    return _surface_stats(_worker_prepared, projected)
+
+
+def _surface_stats(prepared, projected):
+    # Average and peak over the projected days (all days if every day has actual OOS%)
+    days = ~prepared["has_actual"] if not prepared["has_actual"].all() else np.ones_like(prepared["has_actual"])
+    return projected[..., days].mean(axis=-1), projected[..., days].max(axis=-1)
+
+
+def oos_actual_surface(prepared, kos_values, stl_values, workers=None, opening_kos=None, opening_stl=None):
+    """Average and peak projected OOS% (fractions) for every KOS x STL combination.
+
+    Each KOS value is one task on a ``ProcessPoolExecutor``; the prepared
+    arrays reach the workers through the pool initializer. ``workers=1``
+    evaluates the whole grid in-process. The opening DC stocks go to
+    ``evaluate_oos_actual``. Returns ``(avg, peak)`` arrays of shape
+    ``(len(kos_values), len(stl_values))``.
+    """
+    kos_values = np.asarray(kos_values, dtype=float)
+    stl_values = np.asarray(stl_values, dtype=float)
+    if workers is None:
+        workers = min(len(kos_values), os.cpu_count() or 1)
+
+    if workers <= 1:
+        projected, _, _ = evaluate_oos_actual(prepared, kos_values[:, None], stl_values[None, :], opening_kos, opening_stl)
+        return _surface_stats(prepared, projected)
+
+    n = len(kos_values)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_grid_worker, initargs=(prepared,)) as pool:
+        rows = list(pool.map(_grid_row, kos_values, [stl_values] * n, [opening_kos] * n, [opening_stl] * n))
+    return np.array([avg for avg, _ in rows]), np.array([peak for _, peak in rows])
+
+
+# ---- OOS WH projection (oosfixed.py) ----
+WH_KOS_SUPPLY = 100000
+WH_STL_SUPPLY = 60000
+
+
+def project_oos_wh(oos_wh_data, start="2025-03-26", periods=13):
+    """OOS projection including the OOS WH qty that will not go to SO.
+
+    Percent columns are returned as numbers in percent units.
+    """
+    oos_wh_data = oos_wh_data.copy()
+    oos_wh_data["Date"] = pd.to_datetime(oos_wh_data["Date"])
+    max_dry_oos = max(OOS_DRY_PERCENTAGE.values())
+    oos_data = []
+
+    for date in pd.date_range(start=pd.to_datetime(start), periods=periods, freq='D'):
+        # Adjust KOS supply based on OOS WH data
+        oos_wh_qty = oos_wh_data.loc[oos_wh_data["Date"] == date, "OOS Qty"].sum().astype(int)
+        kos_supply = np.floor(max(0, WH_KOS_SUPPLY - oos_wh_qty))
+
+        total_supply = kos_supply + WH_STL_SUPPLY
+        oos_percentage = (oos_wh_qty / total_supply) * 70 if total_supply > 0 else 0
+        if oos_percentage > 0.02:
+            oos_percentage *= 0.5
+
+        projected_oos = OOS_DRY_PERCENTAGE.get(date.strftime("%d-%b-%y"), 0)
+        oos_dry_final = projected_oos + oos_percentage
+        # OOS Fresh follows the dry fluctuation, scaled down to 1.2-2%
+        min_fresh = 1.2
+        max_fresh = 2.0
+        scaled_oos_fresh = min_fresh + (projected_oos / max_dry_oos) * (max_fresh - min_fresh)
+
+        # Final OOS percentage (Dry + Fresh + OOS Qty ga ke SO)
+        oos_final = projected_oos + scaled_oos_fresh + oos_percentage
+
+        oos_data.append({
+            "Date": date.strftime("%d %b %Y"),
+            "KOS SO": kos_supply,
+            "STL SO": WH_STL_SUPPLY,
+            "Potential Qty gake SO WH OOS": oos_wh_qty,
+            "add. OOS % impact": oos_percentage,
+            "Projected OOS Dry": projected_oos,
+            "Final OOS Dry": oos_dry_final,
+            "Assump. OOS Fresh": scaled_oos_fresh,
+            "OOS Final": oos_final
+        })
+
+    return pd.DataFrame(oos_data)
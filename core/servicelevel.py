@@ -0,0 +1,135 @@
+"""Per-SKU service level (Z) that trades holding cost against lost margin.
+
+The DOI model holds ``0.7 * ks * multiplier * Z * sigma`` days of safety
+stock, with Z fixed by Pareto class. Here each SKU x location row gets its own Z instead. One
+more unit of Z costs ``holding_cost * sigma_units`` a period and saves
+lost sales worth ``cycles * margin * sigma_units * (L(Z) - L(Z + dZ))``,
+where L is the standard normal loss function. L is convex, so each row's
+steps along the Z grid are worth less and less. The cheapest way to
+spend a budget is therefore one global threshold ``lam``: every step
+whose benefit per unit of cost beats ``lam`` is taken.
+
+The per-step ratio splits into a row factor
+``cycles * margin / holding_cost`` times a grid factor ``-dL/dZ``, so a
+row's Z for a given ``lam`` is one ``searchsorted`` over the grid. The
+threshold is found by bisection, each step vectorized over all rows.
+
+    result = servicelevel.optimize_doi(merged, params, holding_cost, cogs, margin_rate=0.25)
+    merged = doi.compute_final_doi(merged, params, z=result["z"])
+"""
+import math
+
+import numpy as np
+
+from core import doi
+
+Z_GRID = np.round(np.arange(0, 3.5 + 1e-9, 0.05), 2)
+PERIOD_DAYS = 30  # holding_cost in occupancy.csv is per unit per month
+
+
+def normal_cdf(z):
+    z = np.asarray(z, dtype=float)
+    values, inverse = np.unique(z, return_inverse=True)
+    erf = np.array([math.erf(v / math.sqrt(2)) for v in values.tolist()])
+    return (0.5 * (1 + erf))[inverse].reshape(z.shape)
+
+
+def normal_loss(z):
+    """Expected shortfall E[(X - z)+] of a standard normal, in standard deviations."""
+    z = np.asarray(z, dtype=float)
+    pdf = np.exp(-z ** 2 / 2) / math.sqrt(2 * math.pi)
+    return pdf - z * (1 - normal_cdf(z))
+
+
+def optimize(sigma_units, holding_cost, margin, cycles, budget=None, z_grid=Z_GRID):
+    """Z per row on ``z_grid`` minimizing holding plus lost margin, spending at most ``budget``.
+
+    ``sigma_units`` is the demand spread covered by one unit of Z,
+    ``holding_cost`` and ``margin`` are per unit, and ``cycles`` is the
+    number of replenishment cycles per holding period. ``budget`` caps
+    the total holding cost of the safety stock; without it every step
+    that pays for itself is taken (``lam == 1``).
+    """
+    sigma_units = np.asarray(sigma_units, dtype=float)
+    holding_cost = np.asarray(holding_cost, dtype=float)
+    dz = np.diff(z_grid)
+    gain = -np.diff(normal_loss(z_grid)) / dz  # lost units avoided per unit of stock, decreasing
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(holding_cost > 0, cycles * np.asarray(margin, dtype=float) / holding_cost, np.inf)
+    factor = np.nan_to_num(factor, nan=0.0, posinf=np.inf)
+    step_cost = holding_cost * sigma_units
+    cum_dz = np.concatenate([[0.0], np.cumsum(dz)])
+
+    def steps(lam):
+        # steps with factor * gain_j > lam; gain is decreasing, so it's a prefix of the grid
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cutoff = np.where(factor > 0, lam / factor, np.inf)
+        return np.searchsorted(-gain, -cutoff, side="left")
+
+    def spend(lam):
+        return float(np.nansum(step_cost * (z_grid[0] + cum_dz[steps(lam)])))
+
+    lam = 1.0
+    if budget is not None and spend(lam) > budget:
+        low, high = lam, lam
+        while spend(high) > budget and high < 1e300:
+            low, high = high, high * 2
+        for _ in range(60):
+            mid = math.sqrt(low * high)
+            low, high = (mid, high) if spend(mid) > budget else (low, mid)
+        lam = high
+
+    z = z_grid[steps(lam)]
+    z = np.where(sigma_units > 0, z, z_grid[0])
+    return {"z": z, "threshold": lam, "spend": spend(lam), "unconstrained_spend": spend(1.0)}
+
+
+def costs(z, sigma_units, holding_cost, margin, cycles):
+    """Holding cost and expected lost margin per row at service level ``z``."""
+    holding = holding_cost * sigma_units * z
+    lost = cycles * margin * sigma_units * normal_loss(z)
+    return holding, lost
+
+
+def optimize_doi(merged, params, holding_cost, cogs, margin_rate=0.25, budget=None, period_days=PERIOD_DAYS):
+    """Per-row Z for the DOI model, plus costs against the Pareto service levels.
+
+    ``holding_cost`` and ``cogs`` are per row (NaN where the SKU isn't in
+    the master); lost margin is ``cogs * margin_rate`` a unit. Only rows
+    whose safety term is in use are optimized. The rest, rows whose Z
+    holds no stock (``ks`` or the multiplier is 0) and rows without cost
+    data keep their Pareto Z and stay out of the budget.
+    ``budget="policy"`` spends what the Pareto Z spend on those rows.
+    A replenishment cycle is taken as ``doi_policy`` days. One unit of Z
+    is costed as the stock ``doi_values`` actually holds for it: ``sigma``
+    scaled by ``ks``, the product type multiplier and the 0.7 factor.
+    """
+    terms = doi.doi_terms(merged, params)
+    holding_cost = np.asarray(holding_cost, dtype=float)
+    margin = np.asarray(cogs, dtype=float) * margin_rate
+    sigma_units = 0.7 * params["ks"] * terms["multiplier"] * terms["sigma"] * terms["avg_demand"]
+    cycles = period_days / np.maximum(terms["base"], 1)
+    rows = (
+        terms["apply"] & bool(params["include_safety"]) &
+        np.isfinite(sigma_units) & (sigma_units > 0) & np.isfinite(holding_cost) & np.isfinite(margin)
+    )
+
+    args = (sigma_units[rows], holding_cost[rows], margin[rows], cycles[rows])
+    policy_holding, policy_lost = costs(terms["z"][rows], *args)
+    if budget == "policy":
+        budget = float(policy_holding.sum())
+    solved = optimize(*args, budget)
+    z = terms["z"].copy()
+    z[rows] = solved["z"]
+    holding, lost = costs(solved["z"], *args)
+    return {
+        "z": z,
+        "service_level": normal_cdf(z),
+        "optimized": rows,
+        "threshold": solved["threshold"],
+        "holding": float(holding.sum()),
+        "lost_margin": float(lost.sum()),
+        "policy_holding": float(policy_holding.sum()),
+        "policy_lost_margin": float(policy_lost.sum()),
+        "unconstrained_holding": solved["unconstrained_spend"],
+    }
@@ -0,0 +1,71 @@
+"""Prefix search over SKU labels (``"<product id> - <product name>"``).
+
+The Last Bite SKU picker used to send the browser a selectbox holding
+every label. ``build`` indexes the labels once per prepared frame:
+
+- the labels, sorted;
+- every lower-cased word or number in them, as a sorted vocabulary;
+- postings (``offsets`` into ``rows``) that point from each word back to
+  the label positions.
+
+The vocabulary is sorted, so all words starting with a prefix form one
+contiguous range. Two ``searchsorted`` calls find it, and its postings
+are one slice.
+
+    index = skuindex.build(df["product id"], df["product name"])
+    hits = skuindex.search(index, "indomie gor")   # label positions, best first
+    index["labels"][hits], index["ids"][hits]
+
+Every word of the query has to prefix some word of the label. An exact
+product id comes first, then the rest in label order.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+MATCHES = 50
+_WORD = re.compile(r"[^\W_]+")
+_LAST = "\U0010ffff"  # sorts after every character, so word + _LAST bounds a prefix
+
+
+def words(text):
+    return _WORD.findall(str(text).lower())
+
+
+def build(ids, names):
+    """Search index over the labels of ``ids`` / ``names`` (row-aligned); the last row wins for a repeated label."""
+    ids = pd.Series(ids).reset_index(drop=True)
+    labels = ids.astype(str) + " - " + pd.Series(names).reset_index(drop=True).astype(object)
+    frame = pd.DataFrame({"label": labels, "id": ids})
+    frame = frame[frame["label"].notna()].drop_duplicates("label", keep="last")
+    frame = frame.sort_values("label").reset_index(drop=True)
+
+    found = frame["label"].str.lower().str.findall(_WORD.pattern).explode().dropna()
+    postings = pd.DataFrame({"word": found.to_numpy(dtype=object), "row": found.index.to_numpy(dtype=np.int32)})
+    postings = postings.drop_duplicates().sort_values(["word", "row"])
+    vocab, starts = np.unique(postings["word"].to_numpy(), return_index=True)
+    return {
+        "labels": frame["label"].to_numpy(dtype=object),
+        "ids": frame["id"].to_numpy(),
+        "keys": frame["id"].astype(str).to_numpy(dtype=object),
+        "vocab": vocab,
+        "offsets": np.append(starts, len(postings)),
+        "rows": postings["row"].to_numpy(),
+    }
+
+
+def search(index, query, limit=MATCHES):
+    """Positions of up to ``limit`` labels matching ``query``; an empty query gives the first labels."""
+    terms = words(query)
+    if not terms:
+        return np.arange(min(limit, len(index["labels"])))
+    hits = None
+    for term in terms:
+        lo, hi = np.searchsorted(index["vocab"], [term, term + _LAST])
+        rows = np.unique(index["rows"][index["offsets"][lo]:index["offsets"][hi]])
+        hits = rows if hits is None else np.intersect1d(hits, rows, assume_unique=True)
+        if not len(hits):
+            break
+    exact = index["keys"][hits] == query.strip()
+    return np.concatenate([hits[exact], hits[~exact]])[:limit]
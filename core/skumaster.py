@@ -0,0 +1,170 @@
+"""Compact on-disk SKU master (occupancy.csv) joined by sorted product id.
+
+``build`` writes one directory per version of the master: the product ids
+sorted ascending, each numeric attribute as its own ``.npy`` array, and
+each text attribute as a packed UTF-8 buffer plus offsets and a validity
+bitmap (Arrow's large_string layout). ``load`` memory-maps them, so every
+process (and every session in it) shares the same pages through the OS
+cache instead of holding a parsed frame, and wraps the text buffers as
+Arrow arrays without copying. Joining resolves ids with
+``np.searchsorted`` (O(n log m)) and gathers attributes by position.
+
+    master = skumaster.ensure(holding_df)             # rebuilds only when the content changes
+    df = skumaster.join(master, soh_df, ["cogs", "brand company"])
+
+Column names are stored stripped and lower-cased, like the Last Bite
+frame uses them. When an id appears more than once the first row wins.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from core import sources
+
+ID_COLUMN = "product id"
+_META = "meta.json"
+
+
+def content_version(holding_df):
+    hashes = pd.util.hash_pandas_object(holding_df, index=False).to_numpy()
+    columns = "\x1f".join(map(str, holding_df.columns)).encode()
+    return hashlib.sha256(hashes.tobytes() + columns).hexdigest()[:16]
+
+
+def _save(path, name, values):
+    # Write next to the target and rename, so a reader never sees half a file
+    tmp = os.path.join(path, f".{name}.tmp.npy")
+    np.save(tmp, values)
+    os.replace(tmp, os.path.join(path, f"{name}.npy"))
+
+
+def build(holding_df, path=None, version=None):
+    """Write ``holding_df`` as a new master version under ``path`` and make it current."""
+    path = path or sources.SKU_MASTER_PATH
+    version = version or content_version(holding_df)
+    df = holding_df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+
+    ids = pd.to_numeric(df[ID_COLUMN], errors="coerce")
+    keep = ids.notna() & (ids == np.floor(ids))
+    df = df[keep.to_numpy()]
+    ids = ids[keep].to_numpy().astype(np.int64)
+    order = np.argsort(ids, kind="stable")
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = ids[order][1:] != ids[order][:-1]
+    order = order[first]
+
+    target = os.path.join(path, version)
+    os.makedirs(target, exist_ok=True)
+    _save(target, "ids", ids[order])
+    columns = []
+    for i, col in enumerate(c for c in df.columns if c != ID_COLUMN):
+        values = df[col].iloc[order]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            _save(target, f"c{i}", values.to_numpy())
+            columns.append({"name": col, "file": f"c{i}", "kind": "numeric"})
+        else:
+            null = values.isna().to_numpy()
+            text = pa.array(values.where(null, values.astype(str)), type=pa.large_string(), from_pandas=True)
+            offsets = np.frombuffer(text.buffers()[1], dtype=np.int64)[:len(text) + 1]
+            data = np.frombuffer(text.buffers()[2], dtype=np.uint8)[:offsets[-1]] if text.buffers()[2] else np.empty(0, np.uint8)
+            _save(target, f"c{i}.data", data)
+            _save(target, f"c{i}.offsets", offsets)
+            _save(target, f"c{i}.valid", np.packbits(~null, bitorder="little"))
+            columns.append({"name": col, "file": f"c{i}", "kind": "text"})
+
+    meta = {"version": version, "rows": int(len(order)), "columns": columns}
+    with open(os.path.join(target, _META), "w") as f:
+        json.dump(meta, f)
+    tmp = os.path.join(path, f".{_META}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"current": version}, f)
+    os.replace(tmp, os.path.join(path, _META))
+
+    # Older versions can go: open maps keep their (unlinked) files alive
+    for name in os.listdir(path):
+        if name != version and os.path.isdir(os.path.join(path, name)):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return version
+
+
+def current_version(path=None):
+    try:
+        with open(os.path.join(path or sources.SKU_MASTER_PATH, _META)) as f:
+            return json.load(f)["current"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load(path=None, version=None):
+    """Memory-map a master version (default: the current one)."""
+    path = path or sources.SKU_MASTER_PATH
+    version = version or current_version(path)
+    if version is None:
+        raise FileNotFoundError(f"no SKU master under {path!r}; build one first")
+    target = os.path.join(path, version)
+    with open(os.path.join(target, _META)) as f:
+        meta = json.load(f)
+
+    def mapped(name):
+        return np.load(os.path.join(target, f"{name}.npy"), mmap_mode="r")
+
+    master = {"version": version, "ids": mapped("ids"), "columns": {}}
+    for col in meta["columns"]:
+        if col["kind"] == "numeric":
+            master["columns"][col["name"]] = mapped(col["file"])
+        else:
+            offsets, data, valid = (mapped(f"{col['file']}.{part}") for part in ("offsets", "data", "valid"))
+            master["columns"][col["name"]] = pa.LargeStringArray.from_buffers(
+                meta["rows"], pa.py_buffer(offsets), pa.py_buffer(data), pa.py_buffer(valid),
+            )
+    return master
+
+
+def ensure(holding_df, path=None):
+    """The master for ``holding_df``, rebuilt first if the stored one has other content."""
+    version = content_version(holding_df)
+    if current_version(path) != version:
+        build(holding_df, path, version)
+    return load(path, version)
+
+
+def locate(master, product_ids):
+    """Row of each product id in the master, and whether it was found."""
+    keys = pd.to_numeric(pd.Series(product_ids), errors="coerce").to_numpy(dtype=float)
+    valid = ~np.isnan(keys) & (keys == np.floor(keys))
+    keys = np.where(valid, keys, 0).astype(np.int64)
+    ids = master["ids"]
+    pos = np.minimum(np.searchsorted(ids, keys), max(len(ids) - 1, 0))
+    found = valid & (len(ids) > 0)
+    if len(ids):
+        found &= ids[pos] == keys
+    return pos, found
+
+
+def column(master, name, pos, found=None):
+    """Values of attribute ``name`` at master rows ``pos`` (missing where not ``found``)."""
+    values = master["columns"][name]
+    if isinstance(values, pa.Array):
+        indices = pa.array(pos, mask=None if found is None else ~found)
+        return values.take(indices).to_pandas().array
+    values = np.asarray(values[pos])
+    if found is not None and not found.all():
+        values = np.where(found, values, np.nan)
+    return values
+
+
+def join(master, df, columns=None, on=ID_COLUMN, how="inner"):
+    """``df`` with the master's ``columns`` attached by product id (``inner`` or ``left``)."""
+    columns = list(master["columns"]) if columns is None else list(columns)
+    pos, found = locate(master, df[on])
+    if how == "inner":
+        df, pos, found = df[found], pos[found], None
+    elif how != "left":
+        raise ValueError(f"how must be 'inner' or 'left', not {how!r}")
+    return df.assign(**{name: column(master, name, pos, found) for name in columns})
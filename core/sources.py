@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+# ---- Local files bundled with the repo ----
+FORECAST_PATH = "forecast dates.xlsx"
+STL_SKUS_PATH = "dedicated from stl 2.csv"
+INBOUND_PATH = "inbound.xlsx"
+OUTBOUND_PATH = "outbound.xlsx"
+
+# ---- Remote sources ----
+# Each URL can be pointed at a local file (or another URL) through the
+# environment variable of the same name prefixed with KOANDRA_, e.g.
+# KOANDRA_SOH_CSV_URL=/tmp/soh.csv. The load tests use this for stand-ins.
+def _source(name, default):
+    return os.environ.get(f"KOANDRA_{name}", default)
+
+
+# Last Bite
+SOH_CSV_URL = _source("SOH_CSV_URL", "https://docs.google.com/spreadsheets/d/1AdgfuvN_JrKNYKL6NXe9lX_Cd86o5u_2sr71SZIiOz4/export?format=csv&gid=251919600")
+FC_CSV_URL = _source("FC_CSV_URL", "https://raw.githubusercontent.com/ameliatjanastro/ko-andra/main/sales.csv")
+HOLDING_COST_CSV_URL = _source("HOLDING_COST_CSV_URL", "https://raw.githubusercontent.com/ameliatjanastro/ko-andra/main/occupancy.csv")
+
+# Dynamic DOI (Google Sheet)
+SHEET_ID = "117aUCWmv8zPtypTrIk-bGdYe_FppnGXcnm5rlsIlYVU"
+BASE_URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/gviz/tq?tqx=out:csv"
+DATA_URL = _source("DATA_URL", f"{BASE_URL}&sheet=database")
+RESCHED_URL = _source("RESCHED_URL", f"{BASE_URL}&sheet=reschedule")
+
+# ---- Local state ----
+# Historical supply SO / OOS% time series (see core.store)
+STORE_PATH = _source("STORE_PATH", "history.sqlite")
+# Memory-mapped SKU master built from occupancy.csv (see core.skumaster)
+SKU_MASTER_PATH = _source("SKU_MASTER_PATH", "sku_master")
+# Location-partitioned Parquet copies of the sheets (see core.lake)
+LAKE_PATH = _source("LAKE_PATH", "lake")
+# Precomputed default outputs of the apps (see core.precompute); the worker
+# runs inside the app process when PRECOMPUTE_EVERY (seconds) is set
+ARTIFACTS_PATH = _source("ARTIFACTS_PATH", "artifacts")
+PRECOMPUTE_EVERY = _source("PRECOMPUTE_EVERY", "")
+PRECOMPUTE_AT = _source("PRECOMPUTE_AT", "")
+
+
+def read_table(path_or_buffer, name=None):
+    """Read a csv or Excel file (path or uploaded buffer) by its extension."""
+    name = name or getattr(path_or_buffer, "name", None) or str(path_or_buffer)
+    if str(name).lower().endswith(".csv"):
+        return pd.read_csv(path_or_buffer)
+    return pd.read_excel(path_or_buffer)
+
+
+def load_demand_forecast(path=FORECAST_PATH):
+    demand_forecast = pd.read_excel(path)
+    demand_forecast["Date Key"] = pd.to_datetime(demand_forecast["Date Key"])
+    return demand_forecast
+
+
+def load_stl_skus(path=STL_SKUS_PATH):
+    return set(pd.read_csv(path)["Product ID"])
+
+
+def load_doi_sources(data_url=DATA_URL, resched_url=RESCHED_URL):
+    return pd.read_csv(data_url), pd.read_csv(resched_url)
+
+
+def load_lastbite_sources(soh_url=SOH_CSV_URL, fc_url=FC_CSV_URL, holding_url=HOLDING_COST_CSV_URL):
+    return pd.read_csv(soh_url), pd.read_csv(fc_url), pd.read_csv(holding_url)
@@ -0,0 +1,221 @@
+"""Local time-series store for the historical supply SO and OOS% uploads.
+
+One SQLite file holds every daily value keyed by ``(kind, source, date)``:
+``("supply", "KOS" | "STL", date)`` and ``("oos", "OOS%", date)``. Uploads
+are ingested as upserts: rows that are already stored with the same value
+are skipped, corrections overwrite, nothing is ever deleted. A watermark
+per kind records the last date stored, so the apps know how fresh the
+history is without scanning it.
+
+    store.ingest_supply(pd.read_excel("supply.xlsx"))
+    supply = store.read_supply("2025-03-01")   # Date, KOS, STL
+    oos = store.read_oos()                     # Date Key, OOS%
+    supply, oos = store.history()              # full history, read incrementally
+
+``history`` keeps the frames it has read per process. After an ingest
+(the watermark version moved) it only reads the rows ingested since the
+last call, through the ``(kind, ingested_at)`` index. Corrections to
+older days come along, since an upsert stamps ``ingested_at`` too.
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from core import sources
+
+SUPPLY_SOURCES = ("KOS", "STL")
+OOS_SOURCE = "OOS%"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    value REAL,
+    ingested_at TEXT NOT NULL,
+    PRIMARY KEY (kind, source, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watermark (
+    kind TEXT PRIMARY KEY,
+    last_date TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS series_ingested ON series (kind, ingested_at);
+"""
+
+_write_lock = threading.Lock()
+_ready = set()  # store paths whose schema exists
+_history_lock = threading.Lock()
+_history = {}  # (path, kind) -> {"file", "version", "seen", "wide"}
+
+
+def connect(path=None):
+    path = path or sources.STORE_PATH
+    # The schema is created once per store file, not on every read; a file
+    # that was deleted since gets it again
+    fresh = path not in _ready or not os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=30)
+    if fresh:
+        conn.executescript(_SCHEMA)
+        _ready.add(path)
+    return conn
+
+
+@contextlib.contextmanager
+def _session(path=None):
+    # ``with conn`` only commits or rolls back; the connection is closed here,
+    # so a rerun doesn't leave a handle behind
+    conn = connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _long(df, date_col, columns, kind):
+    # Wide upload -> (kind, source, date, value) rows, last row wins per date
+    df = df.copy()
+    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+    df = df.dropna(subset=[date_col]).drop_duplicates(subset=[date_col], keep="last")
+    rows = df.melt(id_vars=[date_col], value_vars=list(columns), var_name="source", value_name="value")
+    rows["value"] = pd.to_numeric(rows["value"], errors="coerce")
+    rows["date"] = rows[date_col].dt.strftime("%Y-%m-%d")
+    rows["kind"] = kind
+    return rows[["kind", "source", "date", "value"]]
+
+
+def _ingest(rows, kind, path=None):
+    """Upsert ``rows`` and move the watermark. Returns the number of rows written."""
+    if rows.empty:
+        return 0
+    with _write_lock, _session(path) as conn:
+        # Only rows that are new or changed get written
+        stored = pd.read_sql_query(
+            "SELECT source, date, value AS stored FROM series WHERE kind = ? AND date BETWEEN ? AND ?",
+            conn, params=(kind, rows["date"].min(), rows["date"].max()),
+        )
+        merged = rows.merge(stored, on=["source", "date"], how="left", indicator=True)
+        same = (merged["_merge"] == "both") & (
+            (merged["value"] == merged["stored"]) | (merged["value"].isna() & merged["stored"].isna())
+        )
+        changed = merged.loc[~same, ["kind", "source", "date", "value"]]
+        if changed.empty:
+            return 0
+
+        now = _now()
+        conn.executemany(
+            "INSERT INTO series (kind, source, date, value, ingested_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, source, date) DO UPDATE SET value = excluded.value, ingested_at = excluded.ingested_at",
+            [(k, s, d, None if pd.isna(v) else float(v), now) for k, s, d, v in changed.itertuples(index=False)],
+        )
+        conn.execute(
+            "INSERT INTO watermark (kind, last_date, updated_at, version) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (kind) DO UPDATE SET last_date = MAX(last_date, excluded.last_date), "
+            "updated_at = excluded.updated_at, version = version + 1",
+            (kind, rows["date"].max(), now),
+        )
+        return len(changed)
+
+
+def ingest_supply(supply_data, path=None):
+    """Upsert a Historical Supply SO upload (``Date``, ``KOS``, ``STL``)."""
+    return _ingest(_long(supply_data, "Date", SUPPLY_SOURCES, "supply"), "supply", path)
+
+
+def ingest_oos(oos_data, path=None):
+    """Upsert a Historical OOS% upload (``Date Key``, ``OOS%``)."""
+    return _ingest(_long(oos_data, "Date Key", [OOS_SOURCE], "oos"), "oos", path)
+
+
+def _read(kind, start=None, end=None, path=None):
+    query = "SELECT source, date, value FROM series WHERE kind = ?"
+    params = [kind]
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(pd.to_datetime(start).strftime("%Y-%m-%d"))
+    if end is not None:
+        query += " AND date <= ?"
+        params.append(pd.to_datetime(end).strftime("%Y-%m-%d"))
+    with _session(path) as conn:
+        rows = pd.read_sql_query(query + " ORDER BY date", conn, params=params)
+    return _pivot(rows)
+
+
+def _pivot(rows):
+    wide = rows.pivot(index="date", columns="source", values="value")
+    wide.index = pd.to_datetime(wide.index)
+    return wide
+
+
+def _read_history(kind, path=None):
+    # Wide history of ``kind``; after the first read only rows ingested since are fetched
+    key = (path or sources.STORE_PATH, kind)
+    with _session(path) as conn:
+        row = conn.execute("SELECT version FROM watermark WHERE kind = ?", (kind,)).fetchone()
+        version = row[0] if row else 0
+        file = os.stat(key[0]).st_ino
+        with _history_lock:
+            cached = _history.get(key)
+        if cached is not None and cached["file"] != file:
+            cached = None  # The store file was replaced: start over
+        if cached is not None and cached["version"] == version:
+            return cached["wide"]
+        # A lower version also means the store was reset
+        since = cached["seen"] if cached is not None and cached["version"] < version else None
+        query = "SELECT source, date, value, ingested_at FROM series WHERE kind = ?"
+        params = [kind]
+        if since is not None:
+            query += " AND ingested_at >= ?"  # ingested_at has second precision, so >= and overwrite
+            params.append(since)
+        rows = pd.read_sql_query(query, conn, params=params)
+
+    new = _pivot(rows).sort_index()
+    if since is not None:
+        wide = cached["wide"]
+        index = wide.index.union(new.index)
+        columns = wide.columns.union(new.columns)
+        present = _pivot(rows.assign(value=1.0)).reindex(index=index, columns=columns).notna()
+        new = new.reindex(index=index, columns=columns).where(present, wide.reindex(index=index, columns=columns))
+    seen = rows["ingested_at"].max() if len(rows) else (cached["seen"] if since is not None else "")
+    with _history_lock:
+        _history[key] = {"file": file, "version": version, "seen": seen, "wide": new}
+    return new
+
+
+def history(path=None):
+    """Full stored ``(supply, oos)`` history in the uploads' layouts, read incrementally (see module docs)."""
+    supply = _read_history("supply", path).reindex(columns=list(SUPPLY_SOURCES))
+    oos = _read_history("oos", path).reindex(columns=[OOS_SOURCE])
+    return (
+        supply.rename_axis("Date").reset_index().rename_axis(None, axis=1),
+        oos.rename_axis("Date Key").reset_index().rename_axis(None, axis=1),
+    )
+
+
+def read_supply(start=None, end=None, path=None):
+    """Stored supply SO between ``start`` and ``end`` (inclusive), in the upload's layout."""
+    wide = _read("supply", start, end, path).reindex(columns=list(SUPPLY_SOURCES))
+    return wide.rename_axis("Date").reset_index().rename_axis(None, axis=1)
+
+
+def read_oos(start=None, end=None, path=None):
+    """Stored OOS% between ``start`` and ``end`` (inclusive), in the upload's layout."""
+    wide = _read("oos", start, end, path).reindex(columns=[OOS_SOURCE])
+    return wide.rename_axis("Date Key").reset_index().rename_axis(None, axis=1)
+
+
+def watermarks(path=None):
+    """``{kind: (last_date, version)}`` for every kind ingested so far."""
+    with _session(path) as conn:
+        rows = conn.execute("SELECT kind, last_date, version FROM watermark").fetchall()
+    return {kind: (pd.Timestamp(last_date), version) for kind, last_date, version in rows}
@@ -0,0 +1,89 @@
+"""Result tables that stay numeric all the way to the browser.
+
+The apps used to turn numbers into strings (``f"{x:,.0f}"`` per cell) and
+colour rows with ``Styler.apply(..., axis=1)``, which runs Python per row
+and ships the whole frame. ``show`` keeps the columns numeric and lets
+the grid format them through ``st.column_config``. Highlights are one
+boolean mask for the whole table, computed with array ops by the caller.
+Only one page of rows is sent at a time:
+
+    tables.show(
+        df,
+        formats={"KOS SO Qty": THOUSANDS, "Projected OOS%": "percent"},
+        highlight=df["Date"].isin(HIGHLIGHT_DATES),
+        key="oos_actual",
+    )
+
+Formats are Streamlit's: printf strings (``"%,.0f"``, ``"%.2f%%"``) or
+named ones (``"percent"``, ``"localized"``). Only the page on screen goes
+through a Styler, and only when it has highlighted rows.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZE = 1000
+THOUSANDS = "%,.0f"
+HIGHLIGHT = "background-color: yellow"
+
+_PRINTF = re.compile(r"%(,?)(\.\d+)?([dfe])")
+
+
+def _python_format(fmt):
+    # The Styler renders highlighted pages itself, so it needs the same formats in Python syntax
+    if fmt == "percent":
+        return "{:.2%}"
+    if fmt in ("localized", "accounting"):
+        return "{:,.2f}"
+    match = _PRINTF.search(fmt) if isinstance(fmt, str) else None
+    if match is None:
+        return None
+    separator, precision, kind = match.groups()
+    if kind == "d":
+        precision, kind = ".0", "f"
+    spec = "{:" + separator + (precision or "") + kind + "}"
+    return (fmt[:match.start()] + spec + fmt[match.end():]).replace("%%", "%")
+
+
+def page_slice(n_rows, page_size=PAGE_SIZE, key="table"):
+    """Row range of the page picked with a pager (shown only when there's more than one page)."""
+    pages = max(1, -(-n_rows // page_size))
+    if pages == 1:
+        return 0, n_rows
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        # Keyed by the page count too, so a filter that shrinks the table starts over at page 1
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page_{pages}")
+    start = (page - 1) * page_size
+    stop = min(start + page_size, n_rows)
+    with col2:
+        st.caption(f"Rows {start + 1:,}–{stop:,} of {n_rows:,} ({pages:,} pages)")
+    return start, stop
+
+
+def show(df, formats=None, highlight=None, color=HIGHLIGHT, page_size=PAGE_SIZE, key="table", column_config=None, **kwargs):
+    """``st.dataframe`` of one page of ``df``, numeric columns formatted by column config.
+
+    ``highlight`` is a boolean mask over the rows of ``df`` (array or
+    Series); matching rows get ``color`` as CSS. Other keyword arguments
+    go to ``st.dataframe``.
+    """
+    formats = formats or {}
+    config = {col: st.column_config.NumberColumn(format=fmt) for col, fmt in formats.items() if col in df.columns}
+    config.update(column_config or {})
+    kwargs.setdefault("use_container_width", True)
+
+    start, stop = page_slice(len(df), page_size, key)
+    page = df.iloc[start:stop]
+    mask = None if highlight is None else np.asarray(highlight, dtype=bool)[start:stop]
+    if mask is None or not mask.any():
+        return st.dataframe(page, column_config=config, **kwargs)
+
+    styles = np.where(mask[:, None], color, "")
+    styles = np.broadcast_to(styles, page.shape)
+    styler = page.style.apply(lambda data: pd.DataFrame(styles, index=data.index, columns=data.columns), axis=None)
+    python_formats = {col: _python_format(fmt) for col, fmt in formats.items() if col in page.columns}
+    styler = styler.format({col: fmt for col, fmt in python_formats.items() if fmt}, na_rep="")
+    return st.dataframe(styler, column_config=config, **kwargs)
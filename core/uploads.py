@@ -0,0 +1,152 @@
+"""Process-wide cache of parsed uploads, keyed by the content's SHA-256.
+
+Streamlit hands the script the same uploaded bytes on every rerun, and each
+rerun used to run ``pd.read_excel`` on them again. Here a file is parsed
+once per process: its columns go through an Arrow table once, so they get
+the pandas dtypes Arrow maps them to (datetimes, ``str``, numbers). Mixed
+object columns (e.g. IDs typed as text in some rows) aren't representable
+and stay as parsed. The frame is kept in an LRU bounded by
+KOANDRA_UPLOAD_CACHE_MB (default 256), counting its deep memory usage.
+The cache is a module global behind a lock, not ``st.cache_data``, so every
+session and every app running as a page of the same server shares it.
+
+    df = uploads.read_upload(st.file_uploader("Forecast", type="xlsx"))
+
+Callers get a shallow copy of the cached frame. Copy-on-write keeps
+renaming, adding or assigning columns on it from leaking into another
+session, and nothing is converted again on a hit.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+
+from core import sources
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # (digest, reader) -> (frame, bytes)
+_parsing = {}           # (digest, reader) -> lock held while the first caller parses
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def budget_bytes():
+    try:
+        return int(float(os.environ.get("KOANDRA_UPLOAD_CACHE_MB", 256)) * 2**20)
+    except ValueError:
+        return 256 * 2**20
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _reader(name):
+    return "csv" if str(name).lower().endswith(".csv") else "excel"
+
+
+def representable(values):
+    """Whether a column converts to Arrow as it is."""
+    if values.dtype != object:
+        return True
+    try:
+        pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return False
+    return True
+
+
+def normalize(df):
+    """Make every column Arrow-representable (for Parquet) without changing clean columns.
+
+    Object columns holding one kind of value (numbers, strings, datetimes)
+    convert as they are. A mixed one whose values are all numbers or
+    numeric text (e.g. IDs typed as text in some rows) becomes numeric, so
+    it still matches its integer counterparts; any other mixed column
+    becomes strings, with missing cells left missing.
+    """
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        if representable(df[col]):
+            continue
+        numeric = pd.to_numeric(df[col], errors="coerce")
+        if numeric.notna().sum() == df[col].notna().sum():
+            df[col] = numeric
+        else:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _to_entry(df):
+    # Converted once per parse, by position: Arrow field names must be
+    # unique strings, so the real labels (dates, ints) are put back afterwards
+    labels = df.columns
+    df = df.set_axis(range(len(labels)), axis=1)
+    convert = [i for i in df.columns if representable(df[i])]
+    frame = df.drop(columns=convert)
+    if convert:
+        converted = pa.Table.from_pandas(df[convert], preserve_index=False).to_pandas()
+        frame = pd.concat([converted.set_axis(convert, axis=1).set_axis(df.index), frame], axis=1)[list(df.columns)]
+    frame.columns = labels
+    return frame, int(frame.memory_usage(deep=True).sum())
+
+
+def _to_frame(entry):
+    return entry[0].copy(deep=False)
+
+
+def _evict(budget):
+    used = sum(size for _, size in _cache.values())
+    while _cache and used > budget:
+        _, (_, size) = _cache.popitem(last=False)
+        used -= size
+        _stats["evictions"] += 1
+
+
+def read_upload(upload, name=None):
+    """Parsed frame of an uploaded file (``UploadedFile`` or raw bytes plus ``name``)."""
+    data = upload if isinstance(upload, (bytes, bytearray, memoryview)) else upload.getvalue()
+    name = name or getattr(upload, "name", "")
+    key = (digest(data), _reader(name))
+
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return _to_frame(_cache[key])
+        parsing = _parsing.setdefault(key, threading.Lock())
+
+    # Sessions uploading the same file at once wait for one parse
+    with parsing:
+        try:
+            with _lock:
+                if key in _cache:
+                    _cache.move_to_end(key)
+                    _stats["hits"] += 1
+                    return _to_frame(_cache[key])
+            entry = _to_entry(sources.read_table(io.BytesIO(data), name))
+            with _lock:
+                _stats["misses"] += 1
+                budget = budget_bytes()
+                if entry[1] <= budget:
+                    _cache[key] = entry
+                    _evict(budget)
+        finally:
+            # Also when parsing raised, so a bad file doesn't leave its lock behind
+            with _lock:
+                _parsing.pop(key, None)
+    return _to_frame(entry)
+
+
+def stats():
+    """Hit/miss/eviction counts plus the entries and bytes currently cached."""
+    with _lock:
+        return dict(_stats, entries=len(_cache), bytes=sum(size for _, size in _cache.values()))
+
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -1,21 +1,13 @@
-import streamlit as st
 import pandas as pd
-import numpy as np
-
-# ---- Google Sheet Setup ----
-SHEET_ID = "117aUCWmv8zPtypTrIk-bGdYe_FppnGXcnm5rlsIlYVU"
-BASE_URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/gviz/tq?tqx=out:csv"
-DATA_URL = f"{BASE_URL}&sheet=database"
-RESCHED_URL = f"{BASE_URL}&sheet=reschedule"
+import plotly.graph_objects as go
+import streamlit as st
 
-@st.cache_data(ttl=86400)
-def load_data():
-    data_base = pd.read_csv(DATA_URL)
-    resched = pd.read_csv(RESCHED_URL)
-    return data_base, resched
+from core import datasets, perf, precompute, servicelevel, skumaster, tables
+from core.doi import compute_final_doi, doi_sweep, parse_values
 
 # ---- App Config and Title ----
 st.set_page_config(page_title="Dynamic DOI Calculator")
+perf.begin("dynamic_doiwh")
 
 st.markdown("""
     <style>
@@ -68,13 +60,17 @@ st.markdown("""
 st.markdown("<h1 style='font-size: 22px;'>📦 Dynamic DOI Calculator</h1>", unsafe_allow_html=True)
 
 # ---- Load Data ----
-with st.spinner("Loading data from Google Sheets..."):
-    data_df, resched_df = load_data()
+# The sheets are stored partitioned by warehouse (core.lake); only the selected ones are read
+with st.spinner("Loading data from Google Sheets..."), perf.span("load"):
+    warehouses = datasets.doi_locations()
     st.success("Data successfully loaded!")
 
-# ---- Standardize Columns ----
-data_df.columns = data_df.columns.str.strip().str.lower()
-resched_df.columns = resched_df.columns.str.strip().str.lower()
+st.sidebar.header("Warehouses")
+selected_warehouses = st.sidebar.multiselect("Warehouses", warehouses, default=warehouses, label_visibility="collapsed")
+if not selected_warehouses:
+    st.warning("Select at least one warehouse.")
+    perf.panel()
+    st.stop()
 
 # ---- Sidebar: Module Toggle ----
 st.sidebar.header("Select DOI Components to Include")
@@ -89,6 +85,13 @@ selected_pareto = st.sidebar.multiselect("Pareto Classes", ["X", "A", "B", "C",
 selected_demand = st.sidebar.multiselect("Demand Types", ["Stable", "Volatile", "Moderate"], default=["Volatile"])
 selected_product_types = st.sidebar.multiselect("Product Types", ["Fresh", "Frozen", "Dry"], default=["Fresh", "Frozen", "Dry"])
 
+# ---- Sidebar: Service Level ----
+st.sidebar.header("Service Level")
+optimize_z = st.sidebar.checkbox("Optimize Z per SKU (holding cost vs lost margin)", False, disabled=not include_safety)
+if optimize_z and include_safety:
+    margin_rate = st.sidebar.number_input("Margin (% of COGS)", value=25.0, step=5.0, min_value=0.0) / 100
+    z_budget = st.sidebar.number_input("Safety stock budget / month (0 = same as Pareto Z)", value=0.0, step=1_000_000.0, min_value=0.0)
+
 pareto_weight = {"X": 0, "A": 0, "B": 0, "C": 0}
 product_type_scaler = {"Fresh": 1.0, "Frozen": 1.0, "Dry": 1.0}
 
@@ -140,75 +143,47 @@ with st.expander("⚙️ Adjust Model Parameters", expanded=False):
 
 
 # ---- Merge Reschedule Data ----
-resched_df = resched_df.rename(columns={"wh_id": "location_id"})
-data_df["location_id"] = data_df["location_id"].astype(str)
-data_df["product_id"] = data_df["product_id"].astype(str)
-resched_df["location_id"] = resched_df["location_id"].astype(str)
-resched_df["product_id"] = resched_df["product_id"].astype(str)
-
-merged = data_df.merge(resched_df, on=["location_id", "product_id"], how="left")
-merged["resched_count"] = merged["resched_count"].fillna(0)
-merged["total_inbound"] = merged["total_inbound"].fillna(1)
-
-# ---- Convert numeric columns safely ----
-for col in ["lead_time", "lead_time_std", "avg_demand", "std_demand", "resched_count", "total_inbound", "doi_policy"]:
-    if col in merged.columns:
-        merged[col] = pd.to_numeric(merged[col], errors="coerce").fillna(0)
+# Joined once per sheet refresh and warehouse selection on int64 (location_id, product_id) keys
+with perf.span("load"):
+    merged, join_report = datasets.doi_merged(selected_warehouses)
+perf.frame("merged_source", merged)
 
 # ---- Compute Final DOI ----
-def compute_doi(row):
-    try:
-        base_doi = row["doi_policy"]
-        pareto = str(row.get("pareto", "")).strip()
-        cleaned_pareto = pareto if pareto in ["X", "A", "B"] else "C"
-        demand_type = row.get("demand_type", "")
-        product_type = row.get("product_type_name", "")
-
-        apply_logic = (
-            cleaned_pareto in selected_pareto and
-            demand_type in selected_demand and
-            product_type in selected_product_types
-        )
-
-        if not apply_logic:
-            final_doi = base_doi
-        else:
-            
-            std_d_ratio = row["std_demand"] / row["avg_demand"] if row["avg_demand"] != 0 else 0
-            Z = 1.65 if cleaned_pareto in ["X", "A"] else 1.5
-            
-            safety = (
-                Z * np.sqrt((row["lead_time_std"] ** 2) + (row["lead_time"] ** 2) * (std_d_ratio ** 2)) * ks
-                if include_safety else 0
-            )
-
-            resched = (
-                kr * row["lead_time"] * (row["resched_count"] / row["total_inbound"])
-                if include_reschedule else 0
-            )
-
-            pareto_val = kp * pareto_weight.get(cleaned_pareto, 0)
-            multiplier = product_type_scaler.get(product_type, 1.0)
-
-            final_doi = 0.7 * (base_doi + safety + resched + pareto_val) * multiplier
-
-        # If xdock = TRUE, override final DOI
-        #if str(row.get("xdock", "")).strip().upper() == "TRUE":
-            #final_doi = 0
-
-        return round(final_doi, 2)
-
-    except Exception as e:
-        print(f"Error computing DOI for row: {e}")
-        return None
-
-
-
-# ---- Apply Computation ----
-merged["final_doi"] = merged.apply(compute_doi, axis=1)
-merged["location_id"] = pd.to_numeric(merged["location_id"], errors="coerce").fillna(0).astype(int)
-merged["doi_policy"] = merged["doi_policy"].round(2)
-merged["final_doi"] = merged["final_doi"].round(2)
+doi_params = {
+    "include_safety": include_safety,
+    "include_reschedule": include_reschedule,
+    "include_pareto": include_pareto,
+    "include_multiplier": include_multiplier,
+    "selected_pareto": selected_pareto,
+    "selected_demand": selected_demand,
+    "selected_product_types": selected_product_types,
+    "ks": ks,
+    "kr": kr,
+    "kp": kp,
+    "pareto_weight": pareto_weight,
+    "product_type_scaler": product_type_scaler,
+}
+# COGS and holding cost by product id, for the optimizer and the sweep
+def sku_costs():
+    master = datasets.sku_master()
+    pos, found = skumaster.locate(master, merged["product_id"])
+    return skumaster.column(master, "holding_cost", pos, found), skumaster.column(master, "cogs", pos, found), found
+
+z_opt = None
+served = None
+with perf.span("compute"):
+    if optimize_z and include_safety:
+        holding_cost, cogs, _ = sku_costs()
+        # Without a budget, spend what the Pareto service levels spend, reallocated
+        z_opt = servicelevel.optimize_doi(merged, doi_params, holding_cost, cogs, margin_rate, budget=z_budget or "policy")
+    z = None if z_opt is None else z_opt["z"]
+    if z is None:
+        # The default table is precomputed off-peak (core.precompute); any other setting computes live
+        locations = None if len(selected_warehouses) == len(warehouses) else selected_warehouses
+        served = precompute.fetch("doi", datasets.doi_versions(), precompute.doi_params(doi_params, locations))
+    if served is None:
+        merged = compute_final_doi(merged, doi_params, z=z)
+perf.frame("merged", merged)
 
 show_changed_only = st.sidebar.checkbox("Show only rows with changed DOI", value=False)
 #include_xdock = st.sidebar.checkbox("Include xdock items", value=False)
@@ -218,19 +193,22 @@ show_changed_only = st.sidebar.checkbox("Show only rows with changed DOI", value
 st.markdown("<style>div[data-testid='stDataFrame'] table { font-size: 12px !important; }</style>", unsafe_allow_html=True)
 st.markdown("<h3 style='font-size:16px;'>Final DOI Table</h3>", unsafe_allow_html=True)
 
-preview_cols = ["location_id", "product_id", "product_type_name", "pareto", "demand_type", "doi_policy", "final_doi"]
+with perf.span("transform"):
+    table = precompute.doi_table(merged) if served is None else served
+    changed_mask = table.pop("changed").to_numpy()
+    preview_df = table
+    if z_opt is not None:
+        preview_df["z"] = z_opt["z"]
+        preview_df["service_level"] = (z_opt["service_level"] * 100).round(1)
 
-preview_df = merged[preview_cols].fillna("-")
-preview_df["final_doi"] = preview_df["final_doi"].round(2)
-preview_df["doi_policy"] = preview_df["doi_policy"].round(2)
+    filtered_df = preview_df.copy()
+    initial_rows = len(filtered_df)
 
-filtered_df = preview_df.copy()
-initial_rows = len(filtered_df)
-
-if show_changed_only:
-    changed_mask = merged["final_doi"] != merged["doi_policy"]
-    filtered_df = filtered_df[changed_mask]
-    st.write(f"Rows after applying 'changed only' filter: {len(filtered_df)} of {initial_rows}")
+    if show_changed_only:
+        filtered_df = filtered_df[changed_mask]
+        st.write(f"Rows after applying 'changed only' filter: {len(filtered_df)} of {initial_rows}")
+perf.frame("preview_df", preview_df)
+perf.frame("filtered_df", filtered_df)
 
 #if not include_xdock:
     #non_xdock_mask = ~merged["xdock"].astype(str).str.upper().eq("TRUE")
@@ -238,9 +216,132 @@ if show_changed_only:
     #st.write(f"Rows after excluding xdock: {len(filtered_df)}")
 
 
-st.dataframe(filtered_df, use_container_width=True)
+with perf.span("render"):
+    # Paged server-side; changed rows highlighted unless they're all that's shown
+    tables.show(
+        filtered_df,
+        formats={"doi_policy": "%.2f", "final_doi": "%.2f", "z": "%.2f", "service_level": "%.1f%%", "location_id": "%d", "product_id": "%d"},
+        highlight=None if show_changed_only else changed_mask,
+        color="background-color: #FFF3CD",
+        key="doi_table",
+    )
+
+    st.download_button("📥 Download Refined DOI CSV", preview_df.to_csv(index=False), file_name="refined_doi_output.csv")
+
+    orphans = join_report["orphan_reschedule"]
+    with st.expander(f"🔗 Reschedule match: {join_report['matched_rows']:,} of {join_report['rows']:,} rows", expanded=False):
+        st.markdown(
+            f"- Rows without reschedule data: **{join_report['unmatched_rows']:,}** (count 0, total inbound 1)\n"
+            f"- Reschedule keys not in the database: **{len(orphans):,}**\n"
+            f"- Duplicate reschedule keys: **{join_report['duplicate_reschedule_keys']:,}**\n"
+            f"- Ids that aren't whole numbers: **{join_report['invalid_ids']:,}** in the database, "
+            f"**{join_report['invalid_reschedule_ids']:,}** in reschedule"
+        )
+        if len(orphans):
+            st.dataframe(orphans, use_container_width=True)
+
+# ---- Service Level Optimizer ----
+if z_opt is not None:
+    optimized = z_opt["optimized"]
+    with st.expander(f"🎯 Service level optimizer: {int(optimized.sum()):,} rows", expanded=True):
+        s1, s2, s3 = st.columns(3)
+        s1.metric("Holding cost / month", f"{z_opt['holding']:,.0f}", f"{z_opt['holding'] - z_opt['policy_holding']:,.0f}", delta_color="inverse")
+        s2.metric("Expected lost margin / month", f"{z_opt['lost_margin']:,.0f}", f"{z_opt['lost_margin'] - z_opt['policy_lost_margin']:,.0f}", delta_color="inverse")
+        total, policy_total = z_opt["holding"] + z_opt["lost_margin"], z_opt["policy_holding"] + z_opt["policy_lost_margin"]
+        s3.metric("Total", f"{total:,.0f}", f"{total - policy_total:,.0f}", delta_color="inverse")
+        st.caption(
+            f"Deltas are against Pareto Z (1.65 for X/A, 1.5 otherwise). Unconstrained optimum spends "
+            f"{z_opt['unconstrained_holding']:,.0f} on holding; marginal threshold {z_opt['threshold']:.3g}. "
+            f"Rows outside the apply scope or without COGS / holding cost keep Pareto Z."
+        )
+        z_counts = pd.Series(z_opt["z"][optimized]).value_counts().sort_index()
+        st.bar_chart(z_counts.rename("rows"), x_label="Z", y_label="rows")
+
+# ---- Sensitivity Sweep ----
+# Every combination is evaluated over all rows in one broadcast (doi.doi_sweep)
+MAX_COMBINATIONS = 1000
+
+with st.expander("🧪 Sensitivity sweep (ks × kr × kp)", expanded=False):
+    with st.form("sweep_form"):
+        s1, s2, s3 = st.columns(3)
+        with s1:
+            ks_text = st.text_input("ks values", "0.3, 0.5, 0.7, 1.0")
+        with s2:
+            kr_text = st.text_input("kr values", "0.25, 0.5, 0.75, 1.0")
+        with s3:
+            kp_text = st.text_input("kp values", "0, 0.5, 1.0")
+        run_sweep = st.form_submit_button("Run sweep")
+
+    # A stored result belongs to the data, warehouses and parameters it ran
+    # with; changing any of them drops it instead of showing it stale
+    sweep_inputs = precompute.artifact_key("doi_sweep", datasets.doi_versions(), {
+        "locations": sorted(selected_warehouses),
+        "doi": doi_params,
+        "z": None if z is None else {"margin_rate": margin_rate, "budget": z_budget},
+    })
+
+    if run_sweep:
+        error = None
+        try:
+            ks_values, kr_values, kp_values = parse_values(ks_text), parse_values(kr_text), parse_values(kp_text)
+        except ValueError:
+            error = "Enter numbers separated by commas, e.g. 0.3, 0.5, 0.7"
+        else:
+            combinations = len(ks_values) * len(kr_values) * len(kp_values)
+            if not combinations or combinations > MAX_COMBINATIONS:
+                error = f"{combinations:,} combinations; use between 1 and {MAX_COMBINATIONS:,}."
+
+        if error is not None:
+            st.error(error)
+        else:
+            with perf.span("compute"):
+                _, cogs, found = sku_costs()
+                grid = [(a, b, c) for a in ks_values for b in kr_values for c in kp_values]
+                swept = merged if served is None else compute_final_doi(merged, doi_params, z=z)
+                # Kept for reruns, e.g. picking another kp for the heatmap
+                st.session_state["doi_sweep"] = {
+                    "inputs": sweep_inputs,
+                    "df": doi_sweep(swept, doi_params, grid, cogs, z=z),
+                    "kp_values": kp_values,
+                    "caption": (
+                        f"{combinations:,} combinations over {len(merged):,} SKU × location rows. "
+                        f"Inventory value = final DOI × avg demand × COGS; {int(found.sum()):,} rows have a COGS. "
+                        f"Deltas are against the current parameters"
+                        + (", with the optimized Z." if z is not None else ".")
+                        + ("" if include_safety and include_reschedule else " Components switched off in the sidebar ignore their coefficient.")
+                    ),
+                }
+
+    sweep = st.session_state.get("doi_sweep")
+    if sweep is not None and sweep["inputs"] != sweep_inputs:
+        del st.session_state["doi_sweep"]
+        sweep = None
+    if sweep is not None:
+        sweep_df, kp_values = sweep["df"], sweep["kp_values"]
+        perf.frame("sweep_df", sweep_df)
+        with perf.span("render"):
+            st.caption(sweep["caption"])
+            st.dataframe(
+                sweep_df.sort_values("inventory_value"),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "total_doi_days": st.column_config.NumberColumn("DOI-days", format="%.0f"),
+                    "changed_rows": st.column_config.NumberColumn("Changed rows", format="%d"),
+                    "inventory_value": st.column_config.NumberColumn("Inventory value", format="%.0f"),
+                    "delta_doi_days": st.column_config.NumberColumn("Δ DOI-days", format="%.0f"),
+                    "delta_changed_rows": st.column_config.NumberColumn("Δ changed", format="%d"),
+                    "delta_inventory_value": st.column_config.NumberColumn("Δ value", format="%.0f"),
+                },
+            )
+
+            heat_kp = st.selectbox("Heatmap at kp", kp_values, index=len(kp_values) // 2)
+            heat = sweep_df[sweep_df["kp"] == heat_kp].pivot(index="ks", columns="kr", values="inventory_value")
+            fig = go.Figure(go.Heatmap(z=heat.to_numpy(), x=heat.columns.astype(str), y=heat.index.astype(str), colorscale="Blues"))
+            fig.update_layout(xaxis_title="kr", yaxis_title="ks", height=360, margin=dict(t=20, b=20))
+            st.plotly_chart(fig, use_container_width=True)
 
-st.download_button("📥 Download Refined DOI CSV", preview_df.to_csv(index=False), file_name="refined_doi_output.csv")
+perf.panel()
 
 
 
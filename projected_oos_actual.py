@@ -1,10 +1,46 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from core import datasets, demand, oosmodel, perf, precompute, store, tables, uploads
+from core.projection import HIGHLIGHT_DATES, oos_actual_surface, opening_stock, prepare_oos_actual, project_oos_actual
+
+# Slider steps covered by the grid view
+KOS_GRID = np.arange(90000, 110001, 5000)
+STL_GRID = np.arange(60000, 120001, 5000)
+
+
+@st.cache_data(show_spinner="Evaluating KOS x STL grid...")
+def load_surface(supply_data, oos_data, demand_agg, inbound_data, outbound_data, opening_kos, opening_stl):
+    # A 5 x 13 grid broadcasts in-process in well under a millisecond; the
+    # process pool only pays off for the CLI's large grids
+    prepared = prepare_oos_actual(supply_data, oos_data, demand_agg, inbound_data, outbound_data)
+    return oos_actual_surface(prepared, KOS_GRID, STL_GRID, workers=1, opening_kos=opening_kos, opening_stl=opening_stl)
+
+
+# ---- History store ----
+# Uploads are upserted into the local store (only new or changed days are
+# written) and the projection reads the stored history, so yesterday's
+# history doesn't have to be uploaded again. Not cached: the upsert is
+# idempotent, and the store can change under the same bytes. Parsing is
+# cached by core.uploads.
+def ingest_upload(kind, upload):
+    df = uploads.read_upload(upload)
+    return store.ingest_supply(df) if kind == "supply" else store.ingest_oos(df)
+
+
+@st.cache_data(show_spinner=False)
+def load_history(supply_watermark, oos_watermark):
+    # Only rows ingested since the last read are fetched (store.history)
+    return store.history()
 
 
 
 # st.set_page_config(layout="wide")
+perf.begin("projected_oos_actual")
+
 # Streamlit UI
 st.title("OOS Projection Dry STO")
 
@@ -17,21 +53,35 @@ custom_kos_supply = st.sidebar.number_input("KOS SO", min_value=90000, value=100
 custom_stl_supply = st.sidebar.number_input("STL SO", min_value=60000, value=80000, step=5000, max_value=120000)
 
 stock_threshold = custom_kos_supply + custom_stl_supply
+show_grid = st.sidebar.checkbox("Show KOS x STL grid", value=False)
+show_model = st.sidebar.checkbox("Compare with fitted model", value=False)
 
-if supply_file and oos_file:
+with perf.span("ingest"):
+    for kind, upload in (("supply", supply_file), ("oos", oos_file)):
+        if upload:
+            written = ingest_upload(kind, upload)
+            st.sidebar.caption(f"{upload.name}: {written} new/changed rows stored" if written else f"{upload.name}: already stored")
+    history = store.watermarks()
+
+if "supply" in history and "oos" in history:
     # Load Data
-    supply_data = pd.read_excel(supply_file)
-    oos_data = pd.read_excel(oos_file)
-    inbound_data = pd.read_excel("inbound.xlsx")
-    outbound_data = pd.read_excel("outbound.xlsx")
-    demand_forecast = pd.read_excel("forecast dates.xlsx")  # Ensure this file exists
-    
+    with perf.span("load"):
+        supply_data, oos_data = load_history(history["supply"], history["oos"])
+        inbound_data, outbound_data = datasets.flows()
+        demand_agg = demand.aggregates()
+    perf.frame("supply_data", supply_data)
+    perf.frame("oos_data", oos_data)
+
+    # The inbound/outbound plans drive the DC stock from an opening stock;
+    # it defaults to the last stored supply SO before the first projected day
+    opening_help = "DC stock at the start of the first day without actual OOS% (default: the last supply SO before it)"
+    default_kos, default_stl = opening_stock(supply_data, oos_data)
+    opening_kos = st.sidebar.number_input("Opening KOS DC stock", min_value=0, value=default_kos, step=5000, help=opening_help)
+    opening_stl = st.sidebar.number_input("Opening STL DC stock", min_value=0, value=default_stl, step=5000, help=opening_help)
+
     # Convert Date Columns
     supply_data["Date"] = pd.to_datetime(supply_data["Date"])
     oos_data["Date Key"] = pd.to_datetime(oos_data["Date Key"])
-    inbound_data["Date"] = pd.to_datetime(inbound_data["Date"])
-    outbound_data["Date"] = pd.to_datetime(outbound_data["Date"])
-    demand_forecast["Date Key"] = pd.to_datetime(demand_forecast["Date Key"])
 
     latest_supply_date = supply_data["Date"].max().strftime("%d %b %Y") if not supply_data.empty else "N/A"
     latest_oos_date = oos_data["Date Key"].max().strftime("%d %b %Y") if not oos_data.empty else "N/A"
@@ -41,113 +91,17 @@ if supply_file and oos_file:
     st.markdown(f"- **Supply Data:** {latest_supply_date}")
     st.markdown(f"- **OOS Data:** {latest_oos_date}")
     
-    # Sort data
-    supply_data = supply_data.sort_values("Date")
-
-    # Define Fixed Dates for 0 Outbound Days
-    fixed_kos_zero_outbound_days = ["2025-04-19", "2025-04-20"]
-    fixed_stl_zero_outbound_days = ["2025-04-25", "2025-04-26", "2025-04-27"]
-    
-    # Ensure KOS still has outbound on April 18 (45000)
-    locked_kos_days = {"2025-04-18": 45000}
-
-    # OOS Projection Parameters
-    file_only_dates = pd.date_range("2025-04-16", "2025-04-20").tolist() + pd.date_range("2025-04-22", "2025-04-27").tolist()
-    file_only_dates = [d.strftime("%Y-%m-%d") for d in file_only_dates]
-
-    projection_start = pd.to_datetime("2025-03-01")
-    oos_final_adjustments = []
-    #base_oos = recent_oos_data["OOS%"].mean() * 0.01
-    daily_decrease = 0.00015
-
-    # Compute Historical Average Supply
-    historical_avg_supply = (supply_data["KOS"].mean() + supply_data["STL"].mean()) if not supply_data.empty else 180000
-
-    for i, date in enumerate(pd.date_range("2025-03-01", "2025-04-30"), start=1):
-        reference_date = date - pd.Timedelta(days=3)
-        recent_oos_data = oos_data[oos_data["Date Key"] < reference_date].sort_values("Date Key", ascending=False).head(3)
-        base_oos = recent_oos_data["OOS%"].mean() * 0.01
-        prev_date = date - pd.Timedelta(days=1)
-        date_str = date.strftime("%Y-%m-%d")
-
-        # Get historical supply & OOS if available
-        historical_supply = supply_data[supply_data["Date"] == prev_date]
-        historical_oos = oos_data[oos_data["Date Key"] == date]
-
-        if not historical_oos.empty:
-            projected_oos = historical_oos["OOS%"].values[0] * 0.01
-            kos_stock = historical_supply["KOS"].values[0] if not historical_supply.empty else custom_kos_supply
-            stl_stock = historical_supply["STL"].values[0] if not historical_supply.empty else custom_stl_supply
-        else:
-            # Fetch inbound and outbound data
-            inbound_kos = inbound_data.loc[inbound_data["Date"] == date, "KOS"].sum()
-            inbound_stl = inbound_data.loc[inbound_data["Date"] == date, "STL"].sum()
-            outbound_kos = outbound_data.loc[outbound_data["Date"] == date, "KOS"].sum()
-            outbound_stl = outbound_data.loc[outbound_data["Date"] == date, "STL"].sum()
-
-            # Locked supply values for special dates
-            if date_str in locked_kos_days:
-                kos_stock = locked_kos_days[date_str]
-            elif date_str in file_only_dates:
-                kos_stock = historical_supply["KOS"].values[0] if not historical_supply.empty else custom_kos_supply
-                stl_stock = historical_supply["STL"].values[0] if not historical_supply.empty else custom_stl_supply
-            else:
-                kos_stock = custom_kos_supply
-                stl_stock = custom_stl_supply
-
-            # Base OOS calculation
-            if date < pd.Timestamp("2025-04-09"):
-                projected_oos = base_oos  # Use the most recent 3-day average
-            else:
-                projected_oos = max(0, base_oos - daily_decrease)
-            
-            # Stock buildup impact
-            if date_str == "2025-04-17":
-                projected_oos *= 0.95
-            elif date_str == "2025-04-18":
-                projected_oos *= 1.45
-            elif date_str in ["2025-04-23", "2025-04-24"]:
-                projected_oos *= 0.90
-
-            # **🔹 DYNAMIC STOCK FACTOR ADJUSTMENT**
-            total_stock = kos_stock + stl_stock
-
-            # Supply Deviation Factor (compares custom supply to historical average)
-            supply_factor = (total_stock / historical_avg_supply)  
-
-            # Zero outbound adjustments
-            if date_str in fixed_kos_zero_outbound_days:
-                kos_stock = 0
-                projected_oos += 0.012 * ((1 + supply_factor)*0.95)
-            
-            elif date_str in fixed_stl_zero_outbound_days:
-                stl_stock = 0
-                projected_oos += 0.011 * ((1 + supply_factor)*0.9)
-
-            # Dynamic OOS% adjustment based on supply changes
-            if supply_factor > 1:
-                projected_oos *= max(0.75, 1 - (supply_factor - 1) * 0.3)  # Reduce OOS% if supply is higher
-            elif supply_factor < 1:
-                projected_oos *= min(1.35, 1 + (1 - supply_factor) * 0.50)  # Increase OOS% if supply is lower
-
-            # Demand factor influence
-            #next_day = date + pd.Timedelta(days=1)
-            daily_demand = demand_forecast[demand_forecast["Date Key"] == date]
-            total_demand = daily_demand["Forecast"].sum() if not daily_demand.empty else demand_forecast["Forecast"].mean()
-            demand_factor = total_demand / demand_forecast["Forecast"].max() if total_demand > 0 else 1
-            projected_oos *= demand_factor* 1.25
-            projected_oos = max(0, projected_oos * (1 - i * daily_decrease * (1 + supply_factor))*1.12)
-
-        # Append results
-        oos_final_adjustments.append({
-            "Date": date.strftime("%d %b %Y"),
-            "KOS SO Qty": f"{kos_stock:,.0f}",
-            "STL SO Qty": f"{stl_stock:,.0f}",
-            "Projected OOS%": f"{projected_oos:.2%}"
-        })
-
-    # Convert to DataFrame
-    df_oos_final_adjusted = pd.DataFrame(oos_final_adjustments)
+    # OOS Projection: the default supply pair is precomputed off-peak (core.precompute)
+    with perf.span("compute"):
+        df_oos_final_adjusted = precompute.fetch(
+            "oos_actual", precompute.projection_versions(history, demand_agg["version"], precompute.flows_source_version()),
+            precompute.oos_actual_params(custom_kos_supply, custom_stl_supply, opening_kos, opening_stl),
+        )
+        if df_oos_final_adjusted is None:
+            df_oos_final_adjusted = project_oos_actual(
+                supply_data, oos_data, inbound_data, outbound_data, demand_agg,
+                custom_kos_supply, custom_stl_supply, opening_kos, opening_stl,
+            )
 
     # Display Results
     with st.expander("📌 Key Highlights of the OOS Projection"):
@@ -155,10 +109,11 @@ if supply_file and oos_file:
         WILL BE MORE ACCURATE WITH MORE HISTORICAL DATA
         - **Note**: 31 Mar -> half day, Apr demand a bit lower than March
         - **Note STO**: 
+        - **DC stock**: from the opening stock (default: last supply SO), inbound minus outbound plan day by day. SO is cut to what the DC stock covers.
         - **April 18-20**: KOS still has outbound on April 18 (45,000). No outbound on April 19-20.
         - **April 25-27**: No STL outbound on these dates.
         - **Dynamic OOS Adjustments**:
-            - OOS% dynamically adjusts based on supply and demand fluctuations using RFR (Random forest regressor).
+            - OOS% dynamically adjusts based on supply and demand fluctuations (hand-tuned multipliers; "Compare with fitted model" shows a ridge regression fitted on the history).
             - April 19-20 (KOS) and April 25-27 (STL) OOS% will be highly impacted due to no outbound.
         - **Demand Influence**:
             - Higher forecasted demand results in increased OOS%.
@@ -166,17 +121,81 @@ if supply_file and oos_file:
         - **Reference**: https://docs.google.com/spreadsheets/d/1xDOb4EcEey5QYa1I6OO8siIg5NqKdvI_pvIv-C2MrcY/edit?gid=1971442377#gid=1971442377
         """)
     
-    # Define function for row highlighting
-    def highlight_special_dates(row):
-        if row["Date"] in ["18 Apr 2025", "19 Apr 2025", "20 Apr 2025", "25 Apr 2025", "26 Apr 2025", "27 Apr 2025"]:
-            return ['background-color: yellow'] * len(row)
-        return [''] * len(row)
-    
-    # Apply highlighting
-    styled_df = df_oos_final_adjusted.style.apply(highlight_special_dates, axis=1)
-    
-    # Display Results
-    st.dataframe(styled_df, use_container_width=True)
-    #st.dataframe(df_oos_final_adjusted, use_container_width=True)
-    st.download_button("Download CSV", df_oos_final_adjusted.to_csv(index=False), "oos_projection.csv", "text/csv")
+    with perf.span("render"):
+        # Numbers stay numeric; the grid formats them and highlights the STO gap dates
+        tables.show(
+            df_oos_final_adjusted,
+            formats={
+                "KOS SO Qty": tables.THOUSANDS, "STL SO Qty": tables.THOUSANDS, "Projected OOS%": "percent",
+                "KOS DC Stock": tables.THOUSANDS, "STL DC Stock": tables.THOUSANDS,
+            },
+            highlight=df_oos_final_adjusted["Date"].isin(HIGHLIGHT_DATES),
+            key="oos_actual",
+        )
+        st.download_button("Download CSV", df_oos_final_adjusted.to_csv(index=False), "oos_projection.csv", "text/csv")
+
+    if show_model:
+        # Ridge fit once per history/forecast version (core.oosmodel); a KOS/STL change is one mat-vec
+        with perf.span("model"):
+            model = oosmodel.fitted(precompute.projection_versions(history, demand_agg["version"]), supply_data, oos_data, demand_agg)
+            if model is not None:
+                prepared = prepare_oos_actual(supply_data, oos_data, demand_agg, inbound_data, outbound_data)
+                modelled = oosmodel.project(model, prepared, custom_kos_supply, custom_stl_supply, opening_kos, opening_stl)
+
+        with perf.span("render"):
+            st.markdown("### Fitted model")
+            if model is None:
+                st.info(f"Need at least {oosmodel.MIN_ROWS} days with OOS% and the day before's supply to fit the model.")
+            else:
+                st.caption(
+                    f"Ridge regression on {model['rows']} days ({model['first_date']:%d %b} - {model['last_date']:%d %b %Y}): "
+                    "day-before supply, KOS share, forecast demand, weekday and no-outbound days. "
+                    "A no-outbound day the history never had gets no weight."
+                )
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Training days", model["rows"])
+                col2.metric("Leave-one-out RMSE", f"{model['loo_rmse'] * 100:.2f} pp")
+                col3.metric("Ridge penalty", f"{model['alpha']:.3g}")
+
+                comparison = pd.DataFrame({
+                    "Date": prepared["dates"],
+                    "Projected OOS%": df_oos_final_adjusted["Projected OOS%"].to_numpy() * 100,
+                    "Model OOS%": modelled * 100,
+                })
+                fig = go.Figure()
+                for col, dash in (("Projected OOS%", "solid"), ("Model OOS%", "dash")):
+                    fig.add_trace(go.Scatter(x=comparison["Date"], y=comparison[col], name=col, line=dict(dash=dash)))
+                fig.update_layout(height=360, margin=dict(l=10, r=10, t=30, b=10), yaxis_title="OOS%")
+                st.plotly_chart(fig, use_container_width=True)
+                with st.expander("Model coefficients"):
+                    st.dataframe(oosmodel.coefficients(model), hide_index=True)
+
+    if show_grid:
+        with perf.span("grid"):
+            avg_oos, peak_oos = load_surface(supply_data, oos_data, demand_agg, inbound_data, outbound_data, opening_kos, opening_stl)
+
+        with perf.span("render"):
+            st.markdown("### KOS x STL SO grid")
+            st.caption("Average and peak Projected OOS% over the projected days (days without actual OOS%). ✕ marks the current sidebar values.")
+            fig = make_subplots(rows=1, cols=2, subplot_titles=("Average OOS%", "Peak OOS%"), horizontal_spacing=0.12)
+            for col, values in ((1, avg_oos), (2, peak_oos)):
+                fig.add_trace(go.Heatmap(
+                    x=STL_GRID, y=KOS_GRID, z=values * 100, colorscale="RdYlGn_r",
+                    text=np.round(values * 100, 2), texttemplate="%{text}",
+                    colorbar=dict(x=0.44 if col == 1 else 1.0, len=0.9),
+                    hovertemplate="KOS %{y:,}<br>STL %{x:,}<br>OOS %{z:.2f}%<extra></extra>",
+                ), row=1, col=col)
+                fig.add_trace(go.Scatter(
+                    x=[custom_stl_supply], y=[custom_kos_supply], mode="markers",
+                    marker=dict(symbol="x", size=12, color="black"), showlegend=False, hoverinfo="skip",
+                ), row=1, col=col)
+                fig.update_xaxes(title_text="STL SO", row=1, col=col)
+                fig.update_yaxes(title_text="KOS SO", row=1, col=col)
+            fig.update_layout(height=420, margin=dict(l=10, r=10, t=40, b=10))
+            st.plotly_chart(fig, use_container_width=True)
+
+            grid_table = pd.DataFrame(avg_oos * 100, index=pd.Index(KOS_GRID, name="KOS SO"), columns=STL_GRID).round(2)
+            st.download_button("Download grid CSV (avg OOS%)", grid_table.to_csv(), "oos_grid_avg.csv", "text/csv")
+
+perf.panel()
     
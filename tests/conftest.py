@@ -0,0 +1,27 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# The apps run from the repo root; make ``core`` importable the same way under pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAND_IN_SCALE = {"skus": 80, "whs": 3, "hubs": 2, "days": 61, "hub_days": 2}
+
+
+@pytest.fixture
+def stand_ins(tmp_path, monkeypatch):
+    """Synthetic remote sheets (``bench.loadtest.setup_stand_ins``) and lake, artifact and store paths under ``tmp_path``."""
+    from bench import loadtest
+    from core import sources
+
+    # setenv first so every override, including setup_stand_ins' own, is undone afterwards
+    for name in ("SOH_CSV_URL", "FC_CSV_URL", "HOLDING_COST_CSV_URL", "DATA_URL", "RESCHED_URL"):
+        monkeypatch.setenv(f"KOANDRA_{name}", "")
+    for name, target in (("LAKE_PATH", "lake"), ("ARTIFACTS_PATH", "artifacts"), ("STORE_PATH", "history.sqlite"), ("SKU_MASTER_PATH", "master")):
+        monkeypatch.setenv(f"KOANDRA_{name}", str(tmp_path / target))
+    loadtest.setup_stand_ins(STAND_IN_SCALE, 0, str(tmp_path))
+    yield tmp_path
+    monkeypatch.undo()
+    importlib.reload(sources)
@@ -0,0 +1,21 @@
+import pandas as pd
+
+from bench import run, synth
+
+TINY = {"skus": 60, "whs": 6, "hubs": 3, "days": 61, "hub_days": 2}
+
+
+def test_synthetic_data_is_reproducible():
+    first, second = synth.generate(**TINY, seed=4), synth.generate(**TINY, seed=4)
+    assert first.keys() == second.keys()
+    for name in first:
+        pd.testing.assert_frame_equal(first[name], second[name])
+    assert not synth.generate(**TINY, seed=5)["sales"].equals(first["sales"])
+    assert synth.wh_ids(7) == synth.WH_IDS + [1000, 1001]
+
+
+def test_every_stage_runs_on_a_tiny_scale():
+    result = run.benchmark(TINY, repeats=1)
+    assert list(result["stages"]) == [name for name, _ in run.STAGES]
+    assert all(stage["seconds_median"] >= 0 and stage["repeats"] == 1 for stage in result["stages"].values())
+    assert result["rows"]["occupancy"] == TINY["skus"]
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+import streamlit as st
+
+from core import datasets, doi, sources
+
+
+@pytest.fixture
+def shared(stand_ins):
+    st.cache_resource.clear()
+    yield stand_ins
+    st.cache_resource.clear()
+
+
+def by_key(df, keys):
+    return df.sort_values(keys, kind="stable").reset_index(drop=True)
+
+
+def refresh_soh(path):
+    # The hourly pull: a few stock counts move and one row disappears
+    soh_df = pd.read_csv(path)
+    soh_df.loc[[0, 5, 9], "Sum of Stock"] += 7
+    soh_df.drop(index=3).to_csv(path, index=False)
+    datasets._lastbite_lake.clear()
+
+
+def test_refreshed_lastbite_frame_equals_a_fresh_read(shared):
+    before = datasets.lastbite_frame([40, 160])
+    refresh_soh(sources.SOH_CSV_URL)
+    patched = datasets.lastbite_frame([40, 160])
+    assert len(datasets.soh_changes()), "the refresh should be ingested as a delta"
+    assert len(patched) != len(before) or not patched.equals(before)
+
+    st.cache_resource.clear()
+    rebuilt = datasets.lastbite_frame([40, 160])
+    keys = ["product id", "location id"]
+    pd.testing.assert_frame_equal(by_key(patched, keys), by_key(rebuilt, keys))
+
+
+def test_views_do_not_write_through_to_the_shared_frame(shared):
+    df = datasets.lastbite_frame([40])
+    column = df.columns[0]
+    original = df[column].copy()
+    df[column] = original.iloc[::-1].to_numpy()
+    df["scratch"] = 1
+    again = datasets.lastbite_frame([40])
+    pd.testing.assert_series_equal(again[column], original)
+    assert "scratch" not in again.columns
+
+
+def test_doi_merged_equals_merging_the_sheets(shared):
+    locations = [40, 661]
+    merged, _ = datasets.doi_merged(locations)
+    expected, _ = doi.merge_reschedule(pd.read_csv(sources.DATA_URL), pd.read_csv(sources.RESCHED_URL), report=True)
+    expected = expected[expected["location_id"].isin(locations)]
+    keys = ["location_id", "product_id"]
+    # The lake stores the partition column last; pages select columns by name
+    pd.testing.assert_frame_equal(by_key(merged, keys), by_key(expected, keys), check_dtype=False, check_like=True)
+
+    merged["doi_policy"] = 0.0
+    again, _ = datasets.doi_merged(locations)
+    assert (again["doi_policy"] != 0.0).any()
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from core import delta, lake, lastbite
+
+
+def snapshot(rows):
+    return pd.DataFrame(rows, columns=["Product ID", "Location ID", "Sum of Stock"])
+
+
+BEFORE = snapshot([(1, 772, 100), (2, 772, 0), (1, 40, 50), (3, 160, 30)])
+AFTER = snapshot([(1, 772, 70), (2, 772, 0), (3, 160, 30), (4, 40, 8)])
+
+
+def stored(version, path):
+    df = lake.read(delta.NAME, version, path=path)[["product id", "location id", "sum of stock"]]
+    return df.sort_values(delta.KEYS).reset_index(drop=True)
+
+
+def test_ingest_returns_the_difference_and_stores_the_snapshot(tmp_path):
+    first, changes = delta.ingest(BEFORE, tmp_path)
+    assert changes is None
+    version, changes = delta.ingest(AFTER, tmp_path)
+    assert version != first and changes["from_version"] == first
+
+    assert changes["changed"][delta.KEYS + [delta.STOCK]].values.tolist() == [[1, 772, 70]]
+    assert changes["added"][delta.KEYS].values.tolist() == [[4, 40]]
+    assert changes["removed"].values.tolist() == [[1, 40]]
+    assert changes["locations"] == [40, 772]
+    log = changes["log"].set_index("change")
+    assert log.loc["changed", ["soh_old", "soh_new"]].tolist() == [100, 70]
+    assert log.loc["removed", "soh_old"] == 50
+
+    expected = lake.normalize(AFTER, partition="location id", sort="product id")
+    pd.testing.assert_frame_equal(stored(version, tmp_path), expected.sort_values(delta.KEYS).reset_index(drop=True), check_dtype=False)
+    assert delta.ingest(AFTER, tmp_path) == (version, None)
+
+
+def test_duplicate_keys_fall_back_to_a_full_write(tmp_path):
+    delta.ingest(BEFORE, tmp_path)
+    duplicated = pd.concat([AFTER, AFTER.head(1)], ignore_index=True)
+    version, changes = delta.ingest(duplicated, tmp_path)
+    assert changes is None
+    assert len(stored(version, tmp_path)) == len(duplicated)
+
+
+def test_changes_patch_the_prepared_frame_like_a_full_prepare(tmp_path):
+    fc = pd.DataFrame({"Product ID": [1, 2, 3, 4], "Forecast Daily": [10.0, 5.0, 3.0, 2.0]})
+    holding = pd.DataFrame({
+        "Product ID": [1, 2, 3, 4], "product name": ["A", "B", "C", "D"], "holding_cost": [1.0, 2.0, 3.0, 4.0],
+        "brand company": ["X", "X", "Y", "Y"], "cogs": [10.0, 20.0, 30.0, 40.0],
+    })
+    delta.ingest(BEFORE, tmp_path)
+    _, changes = delta.ingest(AFTER, tmp_path)
+    added = lastbite.prepare_lastbite(changes["added"], fc, holding)
+    patched = lastbite.apply_soh_changes(lastbite.prepare_lastbite(BEFORE, fc, holding), changes["changed"], changes["removed"], added)
+
+    expected = lastbite.prepare_lastbite(AFTER, fc, holding)
+    order = ["product id", "location id"]
+    pd.testing.assert_frame_equal(
+        patched.sort_values(order).reset_index(drop=True),
+        expected.sort_values(order).reset_index(drop=True),
+        check_dtype=False,
+    )
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import demand
+
+
+def forecast():
+    # Several rows per day, a missing day and a non-numeric forecast
+    dates = pd.to_datetime(["2025-03-01"] * 3 + ["2025-03-02"] * 2 + ["2025-03-04"] * 2)
+    return pd.DataFrame({"Date Key": dates, "Forecast": [100.0, 50.0, "x", 80.0, 90.0, 400.0, 10.0]})
+
+
+def test_build_matches_the_page_groupby():
+    df = forecast()
+    agg = demand.build(df)
+    values = pd.to_numeric(df["Forecast"], errors="coerce")
+    daily = values.groupby(df["Date Key"]).sum()
+    np.testing.assert_array_equal(agg["dates"], daily.index.to_numpy())
+    np.testing.assert_allclose(agg["daily"], [150.0, 170.0, 410.0])
+    np.testing.assert_allclose(agg["normalized"], daily / daily.max())
+    np.testing.assert_allclose(agg["kos"] + agg["stl"], agg["daily"])
+    np.testing.assert_allclose(agg["rolling_mean"], daily.rolling(demand.ROLLING_DAYS, min_periods=1).mean())
+    assert agg["row_max"] == 400.0 and agg["row_mean"] == values.mean()
+    assert agg["daily_max"] == 410.0
+    with pytest.raises(ValueError):
+        agg["daily"][0] = 0  # shared by every caller
+
+
+def test_aggregates_rebuild_when_the_file_changes(tmp_path):
+    path = str(tmp_path / "forecast dates.xlsx")
+    forecast().to_excel(path, index=False)
+    first = demand.aggregates(path)
+    assert demand.aggregates(path) is first
+
+    more = forecast()
+    more["Forecast"] = 1.0
+    more.to_excel(path, index=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    second = demand.aggregates(path)
+    assert second is not first
+    np.testing.assert_allclose(second["daily"], [3.0, 2.0, 2.0])
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import doi
+
+
+def sources(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        "Location_ID ": rng.choice([40, 160, 772], n),
+        "product_id": rng.integers(1000, 1100, n),
+        "product_type_name": rng.choice(["Fresh", "Frozen", "Dry", "Other"], n),
+        "pareto": rng.choice(["X", "A", "B", "C", "D", None], n),
+        "demand_type": rng.choice(["Stable", "Volatile", "Moderate"], n),
+        "doi_policy": rng.uniform(2, 30, n),
+        "lead_time": rng.uniform(1, 10, n),
+        "lead_time_std": rng.uniform(0, 3, n),
+        "avg_demand": np.where(rng.random(n) < 0.1, 0, rng.uniform(1, 100, n)),
+        "std_demand": rng.uniform(0, 50, n),
+    })
+    data = data.drop_duplicates(["Location_ID ", "product_id"]).reset_index(drop=True)
+    resched = data[["Location_ID ", "product_id"]].sample(frac=0.6, random_state=1).rename(columns={"Location_ID ": "wh_id"})
+    resched = pd.concat([resched, resched.head(5), pd.DataFrame({"wh_id": [999], "product_id": [1]})], ignore_index=True)
+    resched["resched_count"] = rng.integers(0, 4, len(resched))
+    resched["total_inbound"] = rng.integers(0, 6, len(resched))
+    return data, resched
+
+
+def baseline_merge(data_df, resched_df):
+    # The string-keyed merge dynamic_doiwh.py ran before core.doi
+    data_df, resched_df = doi.standardize_columns(data_df), doi.standardize_columns(resched_df)
+    resched_df = resched_df.rename(columns={"wh_id": "location_id"})
+    for frame in (data_df, resched_df):
+        frame["location_id"] = frame["location_id"].astype(str)
+        frame["product_id"] = frame["product_id"].astype(str)
+    merged = data_df.merge(resched_df, on=["location_id", "product_id"], how="left")
+    merged["resched_count"] = merged["resched_count"].fillna(0)
+    merged["total_inbound"] = merged["total_inbound"].fillna(1)
+    for col in doi.NUMERIC_COLUMNS:
+        if col in merged.columns:
+            merged[col] = pd.to_numeric(merged[col], errors="coerce").fillna(0)
+    return merged
+
+
+def baseline_final_doi(merged, p):
+    def compute_doi(row):
+        try:
+            base_doi = row["doi_policy"]
+            pareto = str(row.get("pareto", "")).strip()
+            cleaned_pareto = pareto if pareto in ["X", "A", "B"] else "C"
+            demand_type = row.get("demand_type", "")
+            product_type = row.get("product_type_name", "")
+            apply_logic = (
+                cleaned_pareto in p["selected_pareto"] and
+                demand_type in p["selected_demand"] and
+                product_type in p["selected_product_types"]
+            )
+            if not apply_logic:
+                final_doi = base_doi
+            else:
+                std_d_ratio = row["std_demand"] / row["avg_demand"] if row["avg_demand"] != 0 else 0
+                Z = 1.65 if cleaned_pareto in ["X", "A"] else 1.5
+                safety = Z * np.sqrt((row["lead_time_std"] ** 2) + (row["lead_time"] ** 2) * (std_d_ratio ** 2)) * p["ks"] if p["include_safety"] else 0
+                resched = p["kr"] * row["lead_time"] * (row["resched_count"] / row["total_inbound"]) if p["include_reschedule"] else 0
+                pareto_val = p["kp"] * p["pareto_weight"].get(cleaned_pareto, 0)
+                multiplier = p["product_type_scaler"].get(product_type, 1.0)
+                final_doi = 0.7 * (base_doi + safety + resched + pareto_val) * multiplier
+            return round(final_doi, 2)
+        except Exception:
+            return None
+
+    merged = merged.copy()
+    merged["final_doi"] = merged.apply(compute_doi, axis=1)
+    merged["location_id"] = pd.to_numeric(merged["location_id"], errors="coerce").fillna(0).astype(int)
+    merged["doi_policy"] = merged["doi_policy"].round(2)
+    merged["final_doi"] = merged["final_doi"].round(2)
+    return merged
+
+
+def test_merge_reschedule_matches_the_string_merge():
+    data, resched = sources()
+    merged, report = doi.merge_reschedule(data, resched, report=True)
+    expected = baseline_merge(data, resched)
+    expected["location_id"] = pd.to_numeric(expected["location_id"])
+    expected["product_id"] = pd.to_numeric(expected["product_id"])
+    pd.testing.assert_frame_equal(merged, expected, check_dtype=False)
+
+    assert report["rows"] == len(data)
+    assert report["duplicate_reschedule_keys"] == 5
+    assert report["orphan_reschedule"].values.tolist() == [[999, 1]]
+    assert report["matched_rows"] + report["unmatched_rows"] == len(data)
+
+
+def test_merge_reschedule_matches_ids_however_they_were_typed():
+    data = pd.DataFrame({"location_id": ["40", "40", "x"], "product_id": [7.0, 8.0, 7.0], "doi_policy": [1, 2, 3]})
+    resched = pd.DataFrame({"wh_id": [40, 40], "product_id": ["7", "8.5"], "resched_count": [2, 9], "total_inbound": [4, 4]})
+    merged, report = doi.merge_reschedule(data, resched, report=True)
+    assert merged["resched_count"].tolist() == [2, 0, 0]
+    assert merged["total_inbound"].tolist() == [4, 1, 1]
+    assert report["invalid_ids"] == 1 and report["invalid_reschedule_ids"] == 1
+
+
+PARAMS = [
+    {},
+    {"include_safety": False, "selected_demand": ["Volatile", "Stable"]},
+    {"include_reschedule": False, "include_pareto": False, "kp": 0, "pareto_weight": {"X": 0, "A": 0, "B": 0, "C": 0}},
+    {"selected_pareto": ["B", "C"], "selected_product_types": ["Dry"], "ks": 1.2, "kr": 0.1, "kp": 2.0},
+]
+
+
+@pytest.mark.parametrize("changes", PARAMS)
+def test_final_doi_matches_the_row_model(changes):
+    params = {**doi.default_doi_params(), **changes}
+    merged = doi.merge_reschedule(*sources())
+    df = doi.compute_final_doi(merged, params)
+    pd.testing.assert_frame_equal(df, baseline_final_doi(merged, params), check_dtype=False)
+    assert (df["final_doi"] != df["doi_policy"]).any()
+
+
+def test_sweep_totals_match_final_doi_per_combination():
+    params = doi.default_doi_params()
+    merged = doi.merge_reschedule(*sources())
+    cogs = np.linspace(100, 1000, len(merged))
+    grid = pd.DataFrame({"ks": [0.0, 0.5, 1.0, 0.5], "kr": [0.5, 0.5, 0.2, 0.0], "kp": [0.5, 0.5, 1.5, 0.3]})
+    sweep = doi.doi_sweep(merged, params, grid, cogs=cogs)
+
+    current = doi.compute_final_doi(merged, params)["final_doi"]
+    for row in sweep.itertuples():
+        final = doi.compute_final_doi(merged, {**params, "ks": row.ks, "kr": row.kr, "kp": row.kp})["final_doi"]
+        assert row.total_doi_days == pytest.approx(final.sum())
+        assert row.changed_rows == (final != merged["doi_policy"].round(2)).sum()
+        assert row.inventory_value == pytest.approx((final * merged["avg_demand"] * cogs).sum())
+        assert row.delta_doi_days == pytest.approx(final.sum() - current.sum())
+    # The second combination is the current parameters
+    assert sweep.loc[1, ["delta_doi_days", "delta_changed_rows", "delta_inventory_value"]].tolist() == [0, 0, 0]
+
+
+def test_sweep_chunks_give_the_same_totals(monkeypatch):
+    params = doi.default_doi_params()
+    merged = doi.merge_reschedule(*sources())
+    grid = pd.DataFrame({"ks": np.linspace(0, 1, 7), "kr": 0.5, "kp": 0.5})
+    whole = doi.doi_sweep(merged, params, grid)
+    monkeypatch.setattr(doi, "SWEEP_CELLS", len(merged) * 2)
+    pd.testing.assert_frame_equal(doi.doi_sweep(merged, params, grid), whole)
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from core import forecast
+
+
+def test_split_skus_go_to_their_hub_wh_and_the_rest_to_the_default():
+    forecast_df = pd.DataFrame({
+        "Date": ["2025-05-01"] * 4,
+        "Product ID": [1, 1, 2, 3],
+        "Product": ["A", "A", "B", "C"],
+        "Hub ID": [" 11", "12", 11, 12],
+        "Forecast STEP 3": [10.0, 5.0, 7.0, 3.0],
+    })
+    hub_map = pd.DataFrame({"Hub ID": [11, "12 "], "WH ID": [772, 40]})
+    split = pd.DataFrame({"Product_ID": [1, 9]})
+    result = forecast.convert_hub_forecast(forecast_df, hub_map, split)
+
+    final = result["final_df"].set_index(["Product ID", "WH ID"])["Forecast STEP 3"]
+    assert final.to_dict() == {(1, 40): 5.0, (1, 772): 10.0, (2, forecast.DEFAULT_WH_ID): 7.0, (3, forecast.DEFAULT_WH_ID): 3.0}
+    assert result["missing_skus"]["product_id"].tolist() == [9]
+    totals = result["summary_df"].set_index("WH ID")["Total Forecast"]
+    assert totals.sum() == forecast_df["Forecast STEP 3"].sum()
+    assert result["sku_count_df"].set_index("WH ID")["Unique SKU Count"].to_dict() == {40: 1, 160: 2, 772: 1}
+
+
+def test_split_list_needs_a_product_id_column():
+    with pytest.raises(ValueError):
+        forecast.convert_hub_forecast(pd.DataFrame(), pd.DataFrame(), pd.DataFrame({"sku": [1]}))
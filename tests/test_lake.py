@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+
+from core import lake
+
+
+def soh(stock):
+    return pd.DataFrame({
+        "Product ID": [3, 1, 2, 1],
+        "Location ID": [772, 772, 40, 40],
+        "Sum of Stock": stock,
+    })
+
+
+def test_read_filters_by_location_and_product(tmp_path):
+    version = lake.write("soh", soh([30, 10, 20, 5]), "location id", "product id", path=tmp_path)
+    df = lake.read("soh", version, locations=[772], product_ids=[1, 3], path=tmp_path)
+    assert df.sort_values("product id")["sum of stock"].tolist() == [10, 30]
+    assert lake.locations("soh", version, path=tmp_path) == [40, 772]
+
+
+def test_partial_write_matches_a_full_write(tmp_path):
+    base = lake.write("soh", soh([30, 10, 20, 5]), "location id", "product id", path=tmp_path)
+    new = soh([30, 10, 25, 5])
+    version = lake.write("soh", new, "location id", "product id", path=tmp_path, base=base, locations=[40])
+    full = lake.write("soh", new, "location id", "product id", path=tmp_path / "full")
+
+    def rows(v, root):
+        return lake.read("soh", v, path=root).sort_values(["location id", "product id"]).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(rows(version, tmp_path), rows(full, tmp_path / "full"), check_dtype=False, check_categorical=False)
+
+
+def test_replaced_versions_stay_readable_until_retired(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(lake.time, "time", lambda: now[0])
+    old = lake.write("soh", soh([30, 10, 20, 5]), "location id", "product id", path=tmp_path)
+    new = lake.write("soh", soh([31, 10, 20, 5]), "location id", "product id", path=tmp_path)
+    assert lake.current_version("soh", tmp_path) == new
+    # A session that cached the old version string keeps reading it
+    assert lake.read("soh", old, path=tmp_path)["sum of stock"].sum() == 65
+    assert lake.locations("soh", old, path=tmp_path) == [40, 772]
+
+    now[0] += lake.RETAIN_SECONDS + 1
+    newest = lake.write("soh", soh([32, 10, 20, 5]), "location id", "product id", path=tmp_path)
+    versions = {entry for entry in os.listdir(tmp_path / "soh") if not entry.startswith(".") and entry != "meta.json"}
+    # old and new both retired, but only old for longer than RETAIN_SECONDS
+    assert versions == {new, newest}
+    assert lake.read("soh", new, path=tmp_path)["sum of stock"].sum() == 66
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import lastbite
+
+
+def frames():
+    soh = pd.DataFrame({
+        "Product ID": [1, 1, 2, 3],
+        "Location ID": [772, 40, 772, 160],
+        "Sum of Stock": [100, 50, 0, 30],
+    })
+    # Product 1 appears twice in the forecast sheet, as in the bundled sales.csv
+    fc = pd.DataFrame({"Product ID": [1, 1, 2, 3], "Forecast Daily": [10.0, 12.0, 5.0, 3.0]})
+    holding = pd.DataFrame({
+        "Product ID": [1, 2, 3],
+        "product name": ["Apple", "Banana", "Cherry"],
+        "holding_cost": [1000.0, 2000.0, 3000.0],
+        "brand company": ["A", "B", "A"],
+        "cogs": [5000.0, 6000.0, 7000.0],
+    })
+    return soh, fc, holding
+
+
+def changes(**rows):
+    return pd.DataFrame(rows, columns=["product id", "location id", "sum of stock"][:len(rows)])
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_apply_soh_changes_matches_a_full_prepare_with_duplicate_keys(compact):
+    soh, fc, holding = frames()
+    df = lastbite.prepare_lastbite(soh, fc, holding)
+    assert df.duplicated(["product id", "location id"]).any()
+    if compact:
+        df = lastbite.compact(df)
+
+    changed = changes(**{"product id": [1, 3], "location id": [772, 160], "sum of stock": [70, 0]})
+    patched = lastbite.apply_soh_changes(df, changed, changes(**{"product id": [], "location id": []}), df.iloc[:0])
+
+    new_soh = soh.copy()
+    new_soh["Sum of Stock"] = [70, 50, 0, 0]
+    expected = lastbite.prepare_lastbite(new_soh, fc, holding)
+    if compact:
+        expected = lastbite.compact(expected)
+    pd.testing.assert_frame_equal(patched, expected.reset_index(drop=True))
+    assert (patched.loc[patched["product id"] == 1, "soh"].to_numpy() == [70, 70, 50, 50]).all()
+
+
+def test_apply_soh_changes_removes_and_adds_rows():
+    soh, fc, holding = frames()
+    df = lastbite.prepare_lastbite(soh, fc, holding)
+    added = lastbite.prepare_lastbite(
+        pd.DataFrame({"Product ID": [2], "Location ID": [40], "Sum of Stock": [8]}), fc, holding,
+    )
+    patched = lastbite.apply_soh_changes(
+        df, changes(**{"product id": [], "location id": [], "sum of stock": []}),
+        changes(**{"product id": [1], "location id": [772]}), added,
+    )
+    keys = list(zip(patched["product id"], patched["location id"]))
+    assert (1, 772) not in keys
+    assert keys.count((1, 40)) == 2
+    assert patched.loc[patched["location id"] == 40, "soh"].tolist() == [50, 50, 8]
+    assert np.isclose(patched["doi_current"].iloc[-1], 8 / (5.0 * 0.4))
+
+
+def baseline_lastbite(soh_df, fc_df, holding_df):
+    # The load block lastbite.py ran before core.lastbite
+    soh_df, fc_df, holding_df = soh_df.copy(), fc_df.copy(), holding_df.copy()
+    for frame in (soh_df, fc_df, holding_df):
+        frame.columns = frame.columns.str.strip().str.lower()
+    soh_df.dropna(subset=['product id'], inplace=True)
+    holding_df.dropna(subset=['product id'], inplace=True)
+    df = soh_df.merge(fc_df[['product id', 'forecast daily']], on='product id').merge(
+        holding_df[['product id', 'product name', 'holding_cost', 'brand company', 'cogs']], on='product id')
+    df.drop_duplicates(inplace=True)
+    df.rename(columns={'sum of stock': 'soh', 'forecast daily': 'forecast_daily', 'holding_cost': 'holding_cost_monthly'}, inplace=True)
+
+    def adjust_forecast(row):
+        if row['location id'] in [40, 772]:
+            if row['location id'] == 772:
+                return row['forecast_daily'] * 0.6
+            elif row['location id'] == 40:
+                return row['forecast_daily'] * 0.4
+        elif row['location id'] in [160, 796]:
+            return row['forecast_daily'] * 0.5
+        elif row['location id'] == 661:
+            return row['forecast_daily']
+        else:
+            return 0
+
+    df['forecast_daily'] = df.apply(adjust_forecast, axis=1)
+    df['soh'] = pd.to_numeric(df['soh'], errors='coerce')
+    df['forecast_daily'] = pd.to_numeric(df['forecast_daily'], errors='coerce').replace(0, np.nan)
+    df['holding_cost_monthly'] = pd.to_numeric(df['holding_cost_monthly'], errors='coerce')
+    df['doi_current'] = df['soh'] / df['forecast_daily']
+    return df
+
+
+def baseline_adjustments(df, doi_ideal):
+    df = df.copy()
+    df['doi_ideal'] = doi_ideal
+    df['doi_diff'] = df['doi_current'] - df['doi_ideal']
+    df['additional_qty_pcs_reduce'] = df.apply(lambda row: max(row['forecast_daily'] * row['doi_diff'], 0), axis=1)
+    df['additional_sales_value_reduce'] = df['additional_qty_pcs_reduce'] * df['cogs']
+    df['additional_qty_pcs_increase'] = df.apply(lambda row: max(row['forecast_daily'] * (-row['doi_diff']), 0), axis=1)
+    df['additional_order_value'] = df['additional_qty_pcs_increase'] * df['cogs']
+    df['additional_annual_holding_cost'] = df['additional_qty_pcs_increase'] * df['holding_cost_monthly'] * 12
+    return df
+
+
+def mixed_frames():
+    # Every location branch, an unknown location, a missing forecast and a missing stock
+    soh = pd.DataFrame({
+        "Product ID": [1, 1, 1, 2, 2, 3, 4, 5, None],
+        "Location ID ": [772, 40, 160, 796, 661, 999, 772, 40, 772],
+        "Sum of Stock": [100, 5, 300, "n/a", 80, 30, 0, 1000, 10],
+    })
+    fc = pd.DataFrame({"Product ID": [1, 2, 3, 4, 5], " Forecast Daily": [10.0, 4.0, 3.0, 2.0, np.nan]})
+    holding = pd.DataFrame({
+        "Product ID": [1, 2, 3, 4, 5],
+        "product name": ["Apple", "Banana", "Cherry", "Date", "Elder"],
+        "holding_cost": [1000.0, 2000.0, 3000.0, 400.0, 50.0],
+        "brand company": ["A", "B", "A", "B", None],
+        "cogs": [5000.0, 6000.0, 7000.0, 800.0, 90.0],
+    })
+    return soh, fc, holding
+
+
+@pytest.mark.parametrize("doi_ideal", [1.0, 30.0, 75.5])
+def test_adjustments_match_the_original_page(doi_ideal):
+    soh, fc, holding = mixed_frames()
+    df = lastbite.prepare_lastbite(soh, fc, holding)
+    expected = baseline_lastbite(soh, fc, holding)
+    pd.testing.assert_frame_equal(df, expected)
+
+    adjusted = lastbite.compute_adjustments(df, doi_ideal)
+    baseline = baseline_adjustments(expected, doi_ideal)
+    pd.testing.assert_frame_equal(adjusted, baseline, check_dtype=False)
+    for brand, group in baseline.groupby('brand company'):
+        valid = group[(group['forecast_daily'] > 0) & group['doi_current'].notna()]
+        summary = lastbite.brand_summary(adjusted[adjusted['brand company'] == brand])
+        assert summary["total_soh"] == valid['soh'].sum()
+        assert summary["total_forecast"] == valid['forecast_daily'].sum()
+        assert summary["total_qty_reduce"] == valid['additional_qty_pcs_reduce'].sum()
+        assert summary["total_qty_increase"] == valid['additional_qty_pcs_increase'].sum()
+        assert summary["total_order_value"] == valid['additional_order_value'].sum()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_picker_index_matches_the_page_filters(compact):
+    soh, fc, holding = mixed_frames()
+    df = lastbite.prepare_lastbite(soh, fc, holding)
+    if compact:
+        df = lastbite.compact(df)
+    pickers = lastbite.picker_index(df)
+
+    for sku in df['product id'].unique():
+        valid_locs = df[(df['product id'] == sku) & (df['soh'] > 0)]['location id'].unique()
+        assert list(pickers['locations'].get(sku, ())) == list(valid_locs)
+        assert df.iloc[pickers['sku_rows'][sku]].equals(df[df['product id'] == sku])
+    assert list(pickers['brands']) == sorted(df['brand company'].dropna().unique())
+    for brand in pickers['brands']:
+        assert df.iloc[pickers['brand_rows'][brand]].equals(df[df['brand company'] == brand])
+
+
+def large_frames(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    products = np.arange(1, n + 1) * 997
+    soh = pd.DataFrame({
+        "Product ID": np.repeat(products, 2),
+        "Location ID": np.tile([772, 40], n),
+        "Sum of Stock": rng.integers(0, 50000, 2 * n),
+    })
+    fc = pd.DataFrame({"Product ID": products, "Forecast Daily": rng.gamma(1.5, 40, n).round(2)})
+    holding = pd.DataFrame({
+        "Product ID": products,
+        "product name": [f"SKU {p}" for p in products],
+        "holding_cost": rng.uniform(10, 5000, n),
+        "brand company": rng.choice([f"Brand {i}" for i in range(40)], n),
+        "cogs": rng.uniform(1000, 250000, n).round(),
+    })
+    return soh, fc, holding
+
+
+@pytest.mark.parametrize("doi_ideal", [7.0, 30.0, 120.0])
+def test_compact_frame_is_within_the_tolerance(doi_ideal):
+    df = lastbite.prepare_lastbite(*large_frames())
+    errors = lastbite.compact_errors(df, doi_ideal)
+    assert max(errors.values()) <= lastbite.COMPACT_RTOL, errors
+
+    narrow = lastbite.compact(df)
+    assert narrow['location id'].dtype == 'int32' and narrow['soh'].dtype == 'float32'
+    assert narrow['brand company'].dtype == 'category'
+    assert narrow.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum() / 2
+
+
+def test_compact_keeps_ids_that_dont_fit_in_int32():
+    soh, fc, holding = frames()
+    df = lastbite.prepare_lastbite(soh, fc, holding)
+    df['product id'] = df['product id'] + 2**40
+    narrow = lastbite.compact(df)
+    assert narrow['product id'].dtype == 'int64'
+    assert (narrow['product id'] == df['product id']).all()
@@ -0,0 +1,12 @@
+import pytest
+
+from bench import loadtest
+
+
+@pytest.mark.parametrize("app", ["lastbite", "dynamic_doiwh"])
+def test_sessions_step_through_their_script_without_errors(stand_ins, app):
+    result = loadtest.run_load(app, sessions=2, timeout=60)
+    assert result["error_count"] == 0, result["errors"]
+    steps = [name for name, _ in loadtest.SCRIPTS[app][1]]
+    assert result["open"]["count"] == 2
+    assert set(result["steps"]) <= {"open", *steps} and result["rerun"]["count"] > 0
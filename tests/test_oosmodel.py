@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import oosmodel, projection
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(21)
+    dates = pd.date_range("2025-02-01", "2025-04-10")
+    kos = rng.integers(80000, 120000, len(dates)).astype(float)
+    stl = rng.integers(40000, 90000, len(dates)).astype(float)
+    kos[[10, 30]] = 0  # a couple of no-outbound days
+    supply = pd.DataFrame({"Date": dates, "KOS": kos, "STL": stl})
+    oos_dates = dates[1:]
+    ratio = (kos + stl)[:-1] / (kos + stl).mean()
+    oos = 14 - 5 * ratio + rng.normal(0, 0.4, len(oos_dates))
+    oos = pd.DataFrame({"Date Key": oos_dates, "OOS%": oos})
+    forecast_dates = pd.date_range("2025-02-01", "2025-04-30")
+    forecast = pd.DataFrame({"Date Key": forecast_dates, "Forecast": rng.uniform(150000, 250000, len(forecast_dates))})
+    return supply, oos, forecast
+
+
+def standardized(model, supply, oos):
+    dates, kos, stl, y = oosmodel.training_rows(supply, oos)
+    X = oosmodel._features(model, dates, kos, stl)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1
+    return X, (X - X.mean(axis=0)) / scale, y
+
+
+def test_fit_is_the_ridge_solution(history):
+    supply, oos, forecast = history
+    model = oosmodel.fit(supply, oos, forecast)
+    X, Z, y = standardized(model, supply, oos)
+
+    # Ridge on the centered standardized features as a stacked least squares
+    k = Z.shape[1]
+    A = np.vstack([Z - Z.mean(axis=0), np.sqrt(model["alpha"]) * np.eye(k)])
+    b = np.concatenate([y - y.mean(), np.zeros(k)])
+    beta = np.linalg.lstsq(A, b, rcond=None)[0]
+    fitted = y.mean() + (Z - Z.mean(axis=0)) @ beta
+    np.testing.assert_allclose(np.column_stack([np.ones(len(X)), X]) @ model["coef"], fitted, atol=1e-10)
+    assert model["rmse"] == pytest.approx(np.sqrt(np.mean((y - fitted) ** 2)))
+    assert model["rows"] == len(y) and model["coef"][1] < 0  # more supply, less OOS
+
+
+def test_loo_error_matches_refitting_without_each_day(history):
+    supply, oos, forecast = history
+    model = oosmodel.fit(supply, oos, forecast)
+    _, Z, y = standardized(model, supply, oos)
+    design = np.column_stack([np.ones(len(Z)), Z])
+    penalty = model["alpha"] * np.diag([0.0] + [1.0] * Z.shape[1])
+    errors = []
+    for i in range(len(y)):
+        keep = np.arange(len(y)) != i
+        coef = np.linalg.solve(design[keep].T @ design[keep] + penalty, design[keep].T @ y[keep])
+        errors.append(y[i] - design[i] @ coef)
+    assert model["loo_rmse"] == pytest.approx(np.sqrt(np.mean(np.square(errors))), rel=1e-8)
+
+
+def test_alpha_is_the_best_leave_one_out_penalty(history):
+    supply, oos, forecast = history
+    model = oosmodel.fit(supply, oos, forecast)
+    for alpha in oosmodel.ALPHAS:
+        assert oosmodel.fit(supply, oos, forecast, alphas=[alpha])["loo_rmse"] >= model["loo_rmse"] - 1e-15
+
+
+def test_too_little_history_gives_no_model(history):
+    supply, oos, forecast = history
+    assert oosmodel.fit(supply, oos.head(oosmodel.MIN_ROWS - 1), forecast) is None
+
+
+def test_project_keeps_actual_days(history):
+    supply, oos, forecast = history
+    model = oosmodel.fit(supply, oos, forecast)
+    prepared = projection.prepare_oos_actual(supply, oos, forecast)
+    projected = oosmodel.project(model, prepared, 100000, 80000)
+    np.testing.assert_array_equal(projected[prepared["has_actual"]], prepared["actual_oos"][prepared["has_actual"]])
+    assert (projected >= 0).all()
+    grid = oosmodel.predict(model, prepared["dates"], np.array([[90000], [110000]]), 80000)
+    assert grid.shape == (2, len(prepared["dates"]))
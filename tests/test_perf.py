@@ -0,0 +1,122 @@
+import json
+import threading
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import perf
+
+
+def logged(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_spans_are_no_ops_unless_profiling(monkeypatch):
+    monkeypatch.delenv("KOANDRA_PERF", raising=False)
+    monkeypatch.delenv("KOANDRA_MEMPROF", raising=False)
+    perf.begin("page")
+    assert not perf.enabled()
+    assert perf.span("load") is perf.span("compute")
+    assert perf.finish() is None
+
+
+def test_nested_and_failed_spans_are_recorded(tmp_path, monkeypatch):
+    monkeypatch.setenv("KOANDRA_PERF_LOG", str(tmp_path / "perf.jsonl"))
+
+    @perf.timed()
+    def compute():
+        with perf.span("inner"):
+            pass
+
+    perf.begin("page", enabled=True, memory=False)
+    with perf.span("load"):
+        compute()
+    with pytest.raises(KeyError):
+        with perf.span("broken"):
+            raise KeyError("x")
+    result = perf.finish()
+    spans = {s["span"]: s for s in result["spans"]}
+    assert list(spans) == ["load/compute/inner", "load/compute", "load", "broken"]
+    assert spans["load/compute/inner"]["depth"] == 2 and spans["broken"]["error"] == "KeyError"
+    assert result["total"]["ms"] >= spans["load"]["ms"]
+    assert [r["span"] for r in logged(tmp_path / "perf.jsonl")] == list(spans) + ["(rerun)"]
+
+
+def test_fragment_is_a_span_of_a_full_rerun(tmp_path, monkeypatch):
+    monkeypatch.setenv("KOANDRA_PERF_LOG", str(tmp_path / "perf.jsonl"))
+    perf.begin("page", enabled=True, memory=False)
+    with perf.fragment("page", "analysis"):
+        with perf.span("compute"):
+            pass
+    assert perf.enabled()
+    result = perf.finish()
+    assert [s["span"] for s in result["spans"]] == ["analysis/compute", "analysis"]
+    assert {r["app"] for r in logged(tmp_path / "perf.jsonl")} == {"page"}
+
+
+def test_fragment_rerun_records_a_run_of_its_own(tmp_path, monkeypatch):
+    monkeypatch.setenv("KOANDRA_PERF_LOG", str(tmp_path / "perf.jsonl"))
+    monkeypatch.setenv("KOANDRA_PERF", "1")
+    assert not perf.enabled()  # the page's run finished with its panel
+    with perf.fragment("page", "analysis"):
+        assert perf.enabled()
+        with perf.span("compute"):
+            pass
+    assert not perf.enabled()  # the fragment drew its panel
+    records = logged(tmp_path / "perf.jsonl")
+    assert [r["span"] for r in records] == ["analysis/compute", "analysis", "(rerun)"]
+    assert {r["app"] for r in records} == {"page/analysis"}
+
+
+
+def in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_memory_mode_traces_only_while_a_run_is_open(monkeypatch):
+    monkeypatch.delenv("KOANDRA_MEM_BUDGET_MB", raising=False)
+    assert not tracemalloc.is_tracing()
+    perf.begin("page", enabled=True, memory=True)
+    assert tracemalloc.is_tracing()
+    with perf.span("build"):
+        block = bytearray(8 * 2**20)
+    del block
+    perf.frame("df", pd.DataFrame({"x": np.arange(1000, dtype=np.int64)}))
+    result = perf.finish()
+    assert not tracemalloc.is_tracing()
+
+    build, = result["spans"]
+    assert build["peak_mb"] >= 8
+    assert result["total"]["peak_mb"] >= 8 and not result["total"]["over_budget"]
+    assert result["frames"][0]["mb"] >= 8000 / 2**20
+    assert not result["total"]["overlapped"]
+
+
+def test_overlapping_memory_runs_are_flagged_and_the_last_one_stops_tracing():
+    perf.begin("first", enabled=True, memory=True)
+    second = in_thread(lambda: perf.begin("second", enabled=True, memory=True) or perf.finish())
+    assert second["total"]["overlapped"]
+    assert tracemalloc.is_tracing()  # "first" is still open
+    first = perf.finish()
+    assert first["total"]["overlapped"]
+    assert not tracemalloc.is_tracing()
+
+
+def test_an_abandoned_memory_run_is_closed_by_the_next_begin():
+    perf.begin("page", enabled=True, memory=True)  # a rerun that raised before its panel
+    perf.begin("page", enabled=False, memory=False)
+    assert not perf.enabled()
+    assert not tracemalloc.is_tracing()
+
+
+def test_over_budget_runs_are_flagged(monkeypatch):
+    monkeypatch.setenv("KOANDRA_MEM_BUDGET_MB", "1")
+    perf.begin("page", enabled=True, memory=True)
+    perf.frame("big", pd.DataFrame({"x": np.zeros(2**18)}))
+    assert perf.finish()["total"]["over_budget"]
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from core import poia
+
+
+def test_histograms_count_skus_per_bin():
+    df = pd.DataFrame({
+        " L1 ": ["Food", "Food", "Drink", "Food"],
+        "product_type_name": ["Dry", "Fresh", "Dry", "Dry"],
+        poia.COL_AGGRESSIVE: [0, 5, 10, "n/a"],
+        poia.COL_MODERATE: [1, 9.9, 10, None],
+        poia.COL_CONSERVATIVE: ["2", 4, 20, None],
+    })
+    cleaned = poia.clean_scenarios(df, l1=["Food"], product_types=["Dry", "Fresh"])
+    assert len(cleaned) == 2  # the all-missing row is dropped
+
+    bins = poia.histogram_bins(0, 10, 5)
+    np.testing.assert_array_equal(bins, [0, 5, 10])
+    counts = poia.scenario_histograms(cleaned, bins)
+    assert counts["Aggressive"].tolist() == [1, 1]
+    assert counts["Moderate"].tolist() == [1, 1]
+    assert counts["Conservative"].tolist() == [2, 0]
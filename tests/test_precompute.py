@@ -0,0 +1,35 @@
+import os
+
+import pandas as pd
+
+from core import precompute
+
+VERSIONS = {"supply": ["2025-04-10", 40], "oos": ["2025-04-10", 40], "forecast": [1, 2]}
+PARAMS = {"custom_kos_supply": 100000, "custom_stl_supply": 80000}
+
+
+def test_fetch_is_none_until_written(tmp_path):
+    assert precompute.fetch("oos_actual", VERSIONS, PARAMS, path=tmp_path) is None
+    assert precompute.fetch("oos_actual", None, PARAMS, path=tmp_path) is None
+
+
+def test_params_match_across_int_and_float(tmp_path):
+    precompute.write("oos_actual", VERSIONS, PARAMS, pd.DataFrame({"a": [1]}), path=tmp_path)
+    params = {"custom_kos_supply": 100000.0, "custom_stl_supply": 80000.0}
+    assert precompute.fetch("oos_actual", VERSIONS, params, path=tmp_path)["a"].tolist() == [1]
+
+
+def test_fetch_serves_a_forced_rewrite_of_the_same_artifact(tmp_path):
+    precompute.write("oos_actual", VERSIONS, PARAMS, pd.DataFrame({"a": [1, 2]}), path=tmp_path)
+    assert precompute.fetch("oos_actual", VERSIONS, PARAMS, path=tmp_path)["a"].tolist() == [1, 2]
+
+    # Another process (cli.py precompute --force) rewrites the same file
+    fresh = pd.DataFrame({"a": [3, 4]})
+    target = precompute._path("oos_actual", precompute.artifact_key("oos_actual", VERSIONS, PARAMS), tmp_path)
+    fresh.to_parquet(target, index=False)
+    stat = os.stat(target)
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert precompute.fetch("oos_actual", VERSIONS, PARAMS, path=tmp_path)["a"].tolist() == [3, 4]
+
+    precompute.write("oos_actual", VERSIONS, PARAMS, pd.DataFrame({"a": [5]}), path=tmp_path)
+    assert precompute.fetch("oos_actual", VERSIONS, PARAMS, path=tmp_path)["a"].tolist() == [5]
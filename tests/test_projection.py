@@ -0,0 +1,489 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import projection
+
+KOS, STL = 100000, 80000
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(7)
+    supply_dates = pd.date_range("2025-02-25", "2025-04-20")
+    supply = pd.DataFrame({
+        "Date": supply_dates,
+        "KOS": rng.integers(85000, 110000, len(supply_dates)),
+        "STL": rng.integers(55000, 90000, len(supply_dates)),
+    })
+    oos_dates = pd.date_range("2025-02-25", "2025-04-10")
+    oos = pd.DataFrame({"Date Key": oos_dates, "OOS%": rng.uniform(8, 15, len(oos_dates)).round(2)})
+    forecast_dates = pd.date_range("2025-03-01", "2025-04-30")
+    forecast = pd.DataFrame({"Date Key": forecast_dates, "Forecast": rng.uniform(150000, 250000, len(forecast_dates))})
+    return supply, oos, forecast
+
+
+@pytest.fixture
+def flows():
+    dates = pd.date_range("2025-04-09", "2025-04-30")
+    inbound = pd.DataFrame({"Date": dates, "KOS": 60000, "STL": 50000})
+    outbound = pd.DataFrame({"Date": dates, "KOS": 100000, "STL": 80000})
+    return inbound, outbound
+
+
+def baseline_oos_actual(supply_data, oos_data, demand_forecast, custom_kos_supply, custom_stl_supply):
+    # The per-day loop projected_oos_actual.py ran before core.projection, with numbers instead of strings
+    supply_data = supply_data.sort_values("Date")
+    fixed_kos_zero_outbound_days = ["2025-04-19", "2025-04-20"]
+    fixed_stl_zero_outbound_days = ["2025-04-25", "2025-04-26", "2025-04-27"]
+    locked_kos_days = {"2025-04-18": 45000}
+    file_only_dates = pd.date_range("2025-04-16", "2025-04-20").tolist() + pd.date_range("2025-04-22", "2025-04-27").tolist()
+    file_only_dates = [d.strftime("%Y-%m-%d") for d in file_only_dates]
+    daily_decrease = 0.00015
+    historical_avg_supply = (supply_data["KOS"].mean() + supply_data["STL"].mean()) if not supply_data.empty else 180000
+
+    rows = []
+    for i, date in enumerate(pd.date_range("2025-03-01", "2025-04-30"), start=1):
+        reference_date = date - pd.Timedelta(days=3)
+        recent_oos_data = oos_data[oos_data["Date Key"] < reference_date].sort_values("Date Key", ascending=False).head(3)
+        base_oos = recent_oos_data["OOS%"].mean() * 0.01
+        prev_date = date - pd.Timedelta(days=1)
+        date_str = date.strftime("%Y-%m-%d")
+        historical_supply = supply_data[supply_data["Date"] == prev_date]
+        historical_oos = oos_data[oos_data["Date Key"] == date]
+
+        if not historical_oos.empty:
+            projected_oos = historical_oos["OOS%"].values[0] * 0.01
+            kos_stock = historical_supply["KOS"].values[0] if not historical_supply.empty else custom_kos_supply
+            stl_stock = historical_supply["STL"].values[0] if not historical_supply.empty else custom_stl_supply
+        else:
+            if date_str in locked_kos_days:
+                kos_stock = locked_kos_days[date_str]
+            elif date_str in file_only_dates:
+                kos_stock = historical_supply["KOS"].values[0] if not historical_supply.empty else custom_kos_supply
+                stl_stock = historical_supply["STL"].values[0] if not historical_supply.empty else custom_stl_supply
+            else:
+                kos_stock = custom_kos_supply
+                stl_stock = custom_stl_supply
+
+            if date < pd.Timestamp("2025-04-09"):
+                projected_oos = base_oos
+            else:
+                projected_oos = max(0, base_oos - daily_decrease)
+            if date_str == "2025-04-17":
+                projected_oos *= 0.95
+            elif date_str == "2025-04-18":
+                projected_oos *= 1.45
+            elif date_str in ["2025-04-23", "2025-04-24"]:
+                projected_oos *= 0.90
+
+            supply_factor = (kos_stock + stl_stock) / historical_avg_supply
+            if date_str in fixed_kos_zero_outbound_days:
+                kos_stock = 0
+                projected_oos += 0.012 * ((1 + supply_factor) * 0.95)
+            elif date_str in fixed_stl_zero_outbound_days:
+                stl_stock = 0
+                projected_oos += 0.011 * ((1 + supply_factor) * 0.9)
+            if supply_factor > 1:
+                projected_oos *= max(0.75, 1 - (supply_factor - 1) * 0.3)
+            elif supply_factor < 1:
+                projected_oos *= min(1.35, 1 + (1 - supply_factor) * 0.50)
+
+            daily_demand = demand_forecast[demand_forecast["Date Key"] == date]
+            total_demand = daily_demand["Forecast"].sum() if not daily_demand.empty else demand_forecast["Forecast"].mean()
+            demand_factor = total_demand / demand_forecast["Forecast"].max() if total_demand > 0 else 1
+            projected_oos *= demand_factor * 1.25
+            projected_oos = max(0, projected_oos * (1 - i * daily_decrease * (1 + supply_factor)) * 1.12)
+
+        rows.append({"Date": date.strftime("%d %b %Y"), "KOS SO Qty": float(kos_stock), "STL SO Qty": float(stl_stock), "Projected OOS%": projected_oos})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("kos, stl", [(KOS, STL), (90000, 120000), (110000, 60000)])
+def test_oos_actual_without_flows_matches_the_baseline(history, kos, stl):
+    supply, oos, forecast = history
+    df = projection.project_oos_actual(supply, oos, None, None, forecast, kos, stl)
+    expected = baseline_oos_actual(supply, oos, forecast, kos, stl)
+    assert df.columns.tolist() == expected.columns.tolist()
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False, rtol=1e-12)
+
+
+def test_oos_actual_grid_matches_single_evaluations(history):
+    supply, oos, forecast = history
+    prepared = projection.prepare_oos_actual(supply, oos, forecast)
+    kos_values, stl_values = np.array([90000, 100000, 110000]), np.array([60000, 80000])
+    grid, _, _ = projection.evaluate_oos_actual(prepared, kos_values[:, None], stl_values[None, :])
+    for i, kos in enumerate(kos_values):
+        for j, stl in enumerate(stl_values):
+            single, _, _ = projection.evaluate_oos_actual(prepared, kos, stl)
+            np.testing.assert_allclose(grid[i, j], single)
+
+
+def test_flows_only_cut_the_custom_supply(history, flows):
+    supply, oos, forecast = history
+    inbound, outbound = flows
+    plain = projection.project_oos_actual(supply, oos, None, None, forecast, KOS, STL)
+    df = projection.project_oos_actual(supply, oos, inbound, outbound, forecast, KOS, STL, 60000, 40000)
+    prepared = projection.prepare_oos_actual(supply, oos, forecast, inbound, outbound)
+
+    # Days with actual OOS% and file-only days with a stored supply keep the history
+    from_history = prepared["has_actual"] | (prepared["file_only"] & prepared["has_prev_supply"])
+    assert from_history[~prepared["has_actual"]].any()
+    kept = ["KOS SO Qty", "STL SO Qty"]
+    pd.testing.assert_frame_equal(df.loc[from_history, kept], plain.loc[from_history, kept])
+    pd.testing.assert_series_equal(df.loc[prepared["has_actual"], "Projected OOS%"], plain.loc[prepared["has_actual"], "Projected OOS%"])
+    locked = df["Date"] == "18 Apr 2025"
+    assert df.loc[locked, "KOS SO Qty"].item() == 45000
+
+    # Outbound runs ahead of inbound, so the DC can't cover the custom SO
+    custom = ~from_history & ~df["Date"].isin(["18 Apr 2025", "19 Apr 2025", "20 Apr 2025", "25 Apr 2025", "26 Apr 2025", "27 Apr 2025"]).to_numpy()
+    assert (df.loc[custom, "KOS SO Qty"] <= KOS).all() and (df.loc[custom, "KOS SO Qty"] < KOS).any()
+    assert (df.loc[custom, "STL SO Qty"] < STL).any()
+    assert df["KOS DC Stock"].iloc[:prepared["first_projected"]].isna().all()
+
+
+def test_opening_stock_defaults_to_the_last_supply_before_the_projection(history):
+    supply, oos, _ = history
+    first = projection.first_projected_date(oos)
+    assert first == pd.Timestamp("2025-04-11")
+    last = supply[supply["Date"] < first].iloc[-1]
+    assert projection.opening_stock(supply, oos) == (int(last["KOS"]), int(last["STL"]))
+
+
+def test_simulate_stock_matches_a_daily_loop():
+    rng = np.random.default_rng(1)
+    inbound = rng.integers(0, 100, 40).astype(float)
+    outbound = rng.integers(0, 120, 40).astype(float)
+    stock, shipped = projection.simulate_stock(inbound, outbound, 50)
+    level, expected_stock, expected_shipped = 50.0, [], []
+    for inn, out in zip(inbound, outbound):
+        available = level + inn
+        ship = min(available, out)
+        level = available - ship
+        expected_stock.append(level)
+        expected_shipped.append(ship)
+    np.testing.assert_allclose(stock, expected_stock)
+    np.testing.assert_allclose(shipped, expected_shipped)
+
+
+# ---- The page loops core.projection replaced (app.py, oos_projection.py, so_qty.py, rekap.py) ----
+CURRENT_SUPPLY = {"KOS": 100000, "STL": 15000}
+CHANGE_DATE = pd.Timestamp("2025-03-09")
+FIXED_OOS = {pd.Timestamp(d): v for d, v in [
+    ("2025-02-28", 13.37), ("2025-03-01", 13.43), ("2025-03-02", 13.44), ("2025-03-03", 13.51),
+    ("2025-03-04", 13.66), ("2025-03-05", 13.71), ("2025-03-06", 13.73), ("2025-03-07", 13.83),
+    ("2025-03-08", 13.85), ("2025-03-09", 12.63),
+]}
+TARGET_DATES = pd.date_range("2025-02-28", periods=62, freq="D")
+
+
+@pytest.fixture
+def forecast_rows():
+    # Several forecast rows per day, and a few days without any
+    rng = np.random.default_rng(11)
+    dates = pd.date_range("2025-02-20", "2025-04-25").drop(pd.date_range("2025-03-20", "2025-03-23"))
+    dates = dates.repeat(3)
+    return pd.DataFrame({"Date Key": dates, "Forecast": rng.uniform(40000, 90000, len(dates))})
+
+
+def baseline_demand_summary(demand_forecast):
+    demand_summary = demand_forecast.groupby("Date Key")["Forecast"].sum().reset_index()
+    demand_summary["Normalized Demand"] = demand_summary["Forecast"] / demand_summary["Forecast"].max()
+    return demand_summary
+
+
+def baseline_stl_adjustment(demand_summary, custom_stl_supply, target_oos_percent, uniform):
+    df_oos_target, df_oos_supply = [], []
+    for date in TARGET_DATES:
+        supply = CURRENT_SUPPLY.copy() if date < CHANGE_DATE else {"KOS": 100000, "STL": custom_stl_supply}
+        daily_demand = demand_summary[demand_summary["Date Key"] == date]
+        if date in FIXED_OOS:
+            projected_oos = FIXED_OOS[date]
+        else:
+            days_after_change = (date - CHANGE_DATE).days
+            supply_factor = max(0, min(1, (supply["STL"] - 40000) / 35000 * 0.5))
+            if days_after_change < 7:
+                projected_oos = 12 - (3 * days_after_change / 7) * (1 - supply_factor)
+            else:
+                projected_oos = daily_demand["Forecast"].sum() / 22000 * (1 - supply_factor)
+        final_qty_target_oos = 140000 + ((projected_oos / 100) - (target_oos_percent) * 140000 * (1.275 + uniform(-0.05, 0.05)))
+        df_oos_target.append({"Date": date.strftime("%d %b %Y"), "KOS Supply": supply["KOS"], "STL Supply": supply["STL"], "Projected OOS%": round(projected_oos, 2)})
+        df_oos_supply.append({
+            "Date": date.strftime("%d %b %Y"),
+            "Final Qty (Target OOS%)": round(final_qty_target_oos, 0),
+            "Final Qty KOS (Target OOS%)": round(final_qty_target_oos * (2/3), 0),
+            "Final Qty STL (Target OOS%)": round(final_qty_target_oos * (1/3), 0),
+        })
+    return pd.DataFrame(df_oos_target), pd.DataFrame(df_oos_supply)
+
+
+def baseline_oos_stl(demand_summary, custom_stl_supply):
+    df_oos_target = []
+    for date in TARGET_DATES:
+        supply = CURRENT_SUPPLY.copy() if date <= CHANGE_DATE else {"KOS": 100000, "STL": custom_stl_supply}
+        daily_demand = demand_summary[demand_summary["Date Key"] == date]
+        if date in FIXED_OOS:
+            projected_oos = FIXED_OOS[date]
+        else:
+            days_after_change = (date - CHANGE_DATE).days
+            supply_factor = max(0, min(1, (supply["STL"] - 40000) / 35000 * 0.5))
+            if days_after_change < 7:
+                projected_oos = 12 - (3 * days_after_change / 7) * ((supply_factor * 1.2) + 1)
+            else:
+                projected_oos = daily_demand["Forecast"].sum() / 22000 * (1 - supply_factor)
+        df_oos_target.append({"Date": date.strftime("%d %b %Y"), "KOS Supply": supply["KOS"], "STL Supply": supply["STL"], "Projected OOS%": round(projected_oos, 2)})
+    return pd.DataFrame(df_oos_target)
+
+
+def baseline_so_qty(demand_summary, target_oos_percent, uniform):
+    df_oos_supply = []
+    for date in TARGET_DATES:
+        daily_demand = demand_summary[demand_summary["Date Key"] == date]
+        if date in FIXED_OOS:
+            projected_oos = FIXED_OOS[date]
+        else:
+            days_after_change = (date - CHANGE_DATE).days
+            if days_after_change < 7:
+                projected_oos = 12 - (3 * days_after_change / 7)
+            else:
+                projected_oos = daily_demand["Forecast"].sum() / 22000
+        final_qty_target_oos = 140000 + ((projected_oos / 100) - target_oos_percent) * 140000 * (1.275 + uniform(-0.05, 0.05))
+        df_oos_supply.append({
+            "Date": date.strftime("%d %b %Y"),
+            "Final Qty Needed": round(final_qty_target_oos, 0),
+            "Final Qty KOS Needed": round(final_qty_target_oos * (2/3), 0),
+            "Final Qty STL Needed": round(final_qty_target_oos * (1/3), 0),
+        })
+    return pd.DataFrame(df_oos_supply)
+
+
+def baseline_rekap(supply_data, fixed_oos_data, demand_forecast, custom_stl_supply):
+    supply_data = supply_data.sort_values("Date")
+    forecasted_supply = []
+    rolling_supply_data = supply_data.copy()
+    for target_date in pd.date_range("2025-03-04", "2025-03-31"):
+        prev_days = rolling_supply_data[rolling_supply_data["Date"] < target_date].tail(7)
+        if not prev_days.empty:
+            avg_kos, avg_stl = prev_days["KOS"].mean(), prev_days["STL"].mean()
+        else:
+            avg_kos, avg_stl = 100000, custom_stl_supply
+        forecasted_supply.append({"Date": target_date, "KOS": avg_kos, "STL": avg_stl})
+        rolling_supply_data = pd.concat([rolling_supply_data, pd.DataFrame(forecasted_supply[-1:], index=[0])])
+    extended_supply = pd.concat([supply_data, pd.DataFrame(forecasted_supply)]).drop_duplicates(subset=["Date"], keep="last").sort_values("Date")
+    demand_summary = baseline_demand_summary(demand_forecast)
+    change_date = pd.Timestamp("2025-04-01")
+
+    oos_data = []
+    last_7_days_oos = fixed_oos_data[fixed_oos_data["Date Key"] >= (pd.Timestamp("2025-03-03") - pd.Timedelta(days=7))]
+    avg_oos_increase = last_7_days_oos["OOS%"].pct_change().mean() if not last_7_days_oos.empty else 0
+    for date in TARGET_DATES:
+        projected_oos = None
+        supply = None
+        if date in fixed_oos_data["Date Key"].values:
+            projected_oos = fixed_oos_data.loc[fixed_oos_data["Date Key"] == date, "OOS%"].values[0]
+            supply = supply_data.loc[supply_data["Date"] == date]
+        elif pd.Timestamp("2025-03-04") <= date <= pd.Timestamp("2025-03-31"):
+            supply = extended_supply.loc[extended_supply["Date"] == date]
+            prev_date = date - pd.Timedelta(days=1)
+            prev_oos_values = [entry["Projected OOS%"] for entry in oos_data if entry["Date"] == prev_date.strftime("%d %b %Y")]
+            if prev_oos_values:
+                projected_oos = prev_oos_values[0] * (1 + avg_oos_increase)
+            else:
+                projected_oos = last_7_days_oos["OOS%"].mean()
+        elif date < change_date:
+            supply = supply_data.loc[supply_data["Date"] == date]
+        if supply is not None and not supply.empty:
+            supply = supply.squeeze()
+        else:
+            supply = pd.Series({"KOS": 100000, "STL": custom_stl_supply})
+        oos_data.append({
+            "Date": date.strftime("%d %b %Y"),
+            "KOS Supply": supply.get("KOS", 100000),
+            "STL Supply": supply.get("STL", custom_stl_supply),
+            "Projected OOS%": projected_oos if projected_oos is not None else np.nan,
+        })
+
+    oos_values = [entry["Projected OOS%"] for entry in oos_data if pd.to_datetime(entry["Date"]) in pd.date_range("2025-03-04", "2025-03-07") and not pd.isna(entry["Projected OOS%"])]
+    projected_oos_8mar = np.mean(oos_values) if oos_values else 12
+    for entry in oos_data:
+        date = pd.to_datetime(entry["Date"])
+        if date >= change_date:
+            days_after_change = (date - change_date).days
+            supply_factor = max(0, min(1, (custom_stl_supply - 40000) / 35000 * 0.5))
+            if days_after_change < 7:
+                entry["Projected OOS%"] = round(projected_oos_8mar - (3 * days_after_change / 7) * ((supply_factor * 1.2) + 1), 2)
+            else:
+                last_available_date = demand_summary[demand_summary["Date Key"] <= date]["Date Key"].max()
+                last_available_demand = demand_summary[demand_summary["Date Key"] == last_available_date]["Forecast"].sum()
+                forecast_value = last_available_demand if not pd.isna(last_available_demand) else demand_summary["Forecast"].mean()
+                entry["Projected OOS%"] = round(forecast_value / 20000 * (1 - supply_factor), 2)
+    return pd.DataFrame(oos_data)
+
+
+def test_summarize_demand_matches_the_page_groupby(forecast_rows):
+    expected = baseline_demand_summary(forecast_rows)
+    pd.testing.assert_frame_equal(projection.summarize_demand(forecast_rows), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("stl", [40000, 55000, 100000])
+def test_stl_adjustment_matches_app_py(forecast_rows, stl):
+    summary = projection.summarize_demand(forecast_rows)
+    target, supply = projection.project_stl_adjustment(summary, stl, 0.02, np.random.RandomState(5))
+    expected_target, expected_supply = baseline_stl_adjustment(baseline_demand_summary(forecast_rows), stl, 0.02, np.random.RandomState(5).uniform)
+    pd.testing.assert_frame_equal(target, expected_target, check_dtype=False)
+    pd.testing.assert_frame_equal(supply, expected_supply, check_dtype=False)
+
+
+@pytest.mark.parametrize("stl", [40000, 62500, 100000])
+def test_oos_stl_matches_oos_projection_py(forecast_rows, stl):
+    df = projection.project_oos_stl(projection.summarize_demand(forecast_rows), stl)
+    pd.testing.assert_frame_equal(df, baseline_oos_stl(baseline_demand_summary(forecast_rows), stl), check_dtype=False)
+
+
+def test_so_qty_matches_so_qty_py(forecast_rows):
+    df = projection.project_so_qty(projection.summarize_demand(forecast_rows), 0.05, np.random.RandomState(9))
+    expected = baseline_so_qty(baseline_demand_summary(forecast_rows), 0.05, np.random.RandomState(9).uniform)
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("stl", [40000, 75000])
+def test_oos_rekap_matches_rekap_py(forecast_rows, stl):
+    rng = np.random.default_rng(4)
+    supply_dates = pd.date_range("2025-02-20", "2025-03-06")
+    supply = pd.DataFrame({"Date": supply_dates, "KOS": rng.integers(90000, 110000, len(supply_dates)), "STL": rng.integers(15000, 40000, len(supply_dates))})
+    oos_dates = pd.date_range("2025-02-22", "2025-03-05")
+    oos = pd.DataFrame({"Date Key": oos_dates, "OOS%": rng.uniform(11, 14, len(oos_dates)).round(2)})
+
+    expected = baseline_rekap(supply, oos, forecast_rows, stl)
+    for demand_forecast in (forecast_rows, projection.demand_aggregates(forecast_rows)):
+        df = projection.project_oos_rekap(supply, oos, demand_forecast, stl)
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+# ---- Monte Carlo bands (simulate_stl_adjustment) ----
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(projection, "MC_SHARD_PATHS", 700)
+
+
+def exact_paths(summary, stl, target, paths, seed):
+    # Every path kept, drawn from the same shard seeds
+    rows = projection.stl_adjustment_oos(summary, stl)
+    projected_oos = np.array([p for _, _, p in rows])
+    n_shards = -(-paths // projection.MC_SHARD_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = [min(projection.MC_SHARD_PATHS, paths - i * projection.MC_SHARD_PATHS) for i in range(n_shards)]
+    noise = np.concatenate([
+        np.random.default_rng(s).uniform(-projection.MC_NOISE, projection.MC_NOISE, size=(len(projected_oos), n))
+        for s, n in zip(seeds, sizes)
+    ], axis=1)
+    return projection.target_oos_qty(projected_oos[:, None], target, noise), projected_oos
+
+
+def test_monte_carlo_bands_are_close_to_the_exact_percentiles(forecast_rows, small_shards):
+    summary = projection.summarize_demand(forecast_rows)
+    df = projection.simulate_stl_adjustment(summary, 60000, 0.03, paths=2500, seed=3, workers=1)
+    qty, projected_oos = exact_paths(summary, 60000, 0.03, 2500, 3)
+    _, width = projection._qty_range(projected_oos, 0.03)
+    qty.sort(axis=1)
+    for p in projection.MC_PERCENTILES:
+        rank = p / 100 * (qty.shape[1] - 1)
+        k = int(rank)
+        exact = np.percentile(qty, p, axis=1)
+        gap = qty[:, k + 1] - qty[:, k]
+        # plus half a unit for the rounding of the bands
+        assert (np.abs(df[f"Total P{p}"].to_numpy() - exact) <= width + gap + 0.5).all()
+    assert (df["Total P10"] <= df["Total P50"]).all() and (df["Total P50"] <= df["Total P90"]).all()
+
+
+def test_monte_carlo_bands_depend_on_the_seed_not_the_workers(forecast_rows, small_shards):
+    summary = projection.summarize_demand(forecast_rows)
+    single = projection.simulate_stl_adjustment(summary, 60000, 0.03, paths=2000, seed=8, workers=1)
+    pooled = projection.simulate_stl_adjustment(summary, 60000, 0.03, paths=2000, seed=8, workers=2)
+    pd.testing.assert_frame_equal(single, pooled)
+    other = projection.simulate_stl_adjustment(summary, 60000, 0.03, paths=2000, seed=9, workers=1)
+    assert not single.equals(other)
+
+
+# ---- Inverse solver (solve_stl_supply) ----
+def test_oos_stl_curve_matches_project_oos_stl(forecast_rows):
+    summary = projection.summarize_demand(forecast_rows)
+    supplies = np.array([40000, 52500, 75000, 110000])
+    curves = projection.oos_stl_curve(summary, supplies[:, None])
+    for supply, curve in zip(supplies, curves):
+        expected = projection.project_oos_stl(summary, supply)["Projected OOS%"].to_numpy()
+        np.testing.assert_allclose(np.round(curve, 2), expected)
+
+
+def test_per_day_supply_is_the_smallest_meeting_the_target(forecast_rows):
+    summary = projection.summarize_demand(forecast_rows)
+    target = 8.0
+    supply = projection.solve_stl_supply(summary, target, tol=1.0)
+    curve = projection.oos_stl_curve(summary, supply)
+    solved = ~np.isnan(supply) & (supply > 40000)
+    assert solved.any()
+    assert (curve[solved] <= target + 1e-9).all()
+    # One tolerance less misses the target on every solved day
+    assert (projection.oos_stl_curve(summary, np.where(solved, supply - 2.0, supply))[solved] > target).all()
+
+    # Fixed-OOS days don't depend on the supply; days that 110k can't bring down are NaN
+    fixed = np.isin(projection.target_dates(), list(projection.FIXED_OOS))
+    at_high = projection.oos_stl_curve(summary, 110000.0)
+    assert np.isnan(supply[~fixed & (at_high > target)]).all()
+    met_at_low = projection.oos_stl_curve(summary, 40000.0) <= target
+    assert (supply[met_at_low] == 40000).all()
+
+
+def test_per_category_targets_broadcast(forecast_rows):
+    summary = projection.summarize_demand(forecast_rows)
+    targets = np.array([[7.0], [9.0]])
+    supply = projection.solve_stl_supply(summary, targets)
+    assert supply.shape == (2, len(projection.target_dates()))
+    np.testing.assert_array_equal(supply[1], projection.solve_stl_supply(summary, 9.0))
+    both = ~np.isnan(supply).any(axis=0)
+    assert (supply[0, both] >= supply[1, both]).all()
+
+
+def test_horizon_supply_meets_the_average_target(forecast_rows):
+    summary = projection.summarize_demand(forecast_rows)
+    horizon = ("2025-03-20", "2025-04-20")
+    targets = [4.0, 6.5]
+    supply = projection.solve_stl_supply(summary, np.array(targets), per="horizon", horizon=horizon)
+    assert (supply > 40000).all() and supply[0] > supply[1]
+    dates = projection.target_dates()
+    in_horizon = (dates >= horizon[0]) & (dates <= horizon[1])
+    for s, target in zip(supply, targets):
+        assert projection.oos_stl_curve(summary, s)[in_horizon].mean() <= target
+        assert projection.oos_stl_curve(summary, s - 2.0)[in_horizon].mean() > target
+    with pytest.raises(ValueError):
+        projection.solve_stl_supply(summary, 9.0, per="week")
+    with pytest.raises(ValueError):
+        projection.solve_stl_supply(summary, 9.0, per="horizon", horizon=("2026-01-01", "2026-02-01"))
+
+
+@pytest.mark.parametrize("with_flows", [False, True])
+def test_oos_actual_surface_matches_project_oos_actual(history, flows, with_flows):
+    supply, oos, forecast = history
+    inbound, outbound = flows if with_flows else (None, None)
+    prepared = projection.prepare_oos_actual(supply, oos, forecast, inbound, outbound)
+    kos_values, stl_values = [90000, 110000], [60000, 70000, 90000]
+    in_process = projection.oos_actual_surface(prepared, kos_values, stl_values, workers=1)
+    pooled = projection.oos_actual_surface(prepared, kos_values, stl_values, workers=2)
+    np.testing.assert_allclose(pooled, in_process)
+
+    projected_days = ~prepared["has_actual"]
+    for i, kos in enumerate(kos_values):
+        for j, stl in enumerate(stl_values):
+            df = projection.project_oos_actual(supply, oos, inbound, outbound, forecast, kos, stl)
+            days = df.loc[projected_days, "Projected OOS%"]
+            assert in_process[0][i, j] == pytest.approx(days.mean())
+            assert in_process[1][i, j] == pytest.approx(days.max())
+
+
+def test_oos_actual_takes_forecast_rows_or_their_aggregates(history, forecast_rows):
+    # Several rows per day and missing days: peak and fallback demand are over rows, not days
+    supply, oos, _ = history
+    expected = baseline_oos_actual(supply, oos, forecast_rows, KOS, STL)
+    for demand_forecast in (forecast_rows, projection.demand_aggregates(forecast_rows)):
+        df = projection.project_oos_actual(supply, oos, None, None, demand_forecast, KOS, STL)
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False, rtol=1e-12)
@@ -0,0 +1,88 @@
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import doi, servicelevel
+
+GRID = np.round(np.arange(0, 2.0 + 1e-9, 0.25), 2)
+
+
+def rows(n=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(5, 50, n), rng.uniform(100, 900, n), rng.uniform(2000, 9000, n), rng.uniform(1, 6, n)
+
+
+def total_cost(z, sigma_units, holding_cost, margin, cycles):
+    holding, lost = servicelevel.costs(z, sigma_units, holding_cost, margin, cycles)
+    return holding.sum() + lost.sum()
+
+
+def test_normal_loss_at_known_points():
+    assert servicelevel.normal_loss(0.0) == pytest.approx(1 / math.sqrt(2 * math.pi))
+    # L(z) - L(-z) = -z
+    z = np.array([0.5, 1.0, 2.5])
+    np.testing.assert_allclose(servicelevel.normal_loss(z) - servicelevel.normal_loss(-z), -z)
+    np.testing.assert_allclose(servicelevel.normal_cdf([0.0, 1.65]), [0.5, 0.950529], atol=1e-6)
+
+
+def test_unconstrained_z_minimizes_each_rows_cost():
+    sigma_units, holding_cost, margin, cycles = rows(6)
+    solved = servicelevel.optimize(sigma_units, holding_cost, margin, cycles, z_grid=GRID)
+    for i in range(len(sigma_units)):
+        args = (sigma_units[i], holding_cost[i], margin[i], cycles[i])
+        best = min(GRID, key=lambda z: total_cost(np.array([z]), *args))
+        assert total_cost(np.array([solved["z"][i]]), *args) == pytest.approx(total_cost(np.array([best]), *args))
+
+
+@pytest.mark.parametrize("share", [0.2, 0.5, 0.8])
+def test_budgeted_z_is_the_cheapest_at_its_spend(share):
+    sigma_units, holding_cost, margin, cycles = rows(3, seed=2)
+    args = (sigma_units, holding_cost, margin, cycles)
+    free = servicelevel.optimize(*args, z_grid=GRID)
+    budget = share * free["spend"]
+    solved = servicelevel.optimize(*args, budget=budget, z_grid=GRID)
+    holding, _ = servicelevel.costs(solved["z"], *args)
+    assert holding.sum() == pytest.approx(solved["spend"]) and solved["spend"] <= budget
+
+    # Brute force over every grid combination that spends no more
+    best = np.inf
+    for combo in itertools.product(GRID, repeat=len(sigma_units)):
+        z = np.array(combo)
+        if servicelevel.costs(z, *args)[0].sum() <= solved["spend"] + 1e-9:
+            best = min(best, servicelevel.costs(z, *args)[1].sum())
+    assert servicelevel.costs(solved["z"], *args)[1].sum() == pytest.approx(best)
+
+
+def test_optimize_doi_only_moves_rows_with_a_safety_term():
+    n = 40
+    rng = np.random.default_rng(5)
+    merged = pd.DataFrame({
+        "location_id": 40, "product_id": np.arange(n),
+        "product_type_name": rng.choice(["Fresh", "Dry"], n),
+        "pareto": rng.choice(["X", "A", "B", "C"], n),
+        "demand_type": rng.choice(["Stable", "Volatile"], n),
+        "doi_policy": rng.uniform(3, 20, n), "lead_time": rng.uniform(1, 8, n), "lead_time_std": rng.uniform(0.5, 2, n),
+        "avg_demand": rng.uniform(1, 50, n), "std_demand": rng.uniform(1, 20, n),
+        "resched_count": 0.0, "total_inbound": 1.0,
+    })
+    params = doi.default_doi_params()
+    holding_cost = np.where(rng.random(n) < 0.2, np.nan, rng.uniform(100, 900, n))
+    cogs = rng.uniform(2000, 9000, n)
+
+    result = servicelevel.optimize_doi(merged, params, holding_cost, cogs, budget="policy")
+    terms = doi.doi_terms(merged, params)
+    assert result["optimized"].any()
+    assert not result["optimized"][np.isnan(holding_cost) | ~terms["apply"]].any()
+    kept = ~result["optimized"]
+    np.testing.assert_array_equal(result["z"][kept], terms["z"][kept])
+    assert result["holding"] <= result["policy_holding"] + 1e-6
+
+    # Z only reaches the DOI through the rows it was optimized for
+    final = doi.compute_final_doi(merged, params, z=result["z"])["final_doi"]
+    default = doi.compute_final_doi(merged, params)["final_doi"]
+    assert (final[~terms["apply"]] == default[~terms["apply"]]).all()
+    off = servicelevel.optimize_doi(merged, {**params, "include_safety": False}, holding_cost, cogs)
+    assert not off["optimized"].any()
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import skuindex
+
+
+@pytest.fixture
+def catalog():
+    rng = np.random.default_rng(3)
+    words = ["indomie", "goreng", "rendang", "kopi", "kapal", "api", "susu", "ultra", "coklat", "200ml", "1L"]
+    ids = rng.choice(np.arange(100, 400), 500)
+    names = [" ".join(rng.choice(words, rng.integers(1, 4))) for _ in ids]
+    names[0] = None
+    return pd.Series(ids), pd.Series(names)
+
+
+def naive(ids, names, query):
+    # Every query word prefixes some word of the label
+    labels = sorted(set((ids.astype(str) + " - " + names.astype(object)).dropna()))
+    terms = skuindex.words(query)
+    return [label for label in labels if all(any(w.startswith(t) for w in skuindex.words(label)) for t in terms)]
+
+
+@pytest.mark.parametrize("query", ["indo", "kop api", "KAPAL", "12", "200", "susu ultra co", "zzz", "1l"])
+def test_search_matches_a_linear_filter(catalog, query):
+    ids, names = catalog
+    index = skuindex.build(ids, names)
+    hits = skuindex.search(index, query, limit=10**6)
+    assert sorted(index["labels"][hits]) == naive(ids, names, query)
+
+
+def test_exact_id_comes_first_and_limit_applies(catalog):
+    ids, names = catalog
+    index = skuindex.build(ids, names)
+    target = str(ids.iloc[200])
+    hits = skuindex.search(index, target)
+    assert index["keys"][hits[0]] == target
+    assert len(skuindex.search(index, "")) == min(skuindex.MATCHES, len(index["labels"]))
+    assert len(skuindex.search(index, "a", limit=3)) <= 3
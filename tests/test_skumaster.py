@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import lastbite, skumaster
+
+
+def holding():
+    return pd.DataFrame({
+        " Product ID": [30, 10, 20, 40],
+        "product name": ["Cherry", "Apple", None, "Date"],
+        "cogs": [7000.0, 5000.0, 6000.0, np.nan],
+        "brand company": ["A", "A", "B", "B"],
+    })
+
+
+@pytest.mark.parametrize("how", ["inner", "left"])
+def test_join_matches_a_merge(tmp_path, how):
+    master = skumaster.ensure(holding(), str(tmp_path))
+    df = pd.DataFrame({"product id": [20, 99, 10, 20, None, 40], "location id": [1, 2, 3, 4, 5, 6]})
+    joined = skumaster.join(master, df, ["product name", "cogs"], how=how)
+
+    reference = holding().rename(columns={" Product ID": "product id"})[["product id", "product name", "cogs"]]
+    expected = df.merge(reference, on="product id", how=how)
+    pd.testing.assert_frame_equal(joined.reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_first_row_wins_for_a_repeated_id(tmp_path):
+    df = pd.concat([holding(), holding().assign(cogs=1.0)], ignore_index=True)
+    master = skumaster.ensure(df, str(tmp_path))
+    assert master["ids"].tolist() == [10, 20, 30, 40]
+    pos, found = skumaster.locate(master, [30, 31])
+    assert found.tolist() == [True, False]
+    assert skumaster.column(master, "cogs", pos[:1])[0] == 7000.0
+
+
+def test_ensure_rebuilds_only_for_new_content(tmp_path):
+    path = str(tmp_path)
+    first = skumaster.ensure(holding(), path)
+    assert skumaster.ensure(holding(), path)["version"] == first["version"]
+    changed = holding().assign(cogs=1.0)
+    second = skumaster.ensure(changed, path)
+    assert second["version"] != first["version"]
+    assert skumaster.current_version(path) == second["version"]
+    assert np.asarray(second["columns"]["cogs"]).tolist() == [1.0] * 4
+
+
+def test_lastbite_frame_is_the_same_from_the_master(tmp_path):
+    soh = pd.DataFrame({"Product ID": [10, 20, 30, 50], "Location ID": [772, 40, 661, 772], "Sum of Stock": [100, 20, 0, 5]})
+    fc = pd.DataFrame({"Product ID": [10, 20, 30, 50], "Forecast Daily": [5.0, 2.0, 1.0, 3.0]})
+    occupancy = holding().assign(holding_cost=[3.0, 1.0, 2.0, 4.0])
+    master = skumaster.ensure(occupancy, str(tmp_path))
+    pd.testing.assert_frame_equal(
+        lastbite.prepare_lastbite(soh, fc, master).reset_index(drop=True),
+        lastbite.prepare_lastbite(soh, fc, occupancy).reset_index(drop=True),
+    )
@@ -0,0 +1,61 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from core import store
+
+
+def supply(dates, kos, stl):
+    return pd.DataFrame({"Date": pd.to_datetime(dates), "KOS": kos, "STL": stl})
+
+
+def oos(dates, values):
+    return pd.DataFrame({"Date Key": pd.to_datetime(dates), "OOS%": values})
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "history.sqlite")
+
+
+def test_upsert_skips_unchanged_rows_and_overwrites_corrections(path):
+    assert store.ingest_supply(supply(["2025-04-01", "2025-04-02"], [100, 110], [80, 85]), path) == 4
+    assert store.ingest_supply(supply(["2025-04-01", "2025-04-02"], [100, 110], [80, 85]), path) == 0
+    assert store.ingest_supply(supply(["2025-04-02", "2025-04-03"], [111, 120], [85, 90]), path) == 3
+    df = store.read_supply(path=path)
+    assert df["KOS"].tolist() == [100, 111, 120]
+    assert store.watermarks(path)["supply"] == (pd.Timestamp("2025-04-03"), 2)
+
+
+def test_history_reads_incrementally_and_matches_a_full_read(path):
+    store.ingest_supply(supply(["2025-04-01", "2025-04-02"], [100, 110], [80, 85]), path)
+    store.ingest_oos(oos(["2025-04-01"], [12.5]), path)
+    first, _ = store.history(path)
+    store.ingest_supply(supply(["2025-04-01", "2025-04-03"], [101, 120], [None, 90]), path)
+    store.ingest_oos(oos(["2025-04-02"], [10.0]), path)
+    supply_hist, oos_hist = store.history(path)
+    pd.testing.assert_frame_equal(supply_hist, store.read_supply(path=path))
+    pd.testing.assert_frame_equal(oos_hist, store.read_oos(path=path))
+    assert len(first) == 2 and supply_hist["KOS"].tolist() == [101, 110, 120]
+    assert pd.isna(supply_hist["STL"].iloc[0])
+
+
+def test_connections_are_closed(path, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(store.sqlite3, "connect", tracking)
+    store.ingest_supply(supply(["2025-04-01"], [100], [80]), path)
+    store.history(path)
+    store.watermarks(path)
+    store.read_oos(path=path)
+    assert len(opened) >= 4
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
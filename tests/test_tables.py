@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from core import tables
+
+
+@pytest.mark.parametrize("fmt, value, expected", [
+    (tables.THOUSANDS, 1234567.4, "1,234,567"),  # was f"{x:,.0f}"
+    ("%.2f%%", 7.456, "7.46%"),  # was f"{x:.2f}%"
+    ("%.1f days", 12.34, "12.3 days"),
+    ("%d", 41.6, "42"),
+    ("percent", 0.0742, "7.42%"),
+    ("localized", 1234.5, "1,234.50"),
+])
+def test_styler_formats_render_like_the_grid(fmt, value, expected):
+    assert tables._python_format(fmt).format(value) == expected
+
+
+def test_unknown_formats_are_left_to_the_grid():
+    assert tables._python_format("plain") is None
+    assert tables._python_format(None) is None
+
+
+def paged_table():
+    # Runs as its own script under AppTest, so it imports what it uses
+    import pandas as pd
+
+    from core import tables
+
+    df = pd.DataFrame({"qty": range(2500)})
+    tables.show(df, formats={"qty": tables.THOUSANDS}, highlight=df["qty"] % 1000 == 999, key="t")
+
+
+def test_show_sends_one_page_at_a_time():
+    at = AppTest.from_function(paged_table).run()
+    assert not at.exception
+    assert len(at.dataframe[0].value) == tables.PAGE_SIZE
+    at.number_input[0].set_value(3).run()
+    page = at.dataframe[0].value
+    assert len(page) == 500 and page["qty"].iloc[0] == 2000
+    assert pd.api.types.is_integer_dtype(page["qty"])
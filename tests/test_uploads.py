@@ -0,0 +1,73 @@
+import io
+
+import pandas as pd
+import pytest
+
+from core import uploads
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    uploads.clear()
+    yield
+    uploads.clear()
+
+
+def csv_bytes(df):
+    return df.to_csv(index=False).encode()
+
+
+def excel_bytes(df):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_mixed_id_column_is_kept_as_parsed():
+    # IDs typed as text in some rows: pgssrg.py matches them with isin against integers
+    data = excel_bytes(pd.DataFrame({"Product ID": [1, "2A", 3], "Qty": [1.5, 2.0, 3.0]}))
+    df = uploads.read_upload(data, "forecast.xlsx")
+    expected = pd.read_excel(io.BytesIO(data))
+    assert df["Product ID"].tolist() == expected["Product ID"].tolist() == [1, "2A", 3]
+    assert df["Product ID"].isin([1, 3]).tolist() == [True, False, True]
+    assert df["Qty"].tolist() == [1.5, 2.0, 3.0]
+
+
+def test_same_content_is_parsed_once_and_copies_dont_leak():
+    data = csv_bytes(pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}))
+    before = uploads.stats()
+    first = uploads.read_upload(data, "a.csv")
+    first["a"] = 0
+    first.rename(columns={"b": "c"}, inplace=True)
+    second = uploads.read_upload(data, "a.csv")
+    assert second.columns.tolist() == ["a", "b"]
+    assert second["a"].tolist() == [1, 2]
+    stats = uploads.stats()
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_budget_counts_the_frame_held(monkeypatch):
+    data = csv_bytes(pd.DataFrame({"name": [f"product {i}" for i in range(2000)]}))
+    frame = uploads.read_upload(data, "names.csv")
+    assert uploads.stats()["bytes"] == frame.memory_usage(deep=True).sum()
+
+    monkeypatch.setenv("KOANDRA_UPLOAD_CACHE_MB", str(uploads.stats()["bytes"] / 2**20 * 1.5))
+    uploads.read_upload(csv_bytes(pd.DataFrame({"name": [f"sku {i}" for i in range(2000)]})), "other.csv")
+    evictions = uploads.stats()["evictions"]
+    uploads.read_upload(csv_bytes(pd.DataFrame({"name": [f"item {i}" for i in range(2000)]})), "third.csv")
+    stats = uploads.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == evictions + 1
+
+
+def test_a_failed_parse_releases_its_lock():
+    with pytest.raises(Exception):
+        uploads.read_upload(b"not a workbook", "broken.xlsx")
+    assert uploads._parsing == {}
+
+
+def test_normalize_makes_mixed_columns_writable():
+    df = pd.DataFrame({"id": [1, "2", None], "note": [1, "x", None]})
+    normalized = uploads.normalize(df)
+    assert normalized["id"].tolist()[:2] == [1, 2]
+    assert normalized["note"].tolist()[:2] == ["1", "x"]
+    assert normalized["note"].isna().iloc[2]